@@ -0,0 +1 @@
+"""Benchmarks of calendar generation and of the conversion hot paths."""
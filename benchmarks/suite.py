@@ -0,0 +1,394 @@
+"""Benchmark suite of calendar generation and of the conversion hot paths.
+
+Calendars are generated from synthetic configs, sized by their approximate
+number of events and their span of years, with every event_key and every
+holiday enabled. LunarCalendarApp.generate and save are timed separately,
+along with get_future_solar_datetime, _add_integer_days_event and the
+get_date of every holiday.
+
+Results are written as JSON, and can be compared to a previous run saved
+as a baseline, a benchmark slower than its baseline by more than the
+threshold is flagged as a regression.
+
+Usage:
+    python -m benchmarks --save benchmarks/baselines/local.json
+    python -m benchmarks --compare benchmarks/baselines/local.json
+"""
+
+import argparse
+import datetime
+import functools
+import gc
+import itertools
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+from lunar_birthday_ical.calendar import LunarCalendarApp
+from lunar_birthday_ical.events import EventList
+from lunar_birthday_ical.holidays import HOLIDAYS, Holiday
+from lunar_birthday_ical.lunar_table import LAST_YEAR
+from lunar_birthday_ical.plan import EVENT_KEYS, ConfigPlan, compile_config
+from lunar_birthday_ical.timezones import get_timezone
+from lunar_birthday_ical.utils import get_future_solar_datetime
+
+# bump when the benchmarks change in a way that makes old baselines meaningless
+RESULTS_VERSION = 1
+
+# approximate number of events of the synthetic configs
+SIZES = (10, 1_000, 100_000)
+# spans of years of the synthetic configs
+SPANS = (5, 50, 200)
+# a regression is flagged above baseline * (1 + threshold)
+DEFAULT_THRESHOLD = 0.2
+
+# events per item and per year, a lunar and a solar birthday plus an
+# integer_days milestone every 1000 days
+EVENTS_PER_ITEM_YEAR = 2 + 365.25 / 1000
+TIMEZONES = ("Asia/Shanghai", "America/Los_Angeles", "Europe/London")
+# birthdays per get_future_solar_datetime benchmark
+SOLAR_DATETIME_BIRTHDAYS = 100
+
+# a benchmark name and the callable running it, returning its results
+Benchmark = tuple[str, Callable[[], dict]]
+
+
+def make_config(events: int, span: int, seed: int = 0) -> dict:
+    """Build a synthetic config with about events events over span years.
+
+    Args:
+        events: Approximate number of generated events, holidays excluded.
+        span: Number of years the events are generated for, ending in the
+            last year of the lunar table.
+        seed: Seed of the random birthdays.
+
+    Returns:
+        The config, as it would be loaded from a YAML file.
+    """
+    year_end = LAST_YEAR - 1
+    items = max(1, round(events / (span * EVENTS_PER_ITEM_YEAR)))
+
+    return {
+        "global": {
+            "timezone": TIMEZONES[0],
+            "holiday_keys": list(HOLIDAYS),
+            "year_start": year_end - span + 1,
+            "year_end": year_end,
+            "event_keys": list(EVENT_KEYS),
+            "attendees": ["someone@example.com"],
+            "deterministic": True,
+        },
+        "events": [
+            {
+                "name": f"person-{index:06d}",
+                "start_date": birthday.isoformat(),
+                "timezone": TIMEZONES[index % len(TIMEZONES)],
+            }
+            for index, birthday in enumerate(random_birthdays(items, seed))
+        ],
+    }
+
+
+def random_birthdays(count: int, seed: int = 0) -> list[datetime.date]:
+    """Return count random dates of the 20th century."""
+    rng = random.Random(seed)
+    first = datetime.date(1900, 1, 1).toordinal()
+    last = datetime.date(1999, 12, 31).toordinal()
+    return [datetime.date.fromordinal(rng.randint(first, last)) for _ in range(count)]
+
+
+def measure(
+    run: Callable[[Any], object],
+    setup: Callable[[], Any] | None = None,
+    repeat: int = 3,
+) -> dict[str, float]:
+    """Time run repeat times, each time on a fresh setup() result.
+
+    Returns:
+        The minimum and median wall time in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        gc.collect()
+        start = time.perf_counter()
+        run(state)
+        timings.append(time.perf_counter() - start)
+    return {"min": min(timings), "median": statistics.median(timings)}
+
+
+def _new_app(config_path: Path, plan: ConfigPlan) -> LunarCalendarApp:
+    return LunarCalendarApp(config_path, plan=plan)
+
+
+def _generated_app(config_path: Path, plan: ConfigPlan) -> LunarCalendarApp:
+    app = _new_app(config_path, plan)
+    app.generate()
+    return app
+
+
+def _time_generate(
+    config_path: Path, plan: ConfigPlan, repeat: int
+) -> dict[str, float | int]:
+    app = _generated_app(config_path, plan)
+    counts = {"items": len(plan.items), "events": len(app.events)}
+    del app
+    result = measure(
+        lambda app: app.generate(), lambda: _new_app(config_path, plan), repeat
+    )
+    return result | counts
+
+
+def _time_save(config_path: Path, plan: ConfigPlan, repeat: int) -> dict[str, float]:
+    return measure(
+        lambda app: app.save(), lambda: _generated_app(config_path, plan), repeat
+    )
+
+
+def bench_calendar(
+    workdir: Path, sizes: tuple[int, ...], spans: tuple[int, ...], repeat: int
+) -> Iterator[Benchmark]:
+    """Time LunarCalendarApp.generate and save on the synthetic configs."""
+    for size in sizes:
+        for span in spans:
+            scenario = f"{size}x{span}y"
+            config_path = workdir / f"{scenario}.yaml"
+            # compiled on first use, shared by generate and save
+            plan = functools.cache(
+                functools.partial(compile_config, make_config(size, span))
+            )
+            yield (
+                f"generate[{scenario}]",
+                lambda config_path=config_path, plan=plan: _time_generate(
+                    config_path, plan(), repeat
+                ),
+            )
+            yield (
+                f"save[{scenario}]",
+                lambda config_path=config_path, plan=plan: _time_save(
+                    config_path, plan(), repeat
+                ),
+            )
+
+
+def _time_solar_datetime(
+    birthdays: list[datetime.datetime], years: range, repeat: int
+) -> dict[str, float | int]:
+    def run(_: None) -> None:
+        for birthday in birthdays:
+            for year in years:
+                get_future_solar_datetime(birthday, year)
+
+    return measure(run, repeat=repeat) | {"calls": len(birthdays) * len(years)}
+
+
+def bench_solar_datetime(spans: tuple[int, ...], repeat: int) -> Iterator[Benchmark]:
+    """Time get_future_solar_datetime for every year of each span."""
+    timezone = get_timezone(TIMEZONES[0])
+    birthdays = [
+        datetime.datetime.combine(birthday, datetime.time(10), timezone)
+        for birthday in random_birthdays(SOLAR_DATETIME_BIRTHDAYS)
+    ]
+    for span in spans:
+        years = range(LAST_YEAR - span, LAST_YEAR)
+        yield (
+            f"get_future_solar_datetime[{span}y]",
+            functools.partial(_time_solar_datetime, birthdays, years, repeat),
+        )
+
+
+def _time_integer_days(
+    config_path: Path, span: int, repeat: int
+) -> dict[str, float | int]:
+    plan = compile_config(make_config(1_000, span))
+    app = _new_app(config_path, plan)
+
+    def setup() -> LunarCalendarApp:
+        app.events = EventList()
+        return app
+
+    def run(app: LunarCalendarApp) -> None:
+        for item_config in plan.items:
+            app._add_integer_days_event(item_config)
+
+    return measure(run, setup, repeat) | {"items": len(plan.items)}
+
+
+def bench_integer_days(
+    workdir: Path, spans: tuple[int, ...], repeat: int
+) -> Iterator[Benchmark]:
+    """Time _add_integer_days_event on the items of a 1000 events config."""
+    for span in spans:
+        yield (
+            f"_add_integer_days_event[{span}y]",
+            functools.partial(
+                _time_integer_days, workdir / f"integer-days-{span}y.yaml", span, repeat
+            ),
+        )
+
+
+def _time_holiday(holiday: Holiday, years: range, repeat: int) -> dict[str, float]:
+    def run(_: None) -> None:
+        for year in years:
+            holiday.get_date(year)
+
+    return measure(run, repeat=repeat) | {"calls": len(years)}
+
+
+def bench_holidays(repeat: int) -> Iterator[Benchmark]:
+    """Time the get_date of every holiday over the years of the lunar table."""
+    years = range(LAST_YEAR - 200, LAST_YEAR)
+    for key, holiday in HOLIDAYS.items():
+        yield (
+            f"holiday_get_date[{key}]",
+            functools.partial(_time_holiday, holiday, years, repeat),
+        )
+
+
+def run_benchmarks(
+    sizes: tuple[int, ...] = SIZES,
+    spans: tuple[int, ...] = SPANS,
+    repeat: int = 3,
+    selected: str = "",
+) -> dict:
+    """Run the benchmark suite.
+
+    Args:
+        sizes: Approximate numbers of events of the calendar benchmarks.
+        spans: Spans of years of the benchmarks.
+        repeat: Number of timed runs of each benchmark.
+        selected: Only run the benchmarks whose name contains it.
+
+    Returns:
+        The results, as saved in a baseline file.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workdir = Path(tmpdir)
+        benchmarks = itertools.chain(
+            bench_calendar(workdir, sizes, spans, repeat),
+            bench_solar_datetime(spans, repeat),
+            bench_integer_days(workdir, spans, repeat),
+            bench_holidays(repeat),
+        )
+        for name, run in benchmarks:
+            if selected in name:
+                results[name] = result = run()
+                print(f"{name:<40} {result['min'] * 1000:>12.3f} ms")
+    return {
+        "version": RESULTS_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(
+    baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD
+) -> list[str]:
+    """Compare the minimum timings of two runs.
+
+    Args:
+        baseline: Results of the reference run.
+        current: Results of the new run.
+        threshold: Relative slowdown above which a benchmark regressed.
+
+    Returns:
+        The names of the regressed benchmarks.
+
+    Raises:
+        ValueError: If the baseline was saved by an incompatible suite.
+    """
+    if baseline.get("version") != RESULTS_VERSION:
+        raise ValueError(
+            f"baseline version {baseline.get('version')!r} is not {RESULTS_VERSION}"
+        )
+
+    regressions = []
+    print(f"{'benchmark':<40} {'baseline':>15} {'current':>15} {'change':>8}")
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        change = result["min"] / reference["min"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "REGRESSION"
+        print(
+            f"{name:<40} {reference['min'] * 1000:>12.3f} ms"
+            f" {result['min'] * 1000:>12.3f} ms {change:>+8.1%} {flag}".rstrip()
+        )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark calendar generation and the conversion hot paths.",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=SIZES,
+        help="approximate numbers of events of the synthetic configs",
+    )
+    parser.add_argument(
+        "--spans",
+        type=int,
+        nargs="+",
+        default=SPANS,
+        help="spans of years of the synthetic configs",
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3, help="timed runs of each benchmark"
+    )
+    parser.add_argument(
+        "-k", default="", dest="selected", help="only run benchmarks matching this"
+    )
+    parser.add_argument("--save", type=Path, help="write the results to this file")
+    parser.add_argument(
+        "--compare", type=Path, help="compare the results to this baseline file"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="relative slowdown flagged as a regression (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.repeat < 1:
+        parser.error("--repeat must be a positive integer")
+    if min(args.spans) < 1 or max(args.spans) > LAST_YEAR - 1900:
+        parser.error(f"--spans must be between 1 and {LAST_YEAR - 1900}")
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+
+    current = run_benchmarks(
+        tuple(args.sizes), tuple(args.spans), args.repeat, args.selected
+    )
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+        print(f"results saved to {args.save}")
+
+    if baseline is not None:
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed", file=sys.stderr)
+            return 1
+    return 0
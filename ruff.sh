@@ -1,4 +1,4 @@
 #!/bin/sh
 
-uv run ruff check --fix src/ tests/
-uv run ruff format src/ tests/
+uv run ruff check --fix src/ tests/ benchmarks/
+uv run ruff format src/ tests/ benchmarks/
@@ -1,28 +1,115 @@
+import concurrent.futures
 import datetime
-import json
+import functools
+import itertools
 import logging
+import os
+import tempfile
 import uuid
-import zoneinfo
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import icalendar
-import yaml
-from chaos_utils.dict_utils import deep_merge
-from lunar_python import Solar
 
-from lunar_birthday_ical.config import default_config
+from lunar_birthday_ical.event_cache import EventCache, make_cache_key
+from lunar_birthday_ical.events import EventList, EventRecord
 from lunar_birthday_ical.holidays import HOLIDAYS
-from lunar_birthday_ical.uploader import GitHubGistUploader, PastebinWorkerUploader
+from lunar_birthday_ical.lunar import format_lunar, solar_to_lunar_ymd
+from lunar_birthday_ical.plan import ConfigPlan, compile_item, load_plan
+from lunar_birthday_ical.profiling import NULL_TIMER, PhaseTimer
+from lunar_birthday_ical.roster import read_roster
+from lunar_birthday_ical.timezones import get_offset_table, get_timezone
 from lunar_birthday_ical.utils import (
-    get_future_solar_datetime,
+    get_future_solar_datetimes,
+    get_integer_days,
     get_local_datetime,
-    local_datetime_to_utc_datetime,
 )
+from lunar_birthday_ical.writer import (
+    AlarmTemplate,
+    CalendarWriter,
+    content_line,
+    escape_text,
+    render_attendee,
+    render_event,
+)
+
+# uploaders are only imported when an upload is enabled
+if TYPE_CHECKING:
+    from lunar_birthday_ical.http_client import SharedHTTPClient
+    from lunar_birthday_ical.upload_state import UploadState
+    from lunar_birthday_ical.uploader import (
+        AsyncUploadPipeline,
+        CalendarUploader,
+        GistBatch,
+    )
+
+PRODID = "-//ak1ra-lab//lunar-birthday-ical//EN"
+# namespace of the name-based UIDs used in deterministic mode
+UID_NAMESPACE = uuid.uuid5(
+    uuid.NAMESPACE_URL, "https://github.com/ak1ra-lab/lunar-birthday-ical"
+)
+
+# items handed to each worker process per batch, see _generate_parallel
+PARALLEL_BATCH_SIZE = 64
+
+# config section of each upload service -> name used in logs
+UPLOAD_SERVICES = {"pastebin": "pastebin", "github_gist": "GitHub Gist"}
 
 logger = logging.getLogger(__name__)
 
 
+def _make_alarm_uid(
+    namespace: uuid.UUID | None, trigger: datetime.datetime | datetime.timedelta
+) -> uuid.UUID:
+    """Return a random alarm UID, or one derived from its event UID and trigger."""
+    if namespace is None:
+        return uuid.uuid4()
+    return uuid.uuid5(namespace, str(trigger))
+
+
+def _get_trigger(
+    reminder_days: int | datetime.datetime,
+) -> datetime.datetime | datetime.timedelta:
+    """Return the alarm trigger of a reminder, in days before the event or absolute."""
+    if isinstance(reminder_days, datetime.datetime):
+        return reminder_days
+    return datetime.timedelta(days=-reminder_days)
+
+
+@functools.lru_cache(maxsize=1024)
+def _make_attendee(attendee_email: str) -> icalendar.vCalAddress:
+    """Return the ATTENDEE value of an email, shared by all events."""
+    attendee = icalendar.vCalAddress(f"mailto:{attendee_email}")
+    attendee.params["cn"] = icalendar.vText(attendee_email.split("@")[0])
+    attendee.params["role"] = icalendar.vText("REQ-PARTICIPANT")
+    return attendee
+
+
+# LunarCalendarApp of a worker process, see LunarCalendarApp._generate_parallel
+_worker_app: "LunarCalendarApp | None" = None
+
+
+def _init_worker(config_path: Path, plan: ConfigPlan) -> None:
+    """Initialize a worker process of the event generation process pool."""
+    global _worker_app
+    _worker_app = LunarCalendarApp(config_path, plan=plan)
+
+
+def _generate_item_records(item_config: dict) -> tuple[EventList, Counter]:
+    """Generate the events of an item in a worker process.
+
+    Returns:
+        The events of the item and their number per event key.
+    """
+    _worker_app.events = EventList()
+    _worker_app.event_counts = Counter()
+    _worker_app._add_item_events(item_config)
+    return _worker_app.events, _worker_app.event_counts
+
+
 class SafeDict(dict):
     """Dictionary that returns the key itself when missing."""
 
@@ -33,107 +120,462 @@ class SafeDict(dict):
 class LunarCalendarApp:
     """Generates iCalendar files from configuration."""
 
-    def __init__(self, config_path: Path) -> None:
+    def __init__(
+        self,
+        config_path: Path,
+        stream: bool = False,
+        cache: EventCache | None = None,
+        jobs: int = 1,
+        plan: ConfigPlan | None = None,
+        plan_cache: Path | None = None,
+        timer: PhaseTimer | None = None,
+    ) -> None:
         """Initialize the generator with a configuration file.
 
         Args:
             config_path: Path to the YAML configuration file.
+            stream: Write each event to the output file as it is generated
+                instead of collecting them in the icalendar object tree.
+            cache: Optional cache of rendered events, items whose config did
+                not change since a previous run are spliced in from the cache
+                instead of being generated again. With a cache, events are
+                rendered as text instead of being kept in events.
+            jobs: Number of worker processes generating the events of the
+                items, the output is identical to a sequential run.
+            plan: Already compiled configuration, config_path is then not
+                read.
+            plan_cache: Optional directory caching the compiled configuration
+                plans, see load_plan.
+            timer: Optional timer of the phases of the generation, see
+                PhaseTimer.
         """
         self.config_path = config_path
-        self.config = self._load_config()
+        self.output_path = config_path.with_suffix(".ics")
+        self.stream = stream
+        self.cache = cache
+        self.jobs = jobs
+        self.timer = timer if timer is not None else NULL_TIMER
+        if plan is None:
+            plan = load_plan(config_path, plan_cache, self.timer)
+        self.plan = plan
+        self.config = self.plan.config
+        self.deterministic = bool(self.config.get("global", {}).get("deterministic"))
+        self.compress = bool(self.config.get("global", {}).get("compress"))
+        self.dtstamp = self._get_dtstamp()
         self.calendar = icalendar.Calendar()
+        # generated events, rendered by save() unless streamed or cached
+        self.events = EventList()
+        self._writer: CalendarWriter | None = None
+        # rendered events, when using the cache without streaming
+        self._chunks: list[str] | None = [] if cache and not stream else None
+        # pre-rendered VALARM templates and ATTENDEE lines, by reminders and
+        # attendees, which are usually shared by all the events of the config
+        self._alarm_templates: dict[tuple, list[AlarmTemplate]] = {}
+        self._attendee_lines: dict[tuple[str, ...], str] = {}
+        # number of generated events per event key, items spliced in from
+        # the cache are not generated
+        self.event_counts: Counter[str] = Counter()
+        # number of failed uploads per service
+        self.upload_failures: Counter[str] = Counter()
         self._init_calendar()
 
     def generate(self) -> None:
-        """Generate calendar events based on configuration."""
+        """Generate calendar events based on configuration.
+
+        In streaming mode the output file is written here, event by event,
+        into a temporary file that replaces it once every event is generated,
+        so that a failure leaves the previous calendar untouched.
+        """
+        if not self.stream:
+            self._generate_events()
+            return
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.output_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                self._writer = CalendarWriter(f)
+                self._writer.begin(self._calendar_properties())
+                self._generate_events()
+                self._writer.end()
+            # mkstemp creates the file readable by its owner only
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.output_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        finally:
+            self._writer = None
+
+    def _generate_events(self) -> None:
+        """Generate the events of every configured item and holiday."""
+        global_config = self.config.get("global", {})
+
+        if self.jobs > 1:
+            self._generate_parallel(self._iter_item_configs())
+        else:
+            for item_config in self._iter_item_configs():
+                self._generate_cached(
+                    "item",
+                    item_config,
+                    functools.partial(self._add_item_events, item_config),
+                )
+
+        self._generate_cached(
+            "holidays",
+            global_config,
+            functools.partial(self._add_holiday_event, global_config),
+            event_key="holidays",
+        )
+
+    def _iter_item_configs(self) -> Iterator[dict]:
+        """Yield the compiled items of the events list, then of the roster.
+
+        The roster file is read lazily, one item at a time.
+        """
+        yield from self.plan.items
+
+        roster = self.config.get("roster")
+        if not roster:
+            return
+        roster_path = self.config_path.parent / roster
         global_config = self.config.get("global", {})
+        for location, item in read_roster(roster_path):
+            with self.timer.phase("config.merge"):
+                item_config = compile_item(global_config, item, location)
+            yield item_config
+
+    def _generate_parallel(self, item_configs: Iterable[dict]) -> None:
+        """Generate the events of the items in a process pool.
+
+        Workers send back the EventList of each item, which are added to the
+        calendar in config order, so the output is identical to a sequential
+        run. Items found in the cache are not sent to the workers. Items are
+        dispatched in batches, so that a roster is never loaded in full.
+        """
+        item_configs = iter(item_configs)
+        batch_size = self.jobs * PARALLEL_BATCH_SIZE
+
+        with ProcessPoolExecutor(
+            max_workers=self.jobs,
+            initializer=_init_worker,
+            initargs=(self.config_path, self.plan),
+        ) as executor:
+            while batch := list(itertools.islice(item_configs, batch_size)):
+                pending = [
+                    self.cache is None
+                    or not self.cache.contains(self._cache_key("item", c))
+                    for c in batch
+                ]
+                results = executor.map(
+                    _generate_item_records,
+                    itertools.compress(batch, pending),
+                    chunksize=max(1, sum(pending) // (self.jobs * 4)),
+                )
+                for item_config, is_pending in zip(batch, pending):
+                    if is_pending:
+                        with self.timer.phase("generate.workers"):
+                            events, counts = next(results)
+                        generate = functools.partial(self._add_records, events, counts)
+                    else:
+                        generate = functools.partial(self._add_item_events, item_config)
+                    self._generate_cached("item", item_config, generate)
+
+    def _add_records(self, events: EventList, counts: Counter) -> None:
+        """Add events generated by a worker process to the calendar."""
+        self.events.extend(events)
+        self.event_counts.update(counts)
+
+    def _add_item_events(self, item_config: dict) -> None:
+        """Add all events of a single item of the events list."""
+        event_keys = item_config.get("event_keys") or []
+
+        if "integer_days" in event_keys:
+            self._run_event_key(
+                "integer_days",
+                functools.partial(self._add_integer_days_event, item_config),
+            )
 
-        for item in self.config.get("events", []):
-            item_config = deep_merge(global_config, item)
-            event_keys = item_config.get("event_keys", [])
+        for event_key in event_keys:
+            if event_key in ("solar_birthday", "lunar_birthday"):
+                self._run_event_key(
+                    event_key,
+                    functools.partial(
+                        self._add_birthday_event, item_config, [event_key]
+                    ),
+                )
+
+    def _generate_cached(
+        self,
+        kind: str,
+        config: dict,
+        generate: Callable[[], None],
+        event_key: str | None = None,
+    ) -> None:
+        """Run an event generator, or splice in its cached output.
+
+        When streaming or caching, the events are rendered right away instead
+        of being kept in events.
+
+        Args:
+            kind: Kind of events generated, part of the cache key.
+            config: Merged item config, or the global config for holidays.
+            generate: Callable adding the events of config to the calendar.
+            event_key: Event key generate() is accounted to, if any, see
+                _run_event_key.
+        """
+        if event_key is not None:
+            generate = functools.partial(self._run_event_key, event_key, generate)
+
+        if self.cache is None and self._writer is None:
+            generate()
+            return
+
+        key = self._cache_key(kind, config) if self.cache is not None else None
+        text = self.cache.get(key) if key is not None else None
+        if text is None:
+            events, self.events = self.events, EventList()
+            try:
+                generate()
+                with self.timer.phase("serialize"):
+                    text = "".join(self._render_event(record) for record in self.events)
+            finally:
+                self.events = events
+            if key is not None:
+                self.cache.put(key, text)
+
+        with self.timer.phase("serialize"):
+            if self._writer is not None:
+                self._writer.write(text)
+            else:
+                self._chunks.append(text)
 
-            if "integer_days" in event_keys:
-                self._add_integer_days_event(item_config)
+    def _run_event_key(self, event_key: str, generate: Callable[[], None]) -> None:
+        """Run the generator of an event key, counting its time and events."""
+        count = len(self.events)
+        with self.timer.phase(f"generate.{event_key}"):
+            generate()
+        self.event_counts[event_key] += len(self.events) - count
 
-            self._add_birthday_event(item_config)
+    def _cache_key(self, kind: str, config: dict) -> str:
+        """Return the cache key of the events generated for config."""
+        return make_cache_key(self._cache_context(config), kind, config)
 
-        self._add_holiday_event(global_config)
+    def _cache_context(self, config: dict) -> dict:
+        """Return the calendar-wide state the rendered events depend on."""
+        return {
+            "calendar": self.config_path.stem,
+            "dtstamp": self.dtstamp,
+            # year_start defaults to the current year
+            "year": None if config.get("year_start") else datetime.date.today().year,
+        }
 
     def save(self) -> Path:
         """Save the generated calendar to a file.
 
+        In streaming mode the file has already been written by generate().
+
         Returns:
             Path to the saved .ics file.
         """
-        calendar_data = self.calendar.to_ical()
-        output = self.config_path.with_suffix(".ics")
-        with output.open("wb") as f:
-            f.write(calendar_data)
+        output = self.output_path
+        with self.timer.phase("serialize"):
+            if self._chunks is not None:
+                with output.open("wb") as f:
+                    writer = CalendarWriter(f)
+                    writer.begin(self._calendar_properties())
+                    for chunk in self._chunks:
+                        writer.write(chunk)
+                    writer.end()
+            elif not self.stream:
+                self.calendar.subcomponents = [
+                    self._to_icalendar_event(record) for record in self.events
+                ]
+                calendar_data = self.calendar.to_ical()
+                with output.open("wb") as f:
+                    f.write(calendar_data)
         logger.info("iCalendar saved to %s", output)
         return output
 
-    def upload(self, file_path: Path) -> None:
+    def upload(
+        self,
+        file_path: Path,
+        pipeline: "AsyncUploadPipeline | None" = None,
+        client: "SharedHTTPClient | None" = None,
+        state: "UploadState | None" = None,
+        gist_batch: "GistBatch | None" = None,
+    ) -> list[concurrent.futures.Future]:
         """Upload the calendar file to configured services.
 
         Args:
             file_path: Path to the calendar file to upload.
+            pipeline: Optional pipeline the uploads are submitted to, they then
+                run concurrently instead of one after the other.
+            client: Optional pooled client shared with the uploads of other
+                calendars, used by the uploads not submitted to pipeline.
+            state: Optional state of the previous uploads, unchanged
+                calendars are not uploaded again.
+            gist_batch: Optional batch the GitHub Gist upload is added to, it
+                is then pushed along with other calendars by its flush().
+
+        Returns:
+            The futures of the uploads submitted to pipeline or added to
+            gist_batch, their result is logged once they complete.
         """
-        self._upload_to_pastebin(file_path)
-        self._upload_to_github_gist(file_path)
+        futures = []
+        # the uploads of the pipeline use its async client
+        if pipeline is not None and gist_batch is None:
+            client = None
+        for service, uploader in self._create_uploaders(client, state):
+            if service == "github_gist" and gist_batch is not None:
+                future = gist_batch.add(uploader, file_path)
+            elif pipeline is not None:
+                future = pipeline.submit(uploader, file_path)
+            else:
+                try:
+                    with self.timer.phase(f"upload.{service}"):
+                        result = uploader.upload(file_path)
+                except Exception as e:
+                    self._upload_failed(service, e)
+                else:
+                    self._upload_succeeded(service, result)
+                continue
 
-    def _upload_to_pastebin(self, file_path: Path) -> None:
-        """Upload to Pastebin if enabled."""
-        pastebin_config = self.config.get("pastebin", {})
-        if pastebin_config.get("enabled", False):
-            try:
-                uploader = PastebinWorkerUploader(pastebin_config)
-                result = uploader.upload(file_path)
-                if "manageUrl" in result:
-                    logger.info(
-                        "Add 'manage_url: %s' to your config file to update this paste in the future",
-                        result["manageUrl"],
-                    )
-            except Exception as e:
-                logger.error("Failed to upload to pastebin: %s", e)
+            future.add_done_callback(functools.partial(self._upload_done, service))
+            futures.append(future)
+        return futures
 
-    def _upload_to_github_gist(self, file_path: Path) -> None:
-        """Upload to GitHub Gist if enabled."""
-        gist_config = self.config.get("github_gist", {})
-        if gist_config.get("enabled", False):
-            try:
-                uploader = GitHubGistUploader(gist_config)
-                result = uploader.upload(file_path)
-                # Log the gist_id for future updates
-                if "id" in result:
-                    logger.info(
-                        "Add 'gist_id: %s' to your config file to update this gist in the future",
-                        result["id"],
+    def _create_uploaders(
+        self,
+        client: "SharedHTTPClient | None" = None,
+        state: "UploadState | None" = None,
+    ) -> list[tuple[str, "CalendarUploader"]]:
+        """Create the uploaders of the enabled services.
+
+        The uploaders share upload_scheduler, which paces their requests
+        and retries the rate limited and failed ones.
+
+        Args:
+            client: Optional pooled client of the uploaders, only created when
+                a service is enabled.
+            state: Optional state of the previous uploads.
+        """
+        from lunar_birthday_ical.uploader import (
+            GitHubGistUploader,
+            PastebinWorkerUploader,
+            upload_scheduler,
+        )
+
+        uploaders = []
+        for service, uploader_class in (
+            ("pastebin", PastebinWorkerUploader),
+            ("github_gist", GitHubGistUploader),
+        ):
+            service_config = self.config.get(service, {})
+            if service_config.get("enabled", False):
+                try:
+                    uploaders.append(
+                        (
+                            service,
+                            uploader_class(
+                                service_config,
+                                client=client.get() if client is not None else None,
+                                state=state,
+                                scheduler=upload_scheduler,
+                            ),
+                        )
                     )
-            except Exception as e:
-                logger.error("Failed to upload to GitHub Gist: %s", e)
-
-    def _load_config(self) -> dict:
-        """Load and merge configuration."""
-        with open(self.config_path, "r") as f:
-            yaml_config = yaml.safe_load(f)
-            merged_config = deep_merge(default_config, yaml_config)
-            logger.debug(
-                "merged_config=%s",
-                json.dumps(merged_config, ensure_ascii=False, default=str),
+                except Exception as e:
+                    self._upload_failed(service, e)
+        return uploaders
+
+    def _upload_done(self, service: str, future: concurrent.futures.Future) -> None:
+        """Log the result of an upload run by an AsyncUploadPipeline or a
+        GistBatch."""
+        try:
+            result = future.result()
+        except Exception as e:
+            self._upload_failed(service, e)
+        else:
+            self._upload_succeeded(service, result)
+
+    def _upload_succeeded(self, service: str, result: dict[str, Any]) -> None:
+        """Log how to update the uploaded calendar in the future."""
+        if result.get("unchanged"):
+            logger.info(
+                "Calendar unchanged since its last upload to %s, upload skipped",
+                UPLOAD_SERVICES[service],
             )
-        return merged_config
+            return
+        if service == "pastebin" and "manageUrl" in result:
+            logger.info(
+                "Add 'manage_url: %s' to your config file to update this paste in the future",
+                result["manageUrl"],
+            )
+        # Log the gist_id for future updates
+        if service == "github_gist" and "id" in result:
+            logger.info(
+                "Add 'gist_id: %s' to your config file to update this gist in the future",
+                result["id"],
+            )
+
+    def _upload_failed(self, service: str, error: Exception) -> None:
+        """Count and log a failed upload."""
+        self.upload_failures[service] += 1
+        logger.error("Failed to upload to %s: %s", UPLOAD_SERVICES[service], error)
+
+    def _calendar_properties(self) -> list[tuple[str, str]]:
+        """Return the calendar metadata properties in output order."""
+        global_config = self.config.get("global", {})
+        calendar_name = self.config_path.stem
+        timezone = get_timezone(global_config.get("timezone"))
+
+        return [
+            ("VERSION", "2.0"),
+            ("PRODID", PRODID),
+            ("CALSCALE", "GREGORIAN"),
+            ("X-WR-CALNAME", calendar_name),
+            ("X-WR-TIMEZONE", str(timezone)),
+        ]
 
     def _init_calendar(self) -> None:
         """Initialize the calendar object with metadata."""
+        for name, value in self._calendar_properties():
+            self.calendar.add(name, value)
+
+    def _get_dtstamp(self) -> datetime.datetime | None:
+        """Return the DTSTAMP pinned in deterministic mode.
+
+        Uses global.dtstamp when set, otherwise midnight UTC on the first day
+        of global.year_start, so that an unchanged config yields the same value.
+        """
+        if not self.deterministic:
+            return None
+
         global_config = self.config.get("global", {})
-        calendar_name = self.config_path.stem
-        timezone = zoneinfo.ZoneInfo(global_config.get("timezone"))
+        dtstamp = global_config.get("dtstamp")
+        if not dtstamp:
+            year_start = global_config.get("year_start") or datetime.date.today().year
+            dtstamp = datetime.datetime(year_start, 1, 1)
+        elif isinstance(dtstamp, str):
+            dtstamp = datetime.datetime.fromisoformat(dtstamp)
+        elif not isinstance(dtstamp, datetime.datetime):
+            dtstamp = datetime.datetime.combine(dtstamp, datetime.time())
+
+        if dtstamp.tzinfo is None:
+            dtstamp = dtstamp.replace(tzinfo=datetime.timezone.utc)
+        return dtstamp.astimezone(datetime.timezone.utc)
+
+    def _make_uid(self, uid_seed: tuple) -> uuid.UUID:
+        """Return the UID of an event.
 
-        self.calendar.add("PRODID", "-//ak1ra-lab//lunar-birthday-ical//EN")
-        self.calendar.add("VERSION", "2.0")
-        self.calendar.add("CALSCALE", "GREGORIAN")
-        self.calendar.add("X-WR-CALNAME", calendar_name)
-        self.calendar.add("X-WR-TIMEZONE", timezone)
+        In deterministic mode the UID is derived from the calendar name and
+        uid_seed, e.g. (name, event_key, year), otherwise it is random.
+        """
+        if not self.deterministic:
+            return uuid.uuid4()
+        return uuid.uuid5(
+            UID_NAMESPACE, "/".join(map(str, (self.config_path.stem, *uid_seed)))
+        )
 
     def _add_event(
         self,
@@ -143,38 +585,143 @@ class LunarCalendarApp:
         description: str,
         reminders: list[int | datetime.datetime],
         attendees: list[str],
+        uid_seed: tuple = (),
+        uid: uuid.UUID | None = None,
+        recurrence_id: datetime.datetime | None = None,
+        rrule: str | None = None,
+        rdates: list[datetime.datetime] | None = None,
     ) -> None:
-        """Add a single event to the calendar."""
+        """Add a single event to the calendar.
+
+        uid_seed identifies the event within the calendar, it is only used to
+        derive the UID in deterministic mode, unless uid is given. The
+        recurrence arguments are only set for the events of a series, see
+        _add_series.
+        """
+        if uid is None:
+            uid = self._make_uid(uid_seed)
+        self.events.add(
+            uid=str(uid),
+            dtstart=dtstart,
+            dtend=dtend,
+            summary=summary,
+            description=description,
+            reminders=reminders,
+            attendees=attendees,
+            recurrence_id=recurrence_id,
+            rrule=rrule,
+            rdates=rdates,
+        )
+
+    def _alarm_uid_namespace(self, record: EventRecord) -> uuid.UUID | None:
+        """Return the namespace of the alarm UIDs of record in deterministic mode."""
+        if not self.deterministic:
+            return None
+        namespace = uuid.UUID(record.uid)
+        if record.recurrence_id is not None:
+            # overrides share the UID of their series
+            namespace = uuid.uuid5(namespace, record.recurrence_id.isoformat())
+        return namespace
+
+    def _get_event_dtstamp(self) -> datetime.datetime:
+        """Return the DTSTAMP of the events being serialized."""
+        return self.dtstamp or datetime.datetime.now(datetime.timezone.utc)
+
+    def _to_icalendar_event(self, record: EventRecord) -> icalendar.Event:
+        """Build the icalendar component of an event record."""
+        table = self.events.table
+        summary = table[record.summary]
+
         event = icalendar.Event()
-        event.add("uid", uuid.uuid4())
-        now_utc = datetime.datetime.now(datetime.timezone.utc)
-        event.add("dtstamp", icalendar.vDatetime(now_utc))
-        event.add("dtstart", icalendar.vDatetime(dtstart))
-        event.add("dtend", icalendar.vDatetime(dtend))
+        event.add("uid", record.uid)
+        event.add("dtstamp", icalendar.vDatetime(self._get_event_dtstamp()))
+        event.add("dtstart", icalendar.vDatetime(record.dtstart))
+        event.add("dtend", icalendar.vDatetime(record.dtend))
         event.add("summary", summary)
-        event.add("description", description)
+        event.add("description", table[record.description])
+        if record.recurrence_id is not None:
+            event.add("recurrence-id", icalendar.vDatetime(record.recurrence_id))
+        if record.rrule:
+            event.add("rrule", icalendar.vRecur.from_ical(record.rrule))
+        if record.rdates:
+            event.add("rdate", list(record.rdates))
+
+        self._add_reminders_to_event(
+            event,
+            table[record.reminders],
+            summary,
+            self._alarm_uid_namespace(record),
+        )
+        self._add_attendees_to_event(event, table[record.attendees])
+        return event
 
-        self._add_reminders_to_event(event, reminders, summary)
-        self._add_attendees_to_event(event, attendees)
+    def _render_event(self, record: EventRecord) -> str:
+        """Render an event record as text, bypassing icalendar."""
+        table = self.events.table
+        summary = table[record.summary]
+        alarm_uid_namespace = self._alarm_uid_namespace(record)
+
+        description_line = content_line(
+            "DESCRIPTION", escape_text(f"Reminder: {summary}")
+        )
+        alarms = [
+            template.render(
+                str(_make_alarm_uid(alarm_uid_namespace, template.trigger)),
+                description_line,
+            )
+            for template in self._get_alarm_templates(table[record.reminders])
+        ]
 
-        self.calendar.add_component(event)
+        return render_event(
+            uid=record.uid,
+            dtstamp=self._get_event_dtstamp(),
+            dtstart=record.dtstart,
+            dtend=record.dtend,
+            summary=summary,
+            description=table[record.description],
+            alarms=alarms,
+            attendees=[self._get_attendee_lines(table[record.attendees])],
+            recurrence_id=record.recurrence_id,
+            rrule=record.rrule,
+            rdates=record.rdates,
+        )
+
+    def _get_alarm_templates(
+        self, reminders: tuple[int | datetime.datetime, ...]
+    ) -> list[AlarmTemplate]:
+        """Return the VALARM templates of reminders, rendering them once."""
+        templates = self._alarm_templates.get(reminders)
+        if templates is None:
+            templates = self._alarm_templates[reminders] = [
+                AlarmTemplate(_get_trigger(reminder_days))
+                for reminder_days in reminders
+                if isinstance(reminder_days, (int, datetime.datetime))
+            ]
+        return templates
+
+    def _get_attendee_lines(self, attendees: tuple[str, ...]) -> str:
+        """Return the ATTENDEE lines of attendees, rendering them once."""
+        lines = self._attendee_lines.get(attendees)
+        if lines is None:
+            lines = self._attendee_lines[attendees] = "".join(
+                render_attendee(email) for email in attendees
+            )
+        return lines
 
     def _add_reminders_to_event(
         self,
         event: icalendar.Event,
         reminders: list[int | datetime.datetime],
         summary: str,
+        alarm_uid_namespace: uuid.UUID | None = None,
     ) -> None:
         # 添加提醒
         for reminder_days in reminders:
-            if isinstance(reminder_days, datetime.datetime):
-                trigger_time = reminder_days
-            elif isinstance(reminder_days, int):
-                trigger_time = datetime.timedelta(days=-reminder_days)
-            else:
+            if not isinstance(reminder_days, (int, datetime.datetime)):
                 continue
+            trigger_time = _get_trigger(reminder_days)
             alarm = icalendar.Alarm()
-            alarm.add("uid", uuid.uuid4())
+            alarm.add("uid", _make_alarm_uid(alarm_uid_namespace, trigger_time))
             alarm.add("action", "DISPLAY")
             alarm.add("description", f"Reminder: {summary}")
             alarm.add("trigger", trigger_time)
@@ -185,14 +732,76 @@ class LunarCalendarApp:
     ) -> None:
         # 添加与会者
         for attendee_email in attendees:
-            attendee = icalendar.vCalAddress(f"mailto:{attendee_email}")
-            attendee.params["cn"] = icalendar.vText(attendee_email.split("@")[0])
-            attendee.params["role"] = icalendar.vText("REQ-PARTICIPANT")
-            event.add("attendee", attendee)
+            event.add("attendee", _make_attendee(attendee_email))
+
+    def _add_series(
+        self,
+        occurrences: list[tuple[datetime.datetime, str, str]],
+        event_hours: datetime.timedelta,
+        reminders: list[int],
+        attendees: list[str],
+        uid_seed: tuple,
+        rrule: str | None = None,
+        rrule_dtstarts: list[datetime.datetime] | None = None,
+    ) -> None:
+        """Add occurrences as a single recurring event, used in compress mode.
+
+        The master event carries the text of the first occurrence, the other
+        occurrences are listed by rrule, or by RDATE when rrule_dtstarts (the
+        starts rrule expands to) do not match them, e.g. across a DST change.
+        Occurrences whose text differs from the master get a RECURRENCE-ID
+        override.
+
+        Args:
+            occurrences: (dtstart, summary, description) of each occurrence.
+            event_hours: Duration of each occurrence.
+            reminders: Reminders, in days before each occurrence.
+            attendees: Attendee email addresses.
+            uid_seed: Identifies the series within the calendar.
+            rrule: Recurrence rule of the occurrences, if any.
+            rrule_dtstarts: Occurrence starts generated by rrule.
+        """
+        if not occurrences:
+            return
+
+        dtstarts = [dtstart for dtstart, _, _ in occurrences]
+        rdates = None
+        if rrule is None or rrule_dtstarts != dtstarts:
+            rrule = None
+            rdates = dtstarts[1:]
+
+        uid = self._make_uid(uid_seed)
+        dtstart, summary, description = occurrences[0]
+        self._add_event(
+            dtstart=dtstart,
+            dtend=dtstart + event_hours,
+            summary=summary,
+            description=description,
+            reminders=reminders,
+            attendees=attendees,
+            uid=uid,
+            rrule=rrule,
+            rdates=rdates,
+        )
+
+        for dtstart, override_summary, override_description in occurrences[1:]:
+            if (override_summary, override_description) == (summary, description):
+                continue
+            self._add_event(
+                dtstart=dtstart,
+                dtend=dtstart + event_hours,
+                summary=override_summary,
+                description=override_description,
+                reminders=reminders,
+                attendees=attendees,
+                uid=uid,
+                recurrence_id=dtstart,
+            )
 
     def _add_integer_days_event(self, item_config: dict) -> None:
         """Add integer days events (e.g. 10000 days old)."""
-        timezone = zoneinfo.ZoneInfo(item_config.get("timezone"))
+        timezone = get_timezone(item_config.get("timezone"))
+        offset_table = get_offset_table(item_config.get("timezone"))
         start_date = item_config.get("start_date")
         event_time = item_config.get("event_time")
         start_datetime = get_local_datetime(start_date, event_time, timezone)
@@ -205,52 +814,97 @@ class LunarCalendarApp:
         days_max = item_config.get("days_max")
         days_interval = item_config.get("days_interval")
 
-        integer_days_summary = "{name} 降临地球🌏已经 {days} 天啦!"
-        integer_days_description = (
-            "{name} 降临地球🌏已经 {days} 天啦! (age: {age}, birthday: {birthday})"
-        )
+        if self.compress:
+            integer_days_summary = "{name} 降临地球🌏又满 {days_interval} 天啦!"
+            integer_days_description = (
+                "{name} 降临地球🌏又满 {days_interval} 天啦! (birthday: {birthday})"
+            )
+        else:
+            integer_days_summary = "{name} 降临地球🌏已经 {days} 天啦!"
+            integer_days_description = (
+                "{name} 降临地球🌏已经 {days} 天啦! (age: {age}, birthday: {birthday})"
+            )
         summary = item_config.get("summary") or integer_days_summary
         description = item_config.get("description") or integer_days_description
 
-        for days in range(days_interval, days_max + 1, days_interval):
-            event_datetime = start_datetime + datetime.timedelta(days=days)
-            if event_datetime.year < year_start or event_datetime.year > year_end:
-                continue
-
-            dtstart = local_datetime_to_utc_datetime(event_datetime)
-            dtend = dtstart + event_hours
+        integer_days = get_integer_days(
+            start_datetime.date(), year_start, year_end, days_interval, days_max
+        )
+        integer_days = integer_days.tolist()
+        dtstarts = offset_table.to_utc(
+            start_datetime + datetime.timedelta(days=days) for days in integer_days
+        )
+        occurrences = []
+        for days, dtstart in zip(integer_days, dtstarts):
             year_average = 365.25
             age = round(days / year_average, 2)
+            occurrences.append(
+                (
+                    dtstart,
+                    self._safe_format(
+                        summary, name=name, days=days, days_interval=days_interval
+                    ),
+                    self._safe_format(
+                        description,
+                        name=name,
+                        days=days,
+                        days_interval=days_interval,
+                        age=age,
+                        birthday=start_date,
+                    ),
+                )
+            )
 
-            reminders_datetime = [
-                dtstart - datetime.timedelta(days=d)
-                for d in item_config.get("reminders")
-            ]
+        if self.compress:
+            self._add_series(
+                occurrences,
+                event_hours,
+                reminders=item_config.get("reminders"),
+                attendees=item_config.get("attendees"),
+                uid_seed=(name, start_date, "integer_days"),
+            )
+            return
+
+        for (dtstart, event_summary, event_description), days in zip(
+            occurrences, integer_days
+        ):
             self._add_event(
                 dtstart=dtstart,
-                dtend=dtend,
-                summary=self._safe_format(summary, name=name, days=days),
-                description=self._safe_format(
-                    description, name=name, days=days, age=age, birthday=start_date
-                ),
-                reminders=reminders_datetime,
+                dtend=dtstart + event_hours,
+                summary=event_summary,
+                description=event_description,
+                reminders=item_config.get("reminders"),
                 attendees=item_config.get("attendees"),
+                uid_seed=(name, start_date, "integer_days", days),
             )
 
-    def _add_birthday_event(self, item_config: dict) -> None:
-        """Add birthday events (solar and lunar)."""
-        timezone = zoneinfo.ZoneInfo(item_config.get("timezone"))
+    def _add_birthday_event(
+        self, item_config: dict, event_keys: Iterable[str] | None = None
+    ) -> None:
+        """Add birthday events (solar and lunar).
+
+        Args:
+            item_config: Merged item config.
+            event_keys: Event keys to add, the event_keys of item_config by
+                default.
+        """
+        timezone = get_timezone(item_config.get("timezone"))
+        offset_table = get_offset_table(item_config.get("timezone"))
         start_date = item_config.get("start_date")
         event_time = item_config.get("event_time")
         start_datetime = get_local_datetime(start_date, event_time, timezone)
-        start_datetime_in_lunar = Solar.fromDate(start_datetime).getLunar()
+        start_datetime_in_lunar = format_lunar(
+            *solar_to_lunar_ymd(start_datetime.date())
+        )
         event_hours = datetime.timedelta(hours=item_config.get("event_hours"))
 
         name = item_config.get("name")
         year_start = item_config.get("year_start") or datetime.date.today().year
         year_end = item_config.get("year_end")
 
-        for event_key in item_config.get("event_keys") or []:
+        if event_keys is None:
+            event_keys = item_config.get("event_keys") or []
+        for event_key in event_keys:
             if event_key not in ["solar_birthday", "lunar_birthday"]:
                 continue
 
@@ -260,51 +914,83 @@ class LunarCalendarApp:
                 birthday_description = (
                     "{name} {year} 年生日🎂快乐! (age: {age}, birthday: {birthday})"
                 )
+                if self.compress:
+                    birthday_summary = "{name} 生日🎂快乐!"
+                    birthday_description = "{name} 生日🎂快乐! (birthday: {birthday})"
             elif event_key == "lunar_birthday":
                 birthday = start_datetime_in_lunar
                 birthday_summary = "{name} {year} 年农历生日🎂快乐!"
                 birthday_description = (
                     "{name} {year} 年农历生日🎂快乐! (age: {age}, birthday: {birthday})"
                 )
+                if self.compress:
+                    birthday_summary = "{name} 农历生日🎂快乐!"
+                    birthday_description = (
+                        "{name} 农历生日🎂快乐! (birthday: {birthday})"
+                    )
 
             summary = item_config.get("summary") or birthday_summary
             description = item_config.get("description") or birthday_description
 
-            for year in range(year_start, year_end + 1):
+            years = range(year_start, year_end + 1)
+            if event_key == "solar_birthday":
+                event_datetimes = [start_datetime.replace(year=year) for year in years]
+            elif event_key == "lunar_birthday":
+                event_datetimes = get_future_solar_datetimes(
+                    start_datetime, year_start, year_end
+                )
+
+            occurrences = []
+            for year, dtstart in zip(years, offset_table.to_utc(event_datetimes)):
                 age = year - start_datetime.year
-                if event_key == "solar_birthday":
-                    event_datetime = start_datetime.replace(year=year)
-                elif event_key == "lunar_birthday":
-                    event_datetime = get_future_solar_datetime(start_datetime, year)
-
-                dtstart = local_datetime_to_utc_datetime(event_datetime)
-                dtend = dtstart + event_hours
-                reminders_datetime = [
-                    dtstart - datetime.timedelta(days=d)
-                    for d in item_config.get("reminders")
-                ]
+                occurrences.append(
+                    (
+                        dtstart,
+                        self._safe_format(summary, name=name, year=year),
+                        self._safe_format(
+                            description,
+                            name=name,
+                            year=year,
+                            age=age,
+                            birthday=birthday,
+                        ),
+                    )
+                )
+
+            if self.compress:
+                rrule = rrule_dtstarts = None
+                if event_key == "solar_birthday" and occurrences:
+                    first = occurrences[0][0]
+                    rrule = f"FREQ=YEARLY;COUNT={len(occurrences)}"
+                    rrule_dtstarts = [first.replace(year=year) for year in years]
+                self._add_series(
+                    occurrences,
+                    event_hours,
+                    reminders=item_config.get("reminders"),
+                    attendees=item_config.get("attendees"),
+                    uid_seed=(name, start_date, event_key),
+                    rrule=rrule,
+                    rrule_dtstarts=rrule_dtstarts,
+                )
+                continue
+
+            for year, (dtstart, event_summary, event_description) in zip(
+                years, occurrences
+            ):
                 self._add_event(
                     dtstart=dtstart,
-                    dtend=dtend,
-                    summary=self._safe_format(
-                        summary,
-                        name=name,
-                        year=year,
-                    ),
-                    description=self._safe_format(
-                        description,
-                        name=name,
-                        year=year,
-                        age=age,
-                        birthday=birthday,
-                    ),
-                    reminders=reminders_datetime,
+                    dtend=dtstart + event_hours,
+                    summary=event_summary,
+                    description=event_description,
+                    reminders=item_config.get("reminders"),
                     attendees=item_config.get("attendees"),
+                    uid_seed=(name, start_date, event_key, year),
                 )
 
     def _add_holiday_event(self, global_config: dict) -> None:
         """Add public holiday events."""
-        timezone = zoneinfo.ZoneInfo(global_config.get("timezone"))
+        timezone = get_timezone(global_config.get("timezone"))
+        offset_table = get_offset_table(global_config.get("timezone"))
         event_time = global_config.get("event_time")
         event_hours = datetime.timedelta(hours=global_config.get("event_hours"))
 
@@ -315,22 +1001,41 @@ class LunarCalendarApp:
             if holiday_key not in global_config.get("holiday_keys") or []:
                 continue
 
-            for year in range(year_start, year_end + 1):
-                event_date = holiday.get_date(year)
-                event_datetime = get_local_datetime(event_date, event_time, timezone)
-                dtstart = local_datetime_to_utc_datetime(event_datetime)
-                dtend = dtstart + event_hours
-                reminders_datetime = [
-                    dtstart - datetime.timedelta(days=d)
-                    for d in global_config.get("reminders")
+            years = range(year_start, year_end + 1)
+            dtstarts = offset_table.to_utc(
+                get_local_datetime(holiday.get_date(year), event_time, timezone)
+                for year in years
+            )
+
+            if self.compress and dtstarts:
+                # the rule is expanded in UTC, it only matches when the event
+                # does not cross midnight UTC and its UTC time is stable
+                rrule_dtstarts = [
+                    datetime.datetime.combine(
+                        holiday.get_date(year), dtstarts[0].timetz()
+                    )
+                    for year in years
                 ]
+                self._add_series(
+                    [(d, holiday.summary, holiday.description) for d in dtstarts],
+                    event_hours,
+                    reminders=global_config.get("reminders"),
+                    attendees=global_config.get("attendees"),
+                    uid_seed=(holiday_key,),
+                    rrule=f"FREQ=YEARLY;COUNT={len(dtstarts)};{holiday.rrule}",
+                    rrule_dtstarts=rrule_dtstarts,
+                )
+                continue
+
+            for year, dtstart in zip(years, dtstarts):
                 self._add_event(
                     dtstart=dtstart,
-                    dtend=dtend,
+                    dtend=dtstart + event_hours,
                     summary=holiday.summary,
                     description=holiday.description,
-                    reminders=reminders_datetime,
+                    reminders=global_config.get("reminders"),
                     attendees=global_config.get("attendees"),
+                    uid_seed=(holiday_key, year),
                 )
 
     def _safe_format(self, template: str, **kwargs: Any) -> str:
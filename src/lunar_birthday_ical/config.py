@@ -11,12 +11,18 @@ default_config = {
         "event_hours": 2,
         "reminders": [1, 3],
         "attendees": [],
+        "deterministic": False,
+        "dtstamp": "",
+        "compress": False,
     },
+    "roster": "",
     "pastebin": {
         "enabled": False,
         "base_url": "https://komj.uk",
         "expiration": "",
         "manage_url": "",
+        "timeout": 30,
+        "max_retries": 3,
     },
     "github_gist": {
         "enabled": False,
@@ -24,6 +30,8 @@ default_config = {
         "gist_id": "",
         "description": "Lunar Birthday iCalendar",
         "public": False,
+        "timeout": 30,
+        "max_retries": 3,
     },
     "events": [],
 }
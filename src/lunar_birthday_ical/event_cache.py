@@ -0,0 +1,143 @@
+"""Content-addressed on-disk cache of rendered VEVENT blocks."""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# bump when the rendered output of an unchanged item config changes
+CACHE_VERSION = 2
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Return the content hash of JSON-serializable parts, e.g. item configs."""
+    payload = json.dumps(
+        [CACHE_VERSION, *parts], sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EventCache:
+    """On-disk cache mapping a content hash to the VEVENT blocks rendered for it.
+
+    Entries are plain files named after their key. Reading an entry refreshes
+    its modification time, and prune() evicts the least recently used entries
+    once the cache exceeds max_entries or max_bytes. The files of the
+    subdirectories, such as the compiled plans of load_plan, count as
+    entries too. An instance can be shared by several threads.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_entries: int = 100_000,
+        max_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        """Initialize the cache.
+
+        Args:
+            directory: Directory holding the cache entries, created on demand.
+            max_entries: Maximum number of entries kept by prune().
+            max_bytes: Maximum total size of the entries kept by prune().
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.ics"
+
+    def contains(self, key: str) -> bool:
+        """Return whether key is cached, without touching the statistics."""
+        return self._path(key).exists()
+
+    def get(self, key: str) -> str | None:
+        """Return the cached blocks of key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with path.open(encoding="utf-8", newline="") as f:
+                text = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        """Store the rendered blocks of key.
+
+        The entry is written to a temporary file first and then renamed, so
+        concurrent readers never see a partially written entry.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def prune(self) -> int:
+        """Evict least recently used entries until the cache fits its limits.
+
+        Returns:
+            The number of evicted entries.
+        """
+        if not self.directory.is_dir():
+            return 0
+
+        entries = []
+        for path in self.directory.rglob("*"):
+            # skips the files being written by put() and load_plan
+            if path.suffix == ".tmp" or not path.is_file():
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total_bytes = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if (
+                len(entries) - evicted <= self.max_entries
+                and total_bytes <= self.max_bytes
+            ):
+                break
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+            evicted += 1
+
+        with self._lock:
+            self.evictions += evicted
+        if evicted:
+            logger.debug(
+                "evicted %d entries from event cache %s", evicted, self.directory
+            )
+        return evicted
+
+    def stats(self) -> dict[str, int]:
+        """Return the hit/miss/eviction statistics of this process."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
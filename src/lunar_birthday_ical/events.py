@@ -0,0 +1,213 @@
+"""Compact intermediate representation of the generated events.
+
+Generation produces EventRecord objects instead of icalendar components. The
+repeated values of a calendar (summaries, descriptions, reminders and
+attendees) are interned once per EventList and records only hold their
+index, so that events can be sorted, deduplicated or sharded cheaply before
+an output backend serializes them.
+"""
+
+import datetime
+import zlib
+from collections.abc import Callable, Hashable, Iterator
+from typing import Any
+
+
+class InternTable:
+    """Append-only table assigning a stable index to each distinct value."""
+
+    __slots__ = ("values", "_index")
+
+    def __init__(self) -> None:
+        self.values: list[Any] = []
+        self._index: dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, index: int) -> Any:
+        return self.values[index]
+
+    def intern(self, value: Hashable) -> int:
+        """Return the index of value, adding it to the table if needed."""
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.values)
+            self.values.append(value)
+        return index
+
+    def __getstate__(self) -> list[Any]:
+        return self.values
+
+    def __setstate__(self, values: list[Any]) -> None:
+        self.values = values
+        self._index = {value: index for index, value in enumerate(values)}
+
+
+class EventRecord:
+    """A single VEVENT, summary to attendees are InternTable indexes."""
+
+    __slots__ = (
+        "uid",
+        "dtstart",
+        "dtend",
+        "summary",
+        "description",
+        "reminders",
+        "attendees",
+        "recurrence_id",
+        "rrule",
+        "rdates",
+    )
+
+    def __init__(
+        self,
+        uid: str,
+        dtstart: datetime.datetime,
+        dtend: datetime.datetime,
+        summary: int,
+        description: int,
+        reminders: int,
+        attendees: int,
+        recurrence_id: datetime.datetime | None = None,
+        rrule: str | None = None,
+        rdates: tuple[datetime.datetime, ...] | None = None,
+    ) -> None:
+        self.uid = uid
+        self.dtstart = dtstart
+        self.dtend = dtend
+        self.summary = summary
+        self.description = description
+        self.reminders = reminders
+        self.attendees = attendees
+        self.recurrence_id = recurrence_id
+        self.rrule = rrule
+        self.rdates = rdates
+
+    def __getstate__(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state: tuple) -> None:
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __repr__(self) -> str:
+        return f"EventRecord(uid={self.uid!r}, dtstart={self.dtstart.isoformat()})"
+
+
+class EventList:
+    """Ordered list of EventRecord sharing one InternTable."""
+
+    def __init__(self, table: InternTable | None = None) -> None:
+        """Initialize an empty list.
+
+        Args:
+            table: Table the values of the records are interned in, a new
+                one by default.
+        """
+        self.table = table if table is not None else InternTable()
+        self.records: list[EventRecord] = []
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[EventRecord]:
+        return iter(self.records)
+
+    def add(
+        self,
+        uid: str,
+        dtstart: datetime.datetime,
+        dtend: datetime.datetime,
+        summary: str,
+        description: str,
+        reminders: list[int | datetime.datetime],
+        attendees: list[str],
+        recurrence_id: datetime.datetime | None = None,
+        rrule: str | None = None,
+        rdates: list[datetime.datetime] | None = None,
+    ) -> EventRecord:
+        """Intern the values of an event and append its record."""
+        intern = self.table.intern
+        record = EventRecord(
+            uid=uid,
+            dtstart=dtstart,
+            dtend=dtend,
+            summary=intern(summary),
+            description=intern(description),
+            reminders=intern(tuple(reminders)),
+            attendees=intern(tuple(attendees)),
+            recurrence_id=recurrence_id,
+            rrule=rrule,
+            rdates=tuple(rdates) if rdates else None,
+        )
+        self.records.append(record)
+        return record
+
+    def extend(self, other: "EventList") -> None:
+        """Append the records of other, re-interning their values."""
+        if other.table is self.table:
+            self.records.extend(other.records)
+            return
+
+        mapping = [self.table.intern(value) for value in other.table.values]
+        for record in other.records:
+            self.records.append(
+                EventRecord(
+                    uid=record.uid,
+                    dtstart=record.dtstart,
+                    dtend=record.dtend,
+                    summary=mapping[record.summary],
+                    description=mapping[record.description],
+                    reminders=mapping[record.reminders],
+                    attendees=mapping[record.attendees],
+                    recurrence_id=record.recurrence_id,
+                    rrule=record.rrule,
+                    rdates=record.rdates,
+                )
+            )
+
+    def sort(self, key: Callable[[EventRecord], Any] | None = None) -> None:
+        """Sort the records in place, by start then UID by default.
+
+        Overrides of a recurring event start after its master event, so they
+        still follow it once sorted.
+        """
+        if key is None:
+
+            def key(record: EventRecord) -> tuple:
+                return (record.dtstart, record.uid)
+
+        self.records.sort(key=key)
+
+    def dedup(self) -> int:
+        """Drop the records repeating the UID and RECURRENCE-ID of an earlier one.
+
+        Returns:
+            The number of dropped records.
+        """
+        seen = set()
+        records = []
+        for record in self.records:
+            key = (record.uid, record.recurrence_id)
+            if key not in seen:
+                seen.add(key)
+                records.append(record)
+        dropped = len(self.records) - len(records)
+        self.records = records
+        return dropped
+
+    def shard(self, count: int) -> list["EventList"]:
+        """Split the records into count lists by UID, keeping their order.
+
+        The events of a recurring series share their UID, so a series is
+        never split across shards. Shards share the table of this list.
+        """
+        if count <= 0:
+            raise ValueError("count must be a positive integer")
+
+        shards = [EventList(self.table) for _ in range(count)]
+        for record in self.records:
+            shard = zlib.crc32(record.uid.encode("utf-8")) % count
+            shards[shard].records.append(record)
+        return shards
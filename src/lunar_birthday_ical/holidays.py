@@ -21,7 +21,7 @@ class Month:
 
 
 class Holiday(ABC):
-    def __init__(self, key: str, summary: str, description: str):
+    def __init__(self, key: str, summary: str, description: str, rrule: str):
         """
         Initialize a Holiday instance.
 
@@ -29,10 +29,13 @@ class Holiday(ABC):
             key: Unique identifier for the holiday.
             summary: The summary (title) of the holiday.
             description: A detailed description of the holiday.
+            rrule: The BY* rule parts of a yearly RRULE matching get_date,
+                e.g. "BYDAY=2SU;BYMONTH=5".
         """
         self.key = key
         self.summary = summary
         self.description = description
+        self.rrule = rrule
 
     @staticmethod
     def get_weekdays_in_month(
@@ -82,6 +85,7 @@ class MothersDay(Holiday):
             key="mothers_day",
             summary="Mother's Day",
             description="Mother's Day is a celebration honoring the mother of the family or individual, as well as motherhood, maternal bonds, and the influence of mothers in society. It is celebrated on different days in many parts of the world, most commonly in the months of March or May.",
+            rrule="BYDAY=2SU;BYMONTH=5",
         )
 
     def get_date(self, year: int) -> datetime.date:
@@ -94,6 +98,7 @@ class FathersDay(Holiday):
             key="fathers_day",
             summary="Father's Day",
             description="Father's Day is a holiday of honoring fatherhood and paternal bonds, as well as the influence of fathers in society. In Catholic countries of Europe, it has been celebrated on March 19 as Saint Joseph's Day since the Middle Ages. In the United States, Father's Day was founded by Sonora Smart Dodd, and celebrated on the third Sunday of June for the first time in 1910.",
+            rrule="BYDAY=3SU;BYMONTH=6",
         )
 
     def get_date(self, year: int) -> datetime.date:
@@ -106,6 +111,7 @@ class ThanksgivingDay(Holiday):
             key="thanksgiving_day",
             summary="Thanksgiving Day",
             description="Thanksgiving is a national holiday celebrated on various dates in the United States, Canada, Grenada, Saint Lucia, and Liberia. It began as a day of giving thanks for the blessing of the harvest and of the preceding year.",
+            rrule="BYDAY=4TH;BYMONTH=11",
         )
 
     def get_date(self, year: int) -> datetime.date:
@@ -0,0 +1,160 @@
+"""HTTP clients shared by the uploads of a run, with connection reuse stats.
+
+Uploading the calendars of many config files with one-shot requests costs a
+TCP and TLS handshake per upload. A SharedHTTPClient instead creates one
+pooled keep-alive httpx.Client on first use, which the uploaders of every
+config file share, and ConnectionStats counts the requests and the new
+connections of the clients through the httpcore trace extension.
+
+httpx is only imported when a client is created.
+"""
+
+import importlib.util
+import logging
+import threading
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONNECTIONS = 10
+# seconds to establish a connection, or to wait for one from the pool
+DEFAULT_CONNECT_TIMEOUT = 10.0
+# seconds an idle connection is kept open, long enough to span the
+# generation of the next calendar
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+
+# httpcore trace events of a new connection
+CONNECT_EVENTS = (
+    "connection.connect_tcp.complete",
+    "connection.connect_unix_socket.complete",
+)
+TLS_EVENT = "connection.start_tls.complete"
+
+
+class ConnectionStats:
+    """Thread-safe counts of the requests and connections of HTTP clients."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self._lock = threading.Lock()
+
+    def _trace(self, event_name: str, info: dict[str, Any]) -> None:
+        if event_name in CONNECT_EVENTS:
+            with self._lock:
+                self.connections += 1
+        elif event_name == TLS_EVENT:
+            with self._lock:
+                self.tls_handshakes += 1
+
+    async def _atrace(self, event_name: str, info: dict[str, Any]) -> None:
+        self._trace(event_name, info)
+
+    def on_request(self, request: "httpx.Request") -> None:
+        """Event hook of httpx.Client, tracing the connection of the request."""
+        request.extensions["trace"] = self._trace
+        with self._lock:
+            self.requests += 1
+
+    async def on_request_async(self, request: "httpx.Request") -> None:
+        """Event hook of httpx.AsyncClient, see on_request."""
+        request.extensions["trace"] = self._atrace
+        with self._lock:
+            self.requests += 1
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the counts, reused is the number of requests sent over an
+        already open connection."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "tls_handshakes": self.tls_handshakes,
+                "reused": max(0, self.requests - self.connections),
+            }
+
+
+def client_options(
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+    http2: bool = False,
+    stats: ConnectionStats | None = None,
+    asynchronous: bool = False,
+) -> dict[str, Any]:
+    """Return the keyword arguments of a pooled httpx.Client or AsyncClient.
+
+    Args:
+        max_connections: Maximum number of connections, all of them are
+            kept alive.
+        connect_timeout: Seconds to establish a connection, or to wait for a
+            connection from the pool. Uploaders set the read and write
+            timeouts of their requests.
+        keepalive_expiry: Seconds an idle connection is kept open.
+        http2: Enable HTTP/2, ignored with a warning when the h2 package is
+            not installed.
+        stats: Optional stats counting the requests and connections.
+        asynchronous: Whether the options are those of an AsyncClient.
+
+    Returns:
+        The keyword arguments.
+    """
+    import httpx
+
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP/2 requires the h2 package (httpx[http2]), using HTTP/1.1")
+        http2 = False
+
+    options: dict[str, Any] = {
+        "limits": httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        "timeout": httpx.Timeout(None, connect=connect_timeout, pool=connect_timeout),
+        "http2": http2,
+    }
+    if stats is not None:
+        hook = stats.on_request_async if asynchronous else stats.on_request
+        options["event_hooks"] = {"request": [hook]}
+    return options
+
+
+class SharedHTTPClient:
+    """Pooled httpx.Client created on first use and shared between threads."""
+
+    def __init__(self, **options: Any) -> None:
+        """Initialize the shared client, without creating it.
+
+        Args:
+            options: Keyword arguments of client_options.
+        """
+        self.options = options
+        self._client: "httpx.Client | None" = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "SharedHTTPClient":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def get(self) -> "httpx.Client":
+        """Return the client, creating it on first use."""
+        with self._lock:
+            if self._client is None:
+                import httpx
+
+                self._client = httpx.Client(**client_options(**self.options))
+            return self._client
+
+    def close(self) -> None:
+        """Close the client and its connections, if it was created."""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
@@ -0,0 +1,157 @@
+"""Lunar calendar lookups backed by a precomputed table and lunar_python.
+
+Dates covered by the precomputed table (see lunar_table.py) are resolved with
+plain integer arithmetic. Anything outside of it falls back to lunar_python,
+whose LunarYear / Lunar objects run the full astronomical computation, so
+those lookups go through bounded process-wide LRU caches.
+"""
+
+import datetime
+from typing import TYPE_CHECKING
+
+from lunar_birthday_ical.cache import LRUCache
+from lunar_birthday_ical.lunar_table import get_lunar_table
+
+# lunar_python is only imported on a table miss
+if TYPE_CHECKING:
+    from lunar_python import Lunar, LunarMonth, LunarYear
+
+CHINESE_NUMBER = "〇一二三四五六七八九"
+CHINESE_MONTH = (
+    "",
+    "正",
+    "二",
+    "三",
+    "四",
+    "五",
+    "六",
+    "七",
+    "八",
+    "九",
+    "十",
+    "冬",
+    "腊",
+)
+CHINESE_DAY = (
+    "",
+    *("初" + c for c in "一二三四五六七八九十"),
+    *("十" + c for c in "一二三四五六七八九"),
+    "二十",
+    *("廿" + c for c in "一二三四五六七八九"),
+    "三十",
+)
+
+lunar_year_cache = LRUCache(maxsize=512)
+lunar_month_cache = LRUCache(maxsize=512 * 13)
+lunar_day_cache = LRUCache(maxsize=16384)
+solar_day_cache = LRUCache(maxsize=16384)
+
+CACHES: dict[str, LRUCache] = {
+    "lunar_year": lunar_year_cache,
+    "lunar_month": lunar_month_cache,
+    "lunar_day": lunar_day_cache,
+    "solar_day": solar_day_cache,
+}
+
+
+def get_lunar_year(year: int) -> "LunarYear":
+    """Return the LunarYear for a lunar year number."""
+    from lunar_python import LunarYear
+
+    return lunar_year_cache.get_or_compute(year, lambda: LunarYear.fromYear(year))
+
+
+def get_lunar_month(year: int, month: int) -> "LunarMonth | None":
+    """Return the LunarMonth of a lunar year, leap months use negative numbers.
+
+    Returns:
+        The LunarMonth, or None if the year has no such month.
+    """
+    return lunar_month_cache.get_or_compute(
+        (year, month), lambda: get_lunar_year(year).getMonth(month)
+    )
+
+
+def get_lunar_day(year: int, month: int, day: int) -> "Lunar":
+    """Return the Lunar day for a lunar date, leap months use negative numbers."""
+    from lunar_python import Lunar
+
+    return lunar_day_cache.get_or_compute(
+        (year, month, day), lambda: Lunar.fromYmd(year, month, day)
+    )
+
+
+def solar_to_lunar(solar_date: datetime.date) -> "Lunar":
+    """Return the Lunar day of a solar date, the time of day is ignored."""
+    from lunar_python import Lunar
+
+    # datetime.datetime is a subclass of datetime.date, normalize the key
+    key = solar_date.toordinal()
+    return solar_day_cache.get_or_compute(
+        key,
+        lambda: Lunar.fromDate(datetime.datetime.fromordinal(key)),
+    )
+
+
+def solar_to_lunar_ymd(solar_date: datetime.date) -> tuple[int, int, int]:
+    """Return the lunar (year, month, day) of a solar date.
+
+    Leap months use negative numbers, the time of day is ignored.
+    """
+    lunar_ymd = get_lunar_table().to_lunar(solar_date)
+    if lunar_ymd is None:
+        lunar = solar_to_lunar(solar_date)
+        lunar_ymd = (lunar.getYear(), lunar.getMonth(), lunar.getDay())
+    return lunar_ymd
+
+
+def lunar_to_solar(year: int, month: int, day: int) -> datetime.date:
+    """Return the solar date of a lunar date, leap months use negative numbers."""
+    table = get_lunar_table()
+    if table.has_year(year):
+        return table.to_solar(year, month, day)
+
+    solar = get_lunar_day(year, month, day).getSolar()
+    return datetime.date(solar.getYear(), solar.getMonth(), solar.getDay())
+
+
+def lunar_leap_month(year: int) -> int:
+    """Return the leap month of a lunar year, 0 when there is none."""
+    table = get_lunar_table()
+    if table.has_year(year):
+        return table.leap_month(year)
+    return get_lunar_year(year).getLeapMonth()
+
+
+def lunar_month_days(year: int, month: int) -> int | None:
+    """Return the number of days of a lunar month, leap months use negative numbers.
+
+    Returns:
+        29 or 30, or None if the year has no such month.
+    """
+    table = get_lunar_table()
+    if table.has_year(year):
+        return table.month_days(year, month)
+    lunar_month = get_lunar_month(year, month)
+    return lunar_month.getDayCount() if lunar_month is not None else None
+
+
+def format_lunar(year: int, month: int, day: int) -> str:
+    """Format a lunar date in Chinese, e.g. 二〇二〇年闰四月初一.
+
+    The output is the same as lunar_python's Lunar.toString().
+    """
+    year_in_chinese = "".join(CHINESE_NUMBER[int(c)] for c in str(year))
+    month_in_chinese = ("闰" if month < 0 else "") + CHINESE_MONTH[abs(month)]
+    return f"{year_in_chinese}年{month_in_chinese}月{CHINESE_DAY[day]}"
+
+
+def cache_stats() -> dict[str, dict[str, int]]:
+    """Return hit/miss/eviction statistics of every lunar lookup cache."""
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+
+def cache_clear() -> None:
+    """Clear every lunar lookup cache."""
+    for cache in CACHES.values():
+        cache.clear()
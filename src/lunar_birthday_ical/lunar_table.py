@@ -0,0 +1,233 @@
+"""Precomputed lunar calendar table shipped as package data.
+
+The table holds one fixed-size record per lunar year:
+
+- the solar date (proleptic Gregorian ordinal) of the lunar new year,
+- a bitmask of month lengths, bit i set means the i-th month of the year
+  (in chronological order, leap month included) has 30 days instead of 29,
+- the leap month number, 0 when the year has no leap month.
+
+The solar date of any lunar month start is then the new year ordinal plus
+29 days per preceding month plus the number of preceding 30-day months, so
+every lookup is plain integer arithmetic on the memory-mapped file, nothing
+is parsed at import time.
+
+Regenerate the table with ``python -m lunar_birthday_ical.lunar_table``.
+"""
+
+import datetime
+import importlib.resources
+import mmap
+import struct
+import threading
+from pathlib import Path
+
+HEADER = struct.Struct("<4sHHH6x")
+RECORD = struct.Struct("<IHBx")
+MAGIC = b"LBIT"
+VERSION = 1
+
+FIRST_YEAR = 1900
+LAST_YEAR = 2100
+
+TABLE_PATH = Path("data") / "lunar_table.bin"
+
+
+class LunarTable:
+    """Read-only view over a memory-mapped lunar calendar table."""
+
+    def __init__(self, buffer: bytes | mmap.mmap) -> None:
+        """Initialize the table from a bytes-like buffer.
+
+        Args:
+            buffer: Table content, usually a read-only mmap of the data file.
+
+        Raises:
+            ValueError: If the buffer is not a lunar table of a known version.
+        """
+        magic, version, first_year, year_count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Unsupported lunar table format")
+        if len(buffer) < HEADER.size + year_count * RECORD.size:
+            raise ValueError("Truncated lunar table")
+
+        self.buffer = buffer
+        self.first_year: int = first_year
+        self.last_year: int = first_year + year_count - 1
+
+    @classmethod
+    def open(cls, path: Path) -> "LunarTable":
+        """Memory-map a lunar table file.
+
+        Args:
+            path: Path to the table file.
+
+        Returns:
+            The LunarTable backed by the mapped file.
+        """
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer)
+
+    def has_year(self, year: int) -> bool:
+        """Return whether the lunar year is covered by the table."""
+        return self.first_year <= year <= self.last_year
+
+    def _record(self, year: int) -> tuple[int, int, int]:
+        offset = HEADER.size + (year - self.first_year) * RECORD.size
+        return RECORD.unpack_from(self.buffer, offset)
+
+    @staticmethod
+    def _month_index(leap_month: int, month: int) -> int | None:
+        # 月份在当年的序号, 闰月排在同名月份之后
+        if month > 0:
+            if month > 12:
+                return None
+            return month - 1 if leap_month == 0 or month <= leap_month else month
+        if -month == leap_month:
+            return leap_month
+        return None
+
+    @staticmethod
+    def _month_number(leap_month: int, index: int) -> int:
+        if leap_month == 0 or index < leap_month:
+            return index + 1
+        if index == leap_month:
+            return -leap_month
+        return index
+
+    def leap_month(self, year: int) -> int:
+        """Return the leap month of a lunar year, 0 when there is none."""
+        return self._record(year)[2]
+
+    def month_days(self, year: int, month: int) -> int | None:
+        """Return the number of days of a lunar month.
+
+        Args:
+            year: Lunar year, must be covered by the table.
+            month: Lunar month, leap months use negative numbers.
+
+        Returns:
+            29 or 30, or None if the year has no such month.
+        """
+        _, lengths, leap_month = self._record(year)
+        index = self._month_index(leap_month, month)
+        if index is None:
+            return None
+        return 30 if lengths >> index & 1 else 29
+
+    def year_days(self, year: int) -> int:
+        """Return the number of days of a lunar year."""
+        _, lengths, leap_month = self._record(year)
+        months = 13 if leap_month else 12
+        return 29 * months + lengths.bit_count()
+
+    def to_solar(self, year: int, month: int, day: int) -> datetime.date:
+        """Convert a lunar date to a solar date.
+
+        Args:
+            year: Lunar year, must be covered by the table.
+            month: Lunar month, leap months use negative numbers.
+            day: Lunar day.
+
+        Returns:
+            The solar date.
+
+        Raises:
+            ValueError: If the lunar month or day does not exist.
+        """
+        new_year, lengths, leap_month = self._record(year)
+        index = self._month_index(leap_month, month)
+        if index is None:
+            raise ValueError(f"wrong lunar month {month} of year {year}")
+        month_days = 30 if lengths >> index & 1 else 29
+        if not 1 <= day <= month_days:
+            raise ValueError(f"wrong lunar day {day} of month {month}")
+
+        month_start = new_year + 29 * index + (lengths & ((1 << index) - 1)).bit_count()
+        return datetime.date.fromordinal(month_start + day - 1)
+
+    def to_lunar(self, solar_date: datetime.date) -> tuple[int, int, int] | None:
+        """Convert a solar date to a lunar date.
+
+        Args:
+            solar_date: Solar date, the time of day is ignored.
+
+        Returns:
+            Tuple of (year, month, day) with leap months as negative numbers,
+            or None if the date falls outside the table.
+        """
+        ordinal = solar_date.toordinal()
+        # 农历新年总是在公历 1 月下旬到 2 月中下旬之间
+        year = solar_date.year
+        if not self.has_year(year) or ordinal < self._record(year)[0]:
+            year -= 1
+        if not self.has_year(year):
+            return None
+
+        new_year, lengths, leap_month = self._record(year)
+        offset = ordinal - new_year
+        if offset < 0:
+            return None
+
+        months = 13 if leap_month else 12
+        for index in range(months):
+            month_days = 30 if lengths >> index & 1 else 29
+            if offset < month_days:
+                return (year, self._month_number(leap_month, index), offset + 1)
+            offset -= month_days
+        return None
+
+
+_table: LunarTable | None = None
+_table_lock = threading.Lock()
+
+
+def get_lunar_table() -> LunarTable:
+    """Return the lunar table shipped with the package, mapped on first use."""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                resource = importlib.resources.files(__package__).joinpath(
+                    TABLE_PATH.as_posix()
+                )
+                with importlib.resources.as_file(resource) as path:
+                    _table = LunarTable.open(path)
+    return _table
+
+
+def build_table(
+    path: Path, first_year: int = FIRST_YEAR, last_year: int = LAST_YEAR
+) -> None:
+    """Compute the lunar table with lunar_python and write it to path.
+
+    Args:
+        path: Output file path.
+        first_year: First lunar year covered by the table.
+        last_year: Last lunar year covered by the table.
+    """
+    from lunar_python import LunarYear, Solar
+
+    chunks = [HEADER.pack(MAGIC, VERSION, first_year, last_year - first_year + 1)]
+    for year in range(first_year, last_year + 1):
+        lunar_year = LunarYear.fromYear(year)
+        months = lunar_year.getMonthsInYear()
+
+        solar = Solar.fromJulianDay(months[0].getFirstJulianDay())
+        new_year = datetime.date(
+            solar.getYear(), solar.getMonth(), solar.getDay()
+        ).toordinal()
+        lengths = 0
+        for index, month in enumerate(months):
+            if month.getDayCount() == 30:
+                lengths |= 1 << index
+
+        chunks.append(RECORD.pack(new_year, lengths, lunar_year.getLeapMonth()))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"".join(chunks))
+
+
+if __name__ == "__main__":
+    build_table(Path(__file__).parent / TABLE_PATH)
@@ -3,17 +3,25 @@
 # author: ak1ra
 # date: 2025-01-24
 
+# Only the standard library is imported at module level, each mode imports
+# what it needs, so that date conversions and shell completion start fast.
 import argparse
+import datetime
+import logging
+import os
+import sys
 import time
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-import argcomplete
-from chaos_utils.logging import setup_json_logger
-from lunar_python import Lunar, Solar
+if TYPE_CHECKING:
+    from lunar_birthday_ical.event_cache import EventCache
+    from lunar_birthday_ical.http_client import SharedHTTPClient
+    from lunar_birthday_ical.metrics import MetricsRegistry
+    from lunar_birthday_ical.upload_state import UploadState
+    from lunar_birthday_ical.uploader import AsyncUploadPipeline, GistBatch
 
-from lunar_birthday_ical.calendar import LunarCalendarApp
-
-logger = setup_json_logger(__name__, file_logging=True)
+logger = logging.getLogger(__name__)
 
 
 def create_parser() -> argparse.ArgumentParser:
@@ -32,6 +40,109 @@ def create_parser() -> argparse.ArgumentParser:
         metavar="config.yaml",
         help="config file for iCalendar, checkout config/example-lunar-birthday.yaml for example.",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write events to the .ics file as they are generated, instead of building the whole calendar in memory.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Generate the events of the items in N worker processes, default: %(default)s.",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Process up to N config files concurrently, default: %(default)s.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        metavar="DIR",
+        help="Cache compiled configs and rendered events of each item in DIR, so that only changed items are regenerated.",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=256,
+        metavar="MB",
+        help="Evict least recently used cache entries beyond this size, default: %(default)s.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Log the time spent in each phase of the generation of each config file.",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        type=Path,
+        metavar="DIR",
+        help="Dump cProfile statistics of each config file to DIR/<config>.pstats, requires --workers 1.",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        type=int,
+        nargs="?",
+        const=10,
+        default=0,
+        metavar="TOP",
+        help="Log the peak and retained memory of each phase of each config file, with its TOP allocation sites (default: %(const)s), requires --workers 1.",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=Path,
+        metavar="FILE",
+        help="Write Prometheus metrics of the run to FILE, for the node_exporter textfile collector.",
+    )
+    parser.add_argument(
+        "--upload-concurrency",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Upload calendars in the background, up to N at a time, overlapping the uploads of all config files. By default each calendar is uploaded before processing the next one.",
+    )
+    parser.add_argument(
+        "--upload-state",
+        type=Path,
+        metavar="FILE",
+        help="Remember the content hash of the calendars uploaded to an existing paste or gist in FILE, and skip their upload while unchanged.",
+    )
+    parser.add_argument(
+        "--gist-batch",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Push the GitHub Gist uploads of all config files once they are generated, as the files of one request per N gist files (at most 300). Calendars of the same gist_id share its requests.",
+    )
+    parser.add_argument(
+        "--http-max-connections",
+        type=int,
+        metavar="N",
+        help="Maximum number of pooled HTTP connections shared by the uploads, kept alive between them (default: 10).",
+    )
+    parser.add_argument(
+        "--http-connect-timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Timeout to establish an HTTP connection or to wait for a pooled one (default: 10).",
+    )
+    parser.add_argument(
+        "--http-keepalive",
+        type=float,
+        metavar="SECONDS",
+        help="Time an idle pooled HTTP connection is kept open (default: 60).",
+    )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        help="Upload over HTTP/2 when the server supports it, requires the h2 package (httpx[http2]).",
+    )
 
     group = parser.add_mutually_exclusive_group()
     group.add_argument(
@@ -59,9 +170,10 @@ def handle_lunar_to_solar(ymd: list[int]) -> None:
     Args:
         ymd: List containing [year, month, day].
     """
-    lunar = Lunar.fromYmd(*ymd)
-    solar = lunar.getSolar()
-    logger.info("Lunar date %s is Solar %s", lunar.toString(), solar.toString())
+    from lunar_birthday_ical.lunar import format_lunar, lunar_to_solar
+
+    solar_date = lunar_to_solar(*ymd)
+    logger.info("Lunar date %s is Solar %s", format_lunar(*ymd), solar_date.isoformat())
 
 
 def handle_solar_to_lunar(ymd: list[int]) -> None:
@@ -70,37 +182,354 @@ def handle_solar_to_lunar(ymd: list[int]) -> None:
     Args:
         ymd: List containing [year, month, day].
     """
-    solar = Solar.fromYmd(*ymd)
-    lunar = solar.getLunar()
-    logger.info("Solar date %s is Lunar %s", solar.toString(), lunar.toString())
+    from lunar_birthday_ical.lunar import format_lunar, solar_to_lunar_ymd
 
+    solar_date = datetime.date(*ymd)
+    lunar_ymd = solar_to_lunar_ymd(solar_date)
+    logger.info(
+        "Solar date %s is Lunar %s", solar_date.isoformat(), format_lunar(*lunar_ymd)
+    )
 
-def process_config_files(config_files: list[Path]) -> None:
+
+def process_config_file(
+    config_path: Path,
+    stream: bool = False,
+    cache: "EventCache | None" = None,
+    jobs: int = 1,
+    profile: bool = False,
+    profile_dir: Path | None = None,
+    trace_memory: int = 0,
+    metrics: "MetricsRegistry | None" = None,
+    pipeline: "AsyncUploadPipeline | None" = None,
+    http_client: "SharedHTTPClient | None" = None,
+    upload_state: "UploadState | None" = None,
+    gist_batch: "GistBatch | None" = None,
+) -> float:
+    """Generate, save and upload the calendar of a single configuration file.
+
+    Args:
+        config_path: Path to the configuration file.
+        stream: Stream events to the output file while generating them.
+        cache: Optional cache of rendered events, compiled configs are
+            cached in its plans subdirectory.
+        jobs: Number of worker processes generating the events.
+        profile: Log the time spent in each phase of the generation.
+        profile_dir: Optional directory the cProfile statistics of the
+            generation are dumped to, as <config stem>.pstats.
+        trace_memory: Log the memory of the load, generate, save and upload
+            phases with this many top allocation sites, 0 disables tracing.
+        metrics: Optional registry the metrics of the config file are
+            recorded in.
+        pipeline: Optional pipeline the uploads are submitted to, they are
+            then still running when returning.
+        http_client: Optional pooled client shared with the uploads of other
+            config files.
+        upload_state: Optional state of the previous uploads, unchanged
+            calendars are not uploaded again.
+        gist_batch: Optional batch the GitHub Gist upload is added to, it is
+            then pushed once flushed.
+
+    Returns:
+        The elapsed time, in seconds.
+    """
+    from lunar_birthday_ical.calendar import LunarCalendarApp
+    from lunar_birthday_ical.profiling import NULL_TIMER, MemoryTracer, PhaseTimer
+
+    logger.debug("loading config file %s", config_path)
+    timer = PhaseTimer() if profile or metrics is not None else None
+    tracer = None
+    memory_phase = NULL_TIMER.phase
+    if trace_memory > 0:
+        tracer = MemoryTracer(top=trace_memory)
+        tracer.start()
+        memory_phase = tracer.phase
+    profiler = None
+    if profile_dir is not None:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    start = time.perf_counter()
+
+    try:
+        with memory_phase("load"):
+            app = LunarCalendarApp(
+                config_path,
+                stream=stream,
+                cache=cache,
+                jobs=jobs,
+                plan_cache=cache.directory / "plans" if cache is not None else None,
+                timer=timer,
+            )
+        with memory_phase("generate"):
+            app.generate()
+        with memory_phase("save"):
+            output_file = app.save()
+        with memory_phase("upload"):
+            uploads = app.upload(
+                output_file, pipeline, http_client, upload_state, gist_batch
+            )
+    finally:
+        elapsed = time.perf_counter() - start
+        if tracer is not None:
+            tracer.stop()
+            logger.info(
+                "memory profile of %s",
+                config_path,
+                extra={"config": str(config_path), "memory": tracer.phases},
+            )
+        if profiler is not None:
+            profiler.disable()
+            profile_dir.mkdir(parents=True, exist_ok=True)
+            stats_path = profile_dir / f"{config_path.stem}.pstats"
+            profiler.dump_stats(stats_path)
+            logger.info("cProfile statistics saved to %s", stats_path)
+
+    if metrics is not None:
+        config = str(config_path)
+        metrics.set("duration_seconds", elapsed, config=config)
+        for phase, values in timer.as_dict().items():
+            metrics.set(
+                "phase_duration_seconds", values["seconds"], config=config, phase=phase
+            )
+        for event_key, count in app.event_counts.items():
+            metrics.set("events", count, config=config, event_key=event_key)
+        metrics.set("output_bytes", output_file.stat().st_size, config=config)
+
+        upload_failures = app.upload_failures
+
+        def record_upload_failures(*_: object) -> None:
+            for service in ("pastebin", "github_gist"):
+                metrics.set(
+                    "upload_failures",
+                    upload_failures[service],
+                    config=config,
+                    service=service,
+                )
+
+        record_upload_failures()
+        # runs after the callback of the app counting the failure
+        for upload in uploads:
+            upload.add_done_callback(record_upload_failures)
+
+    if profile:
+        logger.info(
+            "profile of %s",
+            config_path,
+            extra={
+                "config": str(config_path),
+                "elapsed": round(elapsed, 6),
+                "phases": timer.as_dict(),
+            },
+        )
+    return elapsed
+
+
+def process_config_files(
+    config_files: list[Path],
+    stream: bool = False,
+    cache: "EventCache | None" = None,
+    jobs: int = 1,
+    workers: int = 1,
+    profile: bool = False,
+    profile_dir: Path | None = None,
+    trace_memory: int = 0,
+    metrics_file: Path | None = None,
+    upload_concurrency: int = 0,
+    http_options: dict[str, Any] | None = None,
+    upload_state: Path | None = None,
+    gist_batch: int = 0,
+) -> list[Path]:
     """Process list of configuration files.
 
+    Files are processed by a pool of worker threads, a failing file is logged
+    and does not prevent the other files from being processed. The lunar
+    conversion caches live in the process, so they are shared by all files.
+
     Args:
         config_files: List of paths to configuration files.
+        stream: Stream events to the output files while generating them.
+        cache: Optional cache of rendered events shared by all config files.
+        jobs: Number of worker processes generating the events of each file.
+        workers: Number of config files processed concurrently.
+        profile: Log the time spent in each phase of each config file.
+        profile_dir: Optional directory the cProfile statistics of each
+            config file are dumped to.
+        trace_memory: Number of top allocation sites of the memory profile
+            of each config file, 0 disables tracing.
+        metrics_file: Optional Prometheus textfile collector file the
+            metrics of the run are written to, even when config files failed.
+        upload_concurrency: Maximum number of concurrent uploads of an
+            AsyncUploadPipeline shared by all config files, 0 uploads each
+            calendar synchronously.
+        http_options: Optional keyword arguments of client_options, setting
+            the limits and timeouts of the pooled HTTP client shared by the
+            uploads of all config files.
+        upload_state: Optional state file of the previous uploads, the
+            calendars which did not change since are not uploaded again.
+        gist_batch: Maximum number of gist files pushed by a request of a
+            GistBatch shared by all config files, 0 uploads each calendar to
+            its gist on its own.
+
+    Returns:
+        The configuration files which failed to be processed.
     """
-    for file in config_files:
-        config_path = Path(file)
-        logger.debug("loading config file %s", config_path)
-        start = time.perf_counter()
+    import contextlib
+    from concurrent.futures import ThreadPoolExecutor
 
-        app = LunarCalendarApp(config_path)
-        app.generate()
-        output_file = app.save()
-        app.upload(output_file)
+    from lunar_birthday_ical.http_client import (
+        ConnectionStats,
+        SharedHTTPClient,
+        client_options,
+    )
 
-        elapsed = time.perf_counter() - start
-        logger.debug("iCalendar generation elapsed at %.6fs for %s", elapsed, config_path)
+    config_paths = [Path(file) for file in config_files]
+    failed = []
+    metrics = None
+    if metrics_file is not None:
+        from lunar_birthday_ical.metrics import MetricsRegistry
+
+        metrics = MetricsRegistry()
+
+    state = None
+    if upload_state is not None:
+        from lunar_birthday_ical.upload_state import UploadState
+
+        state = UploadState(upload_state)
+
+    batch = None
+    if gist_batch > 0:
+        from lunar_birthday_ical.uploader import GistBatch
+
+        batch = GistBatch(size=gist_batch)
+
+    connection_stats = ConnectionStats()
+    http_options = {**(http_options or {}), "stats": connection_stats}
+    # created on the first upload, so that httpx is not imported otherwise
+    http_client = SharedHTTPClient(**http_options)
+    pipeline = None
+    if upload_concurrency > 0:
+        from lunar_birthday_ical.uploader import AsyncUploadPipeline
+
+        pipeline = AsyncUploadPipeline(
+            concurrency=upload_concurrency,
+            **client_options(**http_options, asynchronous=True),
+        )
+
+    # the pipeline and the client are closed after the executor, once every
+    # upload completed
+    with (
+        http_client,
+        pipeline or contextlib.nullcontext(),
+        ThreadPoolExecutor(max_workers=workers) as executor,
+    ):
+        futures = [
+            executor.submit(
+                process_config_file,
+                config_path,
+                stream=stream,
+                cache=cache,
+                jobs=jobs,
+                profile=profile,
+                profile_dir=profile_dir,
+                trace_memory=trace_memory,
+                metrics=metrics,
+                pipeline=pipeline,
+                http_client=http_client,
+                upload_state=state,
+                gist_batch=batch,
+            )
+            for config_path in config_paths
+        ]
+        for config_path, future in zip(config_paths, futures):
+            try:
+                elapsed = future.result()
+            except Exception:
+                logger.exception("failed to process config file %s", config_path)
+                failed.append(config_path)
+            else:
+                logger.debug(
+                    "iCalendar generation elapsed at %.6fs for %s",
+                    elapsed,
+                    config_path,
+                )
+            if metrics is not None:
+                metrics.set(
+                    "config_success",
+                    int(config_path not in failed),
+                    config=str(config_path),
+                )
+        if batch is not None:
+            batch.flush()
+
+    if cache is not None:
+        cache.prune()
+        logger.debug("event cache stats: %s", cache.stats())
+
+    if state is not None:
+        state.save()
+
+    http_stats = connection_stats.as_dict()
+    if http_stats["requests"]:
+        logger.info(
+            "HTTP connections: %d requests over %d connections",
+            http_stats["requests"],
+            http_stats["connections"],
+            extra={"http": http_stats},
+        )
+
+    if metrics is not None:
+        from lunar_birthday_ical.lunar import cache_stats
+        from lunar_birthday_ical.timezones import offset_table_cache, timezone_cache
+
+        for name, stats in cache_stats().items():
+            metrics.record_cache(name, stats)
+        metrics.record_cache("timezone", timezone_cache.stats())
+        metrics.record_cache("offset_table", offset_table_cache.stats())
+        if cache is not None:
+            metrics.record_cache("events", cache.stats())
+        metrics.set("http_requests", http_stats["requests"])
+        metrics.set("http_connections", http_stats["connections"])
+        metrics.write(metrics_file)
+        logger.debug("metrics written to %s", metrics_file)
+
+    if failed:
+        logger.error(
+            "%d of %d config files failed: %s",
+            len(failed),
+            len(config_paths),
+            ", ".join(str(path) for path in failed),
+        )
+    return failed
+
+
+def get_http_options(args: argparse.Namespace) -> dict[str, Any]:
+    """Get the keyword arguments of client_options set on the command line."""
+    options = {
+        "max_connections": args.http_max_connections,
+        "connect_timeout": args.http_connect_timeout,
+        "keepalive_expiry": args.http_keepalive,
+    }
+    options = {key: value for key, value in options.items() if value is not None}
+    if args.http2:
+        options["http2"] = True
+    return options
 
 
 def main() -> None:
     """Run the application."""
     parser = create_parser()
-    argcomplete.autocomplete(parser)
+    # argcomplete sets _ARGCOMPLETE when the shell asks for completions
+    if "_ARGCOMPLETE" in os.environ:
+        import argcomplete
+
+        argcomplete.autocomplete(parser)
     args = parser.parse_args()
 
+    from chaos_utils.logging import setup_json_logger
+
+    setup_json_logger(__name__, file_logging=True)
+
     if args.lunar_to_solar:
         handle_lunar_to_solar(args.lunar_to_solar)
         parser.exit()
@@ -109,8 +538,52 @@ def main() -> None:
         handle_solar_to_lunar(args.solar_to_lunar)
         parser.exit()
 
+    if args.jobs < 1:
+        parser.error("--jobs must be a positive integer")
+    if args.workers < 1:
+        parser.error("--workers must be a positive integer")
+    if args.profile_dir and args.workers > 1:
+        # a single profiler can be active at a time
+        parser.error("--profile-dir requires --workers 1")
+    if args.trace_memory < 0:
+        parser.error("--trace-memory must be a positive integer")
+    if args.upload_concurrency < 0:
+        parser.error("--upload-concurrency must be a positive integer")
+    if args.gist_batch < 0:
+        parser.error("--gist-batch must be a positive integer")
+    if args.gist_batch > 300:
+        # the GitHub API lists at most 300 files of a gist
+        parser.error("--gist-batch must be at most 300")
+    if args.http_max_connections is not None and args.http_max_connections < 1:
+        parser.error("--http-max-connections must be a positive integer")
+    if args.trace_memory and args.workers > 1:
+        # tracemalloc traces the allocations of every thread
+        parser.error("--trace-memory requires --workers 1")
+
     if len(args.config_files) == 0:
         parser.print_help()
         parser.exit()
 
-    process_config_files(args.config_files)
+    cache = None
+    if args.cache_dir:
+        from lunar_birthday_ical.event_cache import EventCache
+
+        cache = EventCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+
+    failed = process_config_files(
+        args.config_files,
+        stream=args.stream,
+        cache=cache,
+        jobs=args.jobs,
+        workers=args.workers,
+        profile=args.profile,
+        profile_dir=args.profile_dir,
+        trace_memory=args.trace_memory,
+        metrics_file=args.metrics_file,
+        upload_concurrency=args.upload_concurrency,
+        http_options=get_http_options(args),
+        upload_state=args.upload_state,
+        gist_batch=args.gist_batch,
+    )
+    if failed:
+        sys.exit(1)
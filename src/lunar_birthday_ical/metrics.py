@@ -0,0 +1,114 @@
+"""Metrics of a run, written for the Prometheus node_exporter textfile collector.
+
+The CLI runs from cron jobs or systemd timers, so there is no process to
+scrape. Instead a MetricsRegistry collects the metrics of each processed
+config file, and the process wide cache statistics, and writes them in the
+Prometheus text exposition format to a .prom file, which node_exporter
+exposes with its textfile collector. Every metric describes the last run,
+so they are all gauges.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+PREFIX = "lunar_birthday_ical_"
+
+# metric name, without PREFIX -> help text, in output order
+METRICS = {
+    "config_success": "Whether the config file was processed successfully.",
+    "duration_seconds": "Wall time spent processing the config file.",
+    "phase_duration_seconds": "Wall time spent in each phase of the config file.",
+    "events": "Events generated per event key, excluding cached items.",
+    "output_bytes": "Size of the generated .ics file.",
+    "upload_failures": "Failed uploads of the .ics file per service.",
+    "cache_hits": "Hits of the process wide caches during the run.",
+    "cache_misses": "Misses of the process wide caches during the run.",
+    "cache_evictions": "Evictions of the process wide caches during the run.",
+    "cache_hit_ratio": "Hits over lookups of the process wide caches.",
+    "http_requests": "HTTP requests sent by the uploads.",
+    "http_connections": "HTTP connections opened by the uploads.",
+    "last_run_timestamp_seconds": "Unix time the run finished at.",
+}
+
+
+def _escape(value: str) -> str:
+    """Escape a label value of the text exposition format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsRegistry:
+    """Thread-safe collection of gauge samples."""
+
+    def __init__(self) -> None:
+        # name -> {sorted label pairs: value}
+        self._samples: dict[str, dict[tuple[tuple[str, str], ...], float]] = {
+            name: {} for name in METRICS
+        }
+        self._lock = threading.Lock()
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        """Set the value of a sample.
+
+        Args:
+            name: Metric name, one of METRICS.
+            value: Sample value.
+            labels: Label values of the sample.
+
+        Raises:
+            KeyError: If the metric is unknown.
+        """
+        key = tuple(sorted((label, str(value)) for label, value in labels.items()))
+        with self._lock:
+            self._samples[name][key] = value
+
+    def record_cache(self, cache: str, stats: dict[str, int]) -> None:
+        """Record the hits, misses and evictions of a cache, see LRUCache.stats."""
+        hits, misses = stats["hits"], stats["misses"]
+        self.set("cache_hits", hits, cache=cache)
+        self.set("cache_misses", misses, cache=cache)
+        self.set("cache_evictions", stats["evictions"], cache=cache)
+        if hits + misses:
+            self.set("cache_hit_ratio", hits / (hits + misses), cache=cache)
+
+    def render(self) -> str:
+        """Return the samples in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, help_text in METRICS.items():
+                samples = self._samples[name]
+                if not samples:
+                    continue
+                lines.append(f"# HELP {PREFIX}{name} {help_text}")
+                lines.append(f"# TYPE {PREFIX}{name} gauge")
+                for key, value in sorted(samples.items()):
+                    labels = ",".join(f'{k}="{_escape(v)}"' for k, v in key)
+                    selector = f"{{{labels}}}" if labels else ""
+                    lines.append(f"{PREFIX}{name}{selector} {value!r}")
+        return "".join(line + "\n" for line in lines)
+
+    def write(self, path: Path) -> None:
+        """Write the samples to a textfile collector file.
+
+        The file is replaced atomically, so the collector never reads a
+        partial file.
+
+        Args:
+            path: Path of the .prom file.
+        """
+        self.set("last_run_timestamp_seconds", time.time())
+        text = self.render()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            # mkstemp creates the file readable by its owner only
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
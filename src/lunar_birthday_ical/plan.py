@@ -0,0 +1,247 @@
+"""Compiled configuration plans, cached on disk by YAML content hash.
+
+Compiling a configuration merges it with default_config, merges every item
+with the global section, validates the result and parses the dates and
+times of the items. The resulting ConfigPlan is stored as JSON next to the
+event cache, so an unchanged YAML file is neither parsed nor merged again.
+JSON, unlike pickle, cannot run code when a cached plan is loaded.
+"""
+
+import dataclasses
+import datetime
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import zoneinfo
+from pathlib import Path
+
+from chaos_utils.dict_utils import deep_merge
+
+from lunar_birthday_ical.config import default_config
+from lunar_birthday_ical.event_cache import make_cache_key
+from lunar_birthday_ical.holidays import HOLIDAYS
+from lunar_birthday_ical.profiling import NULL_TIMER, PhaseTimer
+from lunar_birthday_ical.timezones import get_timezone
+
+logger = logging.getLogger(__name__)
+
+# bump when compile_config output changes for an unchanged YAML file
+PLAN_VERSION = 2
+
+EVENT_KEYS = ("lunar_birthday", "solar_birthday", "integer_days")
+
+
+@dataclasses.dataclass(slots=True)
+class ConfigPlan:
+    """Validated configuration, ready for generation.
+
+    Attributes:
+        config: Configuration merged with default_config.
+        items: Items of the events list merged with the global section, with
+            start_date parsed as a date and event_time as a time.
+    """
+
+    config: dict
+    items: list[dict]
+
+
+# JSON tags of the YAML and compiled values that JSON lacks, datetime first
+# as it is a date subclass
+_JSON_TYPES = {
+    "__datetime__": datetime.datetime,
+    "__date__": datetime.date,
+    "__time__": datetime.time,
+}
+
+
+def _encode_value(value: object) -> dict[str, str]:
+    for tag, cls in _JSON_TYPES.items():
+        if isinstance(value, cls):
+            return {tag: value.isoformat()}
+    raise TypeError(f"cannot cache {type(value).__name__} values")
+
+
+def _decode_object(obj: dict) -> object:
+    if len(obj) == 1:
+        ((tag, value),) = obj.items()
+        if tag in _JSON_TYPES:
+            return _JSON_TYPES[tag].fromisoformat(value)
+    return obj
+
+
+def parse_date(value: datetime.date | str, field: str) -> datetime.date:
+    """Parse a %Y-%m-%d date, as written in the config or parsed by YAML."""
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.datetime.strptime(str(value), "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"{field} must be a %Y-%m-%d date, got {value!r}") from None
+
+
+def parse_time(value: datetime.time | str, field: str) -> datetime.time:
+    """Parse a %H:%M:%S time, as written in the config."""
+    if isinstance(value, datetime.time):
+        return value
+    if isinstance(value, int):
+        # YAML 1.1 reads unquoted 10:00:00 as a sexagesimal integer
+        raise ValueError(f"{field} must be enclosed in double quotes, got {value!r}")
+    try:
+        return datetime.datetime.strptime(str(value), "%H:%M:%S").time()
+    except ValueError:
+        raise ValueError(f"{field} must be a %H:%M:%S time, got {value!r}") from None
+
+
+def compile_config(yaml_config: dict | None) -> ConfigPlan:
+    """Merge and validate a configuration loaded from YAML.
+
+    Args:
+        yaml_config: Configuration as loaded from the YAML file.
+
+    Returns:
+        The compiled plan.
+
+    Raises:
+        ValueError: If the configuration is invalid.
+    """
+    config = deep_merge(default_config, yaml_config or {})
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "merged_config=%s", json.dumps(config, ensure_ascii=False, default=str)
+        )
+
+    global_config = config.get("global", {})
+    _validate_section(global_config, "global")
+    for holiday_key in global_config.get("holiday_keys") or []:
+        if holiday_key not in HOLIDAYS:
+            logger.warning("ignoring unknown holiday_keys entry %r", holiday_key)
+
+    items = [
+        compile_item(global_config, item, f"events[{index}]")
+        for index, item in enumerate(config.get("events") or [])
+    ]
+
+    return ConfigPlan(config=config, items=items)
+
+
+def compile_item(global_config: dict, item: dict, field: str) -> dict:
+    """Merge an item with the global section, validate it and parse it.
+
+    Args:
+        global_config: The global section of the merged configuration.
+        item: Item of the events list, or of a roster.
+        field: Location of the item, used in error messages.
+
+    Returns:
+        The merged item, with start_date parsed as a date and event_time as
+        a time.
+
+    Raises:
+        ValueError: If the item is invalid.
+    """
+    item_config = deep_merge(global_config, item)
+    if not item_config.get("name"):
+        raise ValueError(f"{field}.name is required")
+    if not item_config.get("start_date"):
+        raise ValueError(f"{field}.start_date is required")
+    _validate_section(item_config, field)
+    for event_key in item_config.get("event_keys") or []:
+        if event_key not in EVENT_KEYS:
+            logger.warning("ignoring unknown %s.event_keys entry %r", field, event_key)
+
+    item_config["start_date"] = parse_date(
+        item_config["start_date"], f"{field}.start_date"
+    )
+    item_config["event_time"] = parse_time(
+        item_config.get("event_time"), f"{field}.event_time"
+    )
+    return item_config
+
+
+def _validate_section(section: dict, field: str) -> None:
+    """Check the settings shared by the global section and the items."""
+    try:
+        get_timezone(section.get("timezone"))
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError, TypeError):
+        raise ValueError(
+            f"{field}.timezone is not a known timezone: {section.get('timezone')!r}"
+        ) from None
+    parse_time(section.get("event_time"), f"{field}.event_time")
+    days_interval = section.get("days_interval")
+    if days_interval is not None and days_interval <= 0:
+        raise ValueError(f"{field}.days_interval must be a positive integer")
+
+
+def _compile_yaml(data: bytes, timer: PhaseTimer) -> ConfigPlan:
+    with timer.phase("config.parse"):
+        # yaml is only imported when the plan is not cached
+        import yaml
+
+        yaml_config = yaml.safe_load(data)
+    with timer.phase("config.merge"):
+        return compile_config(yaml_config)
+
+
+def load_plan(
+    config_path: Path,
+    cache_dir: Path | None = None,
+    timer: PhaseTimer = NULL_TIMER,
+) -> ConfigPlan:
+    """Load the compiled plan of a configuration file.
+
+    Args:
+        config_path: Path to the YAML configuration file.
+        cache_dir: Directory of the cached plans, plans are not cached when
+            None. It usually is the plans subdirectory of an EventCache,
+            whose prune() evicts the plans as well.
+        timer: Timer of the config.* phases.
+
+    Returns:
+        The compiled plan, from the cache when the file did not change.
+    """
+    with timer.phase("config.read"):
+        data = config_path.read_bytes()
+    if cache_dir is None:
+        return _compile_yaml(data, timer)
+
+    key = make_cache_key(
+        "plan", PLAN_VERSION, default_config, hashlib.sha256(data).hexdigest()
+    )
+    plan_path = cache_dir / f"{key}.json"
+    try:
+        with timer.phase("config.cache"):
+            text = plan_path.read_text(encoding="utf-8")
+            plan = ConfigPlan(**json.loads(text, object_hook=_decode_object))
+            # refreshes the plan for the least recently used eviction
+            os.utime(plan_path)
+        logger.debug("loaded compiled plan %s for %s", plan_path, config_path)
+        return plan
+    except FileNotFoundError:
+        pass
+    except (ValueError, TypeError) as e:
+        logger.warning("ignoring unreadable compiled plan %s: %s", plan_path, e)
+
+    plan = _compile_yaml(data, timer)
+
+    with timer.phase("config.cache"):
+        try:
+            text = json.dumps(
+                dataclasses.asdict(plan), ensure_ascii=False, default=_encode_value
+            )
+        except TypeError as e:
+            logger.debug("not caching the compiled plan of %s: %s", config_path, e)
+            return plan
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, plan_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return plan
@@ -0,0 +1,152 @@
+"""Wall time and memory accounting of the phases of a calendar generation.
+
+A PhaseTimer accumulates the time spent in named phases, such as loading
+the config, running each event generator, serializing the calendar and
+uploading it, so that a profile can be logged for each config file. Code
+paths that are not profiled use NULL_TIMER, whose phases cost nothing.
+
+A MemoryTracer records the peak and retained memory of coarser phases with
+tracemalloc, along with the allocation sites which grew the most.
+"""
+
+import contextlib
+import time
+import tracemalloc
+from collections.abc import Iterator
+
+
+class _Phase:
+    """Context manager adding its duration to a phase of a PhaseTimer."""
+
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer: "PhaseTimer", name: str) -> None:
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.timer.record(self.name, time.perf_counter() - self.start)
+
+
+class PhaseTimer:
+    """Accumulated wall time and number of calls of named phases.
+
+    Phases are not meant to nest, the phase names used by the generator are
+    config.read, config.cache, config.parse, config.merge, generate.<event
+    key>, generate.holidays, generate.workers, serialize and upload.<service>.
+    """
+
+    def __init__(self) -> None:
+        # name -> [seconds, calls], in order of first use
+        self._phases: dict[str, list] = {}
+
+    def phase(self, name: str) -> contextlib.AbstractContextManager[None]:
+        """Return a context manager timing a run of the phase."""
+        return _Phase(self, name)
+
+    def record(self, name: str, seconds: float) -> None:
+        """Add a run of the phase which lasted seconds."""
+        phase = self._phases.get(name)
+        if phase is None:
+            self._phases[name] = [seconds, 1]
+        else:
+            phase[0] += seconds
+            phase[1] += 1
+
+    def as_dict(self) -> dict[str, dict[str, float | int]]:
+        """Return the phases as {name: {"seconds": total, "calls": count}}."""
+        return {
+            name: {"seconds": round(seconds, 6), "calls": calls}
+            for name, (seconds, calls) in self._phases.items()
+        }
+
+
+class _NullPhaseTimer(PhaseTimer):
+    """PhaseTimer recording nothing."""
+
+    _null_phase = contextlib.nullcontext()
+
+    def phase(self, name: str) -> contextlib.AbstractContextManager[None]:
+        return self._null_phase
+
+    def record(self, name: str, seconds: float) -> None:
+        pass
+
+
+NULL_TIMER = _NullPhaseTimer()
+
+
+class MemoryTracer:
+    """Peak and retained traced memory of phases, with their top allocation sites.
+
+    tracemalloc is process wide, so phases must not run concurrently, and
+    memory allocated by worker processes is not traced.
+    """
+
+    def __init__(self, top: int = 10) -> None:
+        """Initialize a tracer without phases.
+
+        Args:
+            top: Number of allocation sites reported for each phase.
+        """
+        self.top = top
+        self.phases: dict[str, dict] = {}
+        self._started = False
+
+    def start(self) -> None:
+        """Start tracing memory allocations, unless already tracing."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+
+    def stop(self) -> None:
+        """Stop tracing, if tracing was started by start()."""
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Trace the memory allocated while running the phase.
+
+        start is the traced memory when the phase started, peak the highest
+        traced memory during the phase, retained the traced memory the phase
+        left allocated, and top lists the allocation sites whose traced
+        memory grew the most.
+        """
+        if not tracemalloc.is_tracing():
+            yield
+            return
+
+        # the snapshot is taken first, so that its own memory is part of the
+        # baseline of the phase
+        before = self._snapshot()
+        start_size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            size, peak = tracemalloc.get_traced_memory()
+            top = self._snapshot().compare_to(before, "lineno")[: self.top]
+            del before
+            self.phases[name] = {
+                "start_bytes": start_size,
+                "peak_bytes": peak,
+                "retained_bytes": size - start_size,
+                "top": [
+                    {
+                        "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                        "size_diff": stat.size_diff,
+                        "count_diff": stat.count_diff,
+                    }
+                    for stat in top
+                ],
+            }
@@ -0,0 +1,91 @@
+"""Lazy readers of external rosters of events items.
+
+A roster holds the same items as the events list of a configuration, one
+per JSONL line, CSV row or YAML document. Rosters are read lazily, so that
+their size does not matter to the memory used to generate a calendar.
+"""
+
+import csv
+import json
+from collections.abc import Iterator
+from pathlib import Path
+
+# CSV columns holding a list of values, separated by semicolons
+CSV_LIST_COLUMNS = ("event_keys", "reminders", "attendees")
+# CSV columns holding integers
+CSV_INT_COLUMNS = (
+    "year_start",
+    "year_end",
+    "days_max",
+    "days_interval",
+    "event_hours",
+)
+
+
+def read_roster(path: Path) -> Iterator[tuple[str, dict]]:
+    """Read the items of a roster file, one at a time.
+
+    The format is chosen by the file suffix: .jsonl / .ndjson for one JSON
+    object per line, .csv for one item per row with a header row, and .yaml
+    / .yml for one item per YAML document.
+
+    Args:
+        path: Path to the roster file.
+
+    Yields:
+        (location, item) pairs, the location is used in error messages.
+
+    Raises:
+        ValueError: If the format is not supported or an item is not a mapping.
+    """
+    suffix = path.suffix.lower()
+    if suffix in (".jsonl", ".ndjson"):
+        records = _read_jsonl(path)
+    elif suffix == ".csv":
+        records = _read_csv(path)
+    elif suffix in (".yaml", ".yml"):
+        records = _read_yaml(path)
+    else:
+        raise ValueError(f"unsupported roster format: {path}")
+
+    for location, item in records:
+        if not isinstance(item, dict):
+            raise ValueError(f"{location} is not a mapping")
+        yield location, item
+
+
+def _read_jsonl(path: Path) -> Iterator[tuple[str, dict]]:
+    with path.open(encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if line.strip():
+                yield f"{path}:{lineno}", json.loads(line)
+
+
+def _read_csv(path: Path) -> Iterator[tuple[str, dict]]:
+    with path.open(encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            item = {}
+            for column, value in row.items():
+                # empty cells fall back to the global section
+                if column is None or value is None or value == "":
+                    continue
+                if column in CSV_LIST_COLUMNS:
+                    values = [v.strip() for v in value.split(";") if v.strip()]
+                    if column == "reminders":
+                        values = [int(v) for v in values]
+                    item[column] = values
+                elif column in CSV_INT_COLUMNS:
+                    item[column] = int(value)
+                else:
+                    item[column] = value
+            yield f"{path}:{reader.line_num}", item
+
+
+def _read_yaml(path: Path) -> Iterator[tuple[str, dict]]:
+    import yaml
+
+    with path.open(encoding="utf-8") as f:
+        for index, document in enumerate(yaml.safe_load_all(f)):
+            if document is not None:
+                yield f"{path}[{index}]", document
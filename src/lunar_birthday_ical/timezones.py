@@ -0,0 +1,136 @@
+"""Timezone lookups and batch local to UTC conversion.
+
+Each zone is resolved once and gets an OffsetTable, which records the UTC
+offset transitions of a zone per year. Converting a local datetime then
+only costs a bisection in the table of its year, and the tables are shared
+by every item using the same timezone.
+"""
+
+import bisect
+import datetime
+import threading
+import zoneinfo
+from collections.abc import Iterable
+
+from lunar_birthday_ical.cache import LRUCache
+
+UTC = zoneinfo.ZoneInfo("UTC")
+
+ONE_DAY = datetime.timedelta(days=1)
+ONE_SECOND = datetime.timedelta(seconds=1)
+
+timezone_cache = LRUCache(maxsize=256)
+offset_table_cache = LRUCache(maxsize=256)
+
+
+def get_timezone(name: str) -> zoneinfo.ZoneInfo:
+    """Return the ZoneInfo of an IANA timezone name."""
+    return timezone_cache.get_or_compute(name, lambda: zoneinfo.ZoneInfo(name))
+
+
+def get_offset_table(name: str) -> "OffsetTable":
+    """Return the shared OffsetTable of an IANA timezone name."""
+    return offset_table_cache.get_or_compute(
+        name, lambda: OffsetTable(get_timezone(name))
+    )
+
+
+class OffsetTable:
+    """UTC offsets of a zone, indexed by local wall time, built per year.
+
+    Lookups follow datetime semantics for fold=0: a repeated wall time uses
+    the offset before the transition, and so does a skipped wall time.
+    """
+
+    def __init__(self, zone: datetime.tzinfo) -> None:
+        """Initialize an empty table.
+
+        Args:
+            zone: Timezone the local datetimes are expressed in.
+        """
+        self.zone = zone
+        # year -> (local wall time boundaries, offsets), len(offsets) is
+        # len(boundaries) + 1
+        self._years: dict[
+            int, tuple[list[datetime.datetime], list[datetime.timedelta]]
+        ] = {}
+        self._lock = threading.Lock()
+
+    def _offset_at(self, instant: datetime.datetime) -> datetime.timedelta:
+        """Return the UTC offset of the zone at a naive UTC instant."""
+        return self.zone.fromutc(instant.replace(tzinfo=self.zone)).utcoffset()
+
+    def _build_year(
+        self, year: int
+    ) -> tuple[list[datetime.datetime], list[datetime.timedelta]]:
+        """Find the transitions around a year, sampling the offset daily."""
+        # the margins cover wall times of the year whatever the offset
+        instant = datetime.datetime(year, 1, 1) - 2 * ONE_DAY
+        end = datetime.datetime(year + 1, 1, 1) + 2 * ONE_DAY
+
+        offset = self._offset_at(instant)
+        boundaries = []
+        offsets = [offset]
+        while instant < end:
+            next_instant = instant + ONE_DAY
+            next_offset = self._offset_at(next_instant)
+            if next_offset != offset:
+                # bisect the first second using next_offset, transitions
+                # happen on whole seconds
+                low, high = 0, 86400
+                while high - low > 1:
+                    middle = (low + high) // 2
+                    if self._offset_at(instant + middle * ONE_SECOND) == offset:
+                        low = middle
+                    else:
+                        high = middle
+                # wall times before the later of both local readings of the
+                # transition keep the previous offset
+                transition = instant + high * ONE_SECOND
+                boundaries.append(transition + max(offset, next_offset))
+                offsets.append(next_offset)
+                offset = next_offset
+            instant = next_instant
+        return boundaries, offsets
+
+    def _get_year(
+        self, year: int
+    ) -> tuple[list[datetime.datetime], list[datetime.timedelta]]:
+        table = self._years.get(year)
+        if table is None:
+            table = self._build_year(year)
+            with self._lock:
+                table = self._years.setdefault(year, table)
+        return table
+
+    def utcoffset(self, local_datetime: datetime.datetime) -> datetime.timedelta:
+        """Return the UTC offset of a local wall time, its tzinfo is ignored."""
+        wall_time = local_datetime.replace(tzinfo=None)
+        boundaries, offsets = self._get_year(wall_time.year)
+        return offsets[bisect.bisect_right(boundaries, wall_time)]
+
+    def to_utc(
+        self, local_datetimes: Iterable[datetime.datetime]
+    ) -> list[datetime.datetime]:
+        """Convert local wall times of the zone to UTC datetimes.
+
+        Args:
+            local_datetimes: Naive or aware datetimes, their tzinfo is ignored.
+
+        Returns:
+            The UTC datetimes, with the UTC ZoneInfo as tzinfo.
+        """
+        utc_datetimes = []
+        year = None
+        for local_datetime in local_datetimes:
+            wall_time = local_datetime.replace(tzinfo=None)
+            if wall_time.year != year:
+                year = wall_time.year
+                boundaries, offsets = self._get_year(year)
+                # most years of most zones have a single offset
+                fixed_offset = None if boundaries else offsets[0]
+            offset = fixed_offset
+            if offset is None:
+                offset = offsets[bisect.bisect_right(boundaries, wall_time)]
+            utc_datetimes.append((wall_time - offset).replace(tzinfo=UTC))
+        return utc_datetimes
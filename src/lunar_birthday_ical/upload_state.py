@@ -0,0 +1,120 @@
+"""Local state of the last successful upload to each target.
+
+Uploading an unchanged calendar wastes bandwidth and API rate limit, and
+makes every subscribed client resync it. UploadState remembers the content
+hash of the last successful upload to each update target, a pastebin
+manage_url or a gist, together with the ETag of the gist, so that the
+uploaders can skip unchanged content.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# bump when the format of the state file changes
+STATE_VERSION = 1
+
+
+def content_hash(*parts: bytes | str) -> str:
+    """Return the sha256 hex digest of the uploaded content."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8") if isinstance(part, str) else part)
+        # separates the parts, so that moving bytes between them changes the hash
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class UploadState:
+    """Thread-safe mapping of upload targets to their last uploaded content.
+
+    The state is read from path when created, and written back by save().
+    A missing or unreadable state file starts an empty state, so that every
+    calendar is uploaded once more.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Initialize the state from its file.
+
+        Args:
+            path: Path of the JSON state file.
+        """
+        self.path = path
+        self._targets: dict[str, dict[str, Any]] = {}
+        self._changed = False
+        self._lock = threading.Lock()
+
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (ValueError, OSError) as e:
+            logger.warning("ignoring unreadable upload state %s: %s", path, e)
+            return
+        if isinstance(data, dict) and data.get("version") == STATE_VERSION:
+            self._targets = data.get("targets", {})
+
+    def get(self, target: str) -> dict[str, Any]:
+        """Return the state of target, with its hash and optional etag and
+        files keys.
+
+        The state is empty when nothing was uploaded to target yet.
+        """
+        with self._lock:
+            return dict(self._targets.get(target, {}))
+
+    def set(
+        self,
+        target: str,
+        digest: str,
+        etag: str | None = None,
+        files: Iterable[str] | None = None,
+    ) -> None:
+        """Record a successful upload of content hashing to digest to target.
+
+        Args:
+            target: Update target, such as "pastebin:<manage_url>".
+            digest: Content hash of the uploaded content.
+            etag: Optional ETag of the remote resource after the upload.
+            files: Optional names of the remote files holding the content,
+                such as the gist files of a split calendar.
+        """
+        state: dict[str, Any] = {"hash": digest}
+        if etag:
+            state["etag"] = etag
+        if files is not None:
+            state["files"] = sorted(files)
+        with self._lock:
+            if self._targets.get(target) != state:
+                self._targets[target] = state
+                self._changed = True
+
+    def save(self) -> None:
+        """Write the state file atomically, if the state changed."""
+        with self._lock:
+            if not self._changed:
+                return
+            text = json.dumps(
+                {"version": STATE_VERSION, "targets": self._targets},
+                indent=2,
+                sort_keys=True,
+            )
+            self._changed = False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -1,16 +1,360 @@
 """Calendar uploaders for various services."""
 
+import asyncio
+import concurrent.futures
+import dataclasses
+import email.utils
+import itertools
 import json
 import logging
 import os
+import random
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable, Iterable
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import httpx
 
+from lunar_birthday_ical.upload_state import content_hash
+
+if TYPE_CHECKING:
+    from lunar_birthday_ical.upload_state import UploadState
+
 logger = logging.getLogger(__name__)
 
+# the GitHub API truncates the content of gist files larger than 1 MiB, so
+# larger calendars are split into several gist files
+GIST_FILE_MAX_BYTES = 1_000_000
+# the GitHub API lists at most 300 files of a gist
+GIST_MAX_FILES = 300
+# maximum size of the files pushed by a batched gist request
+GIST_BATCH_MAX_BYTES = 10 * GIST_FILE_MAX_BYTES
+
+
+def split_calendar(content: str, max_bytes: int = GIST_FILE_MAX_BYTES) -> list[str]:
+    """Split a calendar into calendars of at most max_bytes, when possible.
+
+    Each part repeats the lines preceding the first VEVENT, such as the
+    VTIMEZONE components, so that every part is a valid calendar of its own.
+    A single VEVENT larger than max_bytes makes a larger part.
+
+    Args:
+        content: Content of the calendar.
+        max_bytes: Maximum size of a part, UTF-8 encoded.
+
+    Returns:
+        The parts, the calendar itself when it is small enough.
+    """
+    if len(content.encode("utf-8")) <= max_bytes:
+        return [content]
+
+    lines = content.splitlines(keepends=True)
+    starts = [i for i, line in enumerate(lines) if line.rstrip() == "BEGIN:VEVENT"]
+    if not starts:
+        return [content]
+    ends = [i for i, line in enumerate(lines) if line.rstrip() == "END:VCALENDAR"]
+    end = ends[-1] if ends else len(lines)
+    header = "".join(lines[: starts[0]])
+    footer = "".join(lines[end:])
+    bounds = [*starts[1:], end]
+    events = ["".join(lines[start:stop]) for start, stop in zip(starts, bounds)]
+
+    budget = max_bytes - len(header.encode("utf-8")) - len(footer.encode("utf-8"))
+    parts: list[list[str]] = [[]]
+    size = 0
+    for event in events:
+        event_size = len(event.encode("utf-8"))
+        if parts[-1] and size + event_size > budget:
+            parts.append([])
+            size = 0
+        parts[-1].append(event)
+        size += event_size
+    return [header + "".join(part) + footer for part in parts]
+
+
+def _gist_digest(description: str, files: dict[str, str]) -> str:
+    """Get the content hash of the description and files of a gist."""
+    return content_hash(description, *itertools.chain(*sorted(files.items())))
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header, in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitError(httpx.HTTPError):
+    """A request would wait longer than the max_wait of its RetryScheduler."""
+
+
+@dataclasses.dataclass(slots=True)
+class _HostLimits:
+    """Rate limit of a host, as reported by its last response."""
+
+    # requests left in the current window, None when unknown
+    remaining: int | None = None
+    # unix time the window ends at
+    reset: float = 0.0
+    # unix time before which no request is sent, set by Retry-After or backoff
+    not_before: float = 0.0
+    # unix time of the last request, and of the last write request
+    last_request: float = 0.0
+    last_write: float = 0.0
+
+
+class RetryScheduler:
+    """Retries and paces the requests of the uploaders, per host.
+
+    The scheduler tracks the X-RateLimit-Remaining and X-RateLimit-Reset
+    headers of each host. Requests are sent as fast as possible until the
+    remaining requests fall to pace_below, they are then spread over the
+    rest of the window, and held until the window resets once none are left.
+
+    Rate limited (429, or 403 with Retry-After or no remaining requests) and
+    server error (5xx) responses are retried, after the Retry-After delay,
+    the window reset, or a jittered exponential backoff. The delay holds
+    every request to the host, so that concurrent uploads back off together.
+    Creating requests (POST) are not idempotent, so they are only retried
+    when the server did not process them: rate limited responses and
+    connection failures.
+
+    An instance can be shared by several threads and event loops, the
+    uploaders created by LunarCalendarApp share upload_scheduler.
+    """
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(
+        self,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        max_wait: float = 900.0,
+        pace_below: int = 50,
+    ) -> None:
+        """Initialize a scheduler without rate limit knowledge.
+
+        Args:
+            backoff: Base delay of the exponential backoff, in seconds.
+            max_backoff: Maximum delay of the exponential backoff, in seconds.
+            max_wait: Maximum delay before a request or a retry, in seconds.
+                A response asking to wait longer is not retried, and a
+                request held longer by the rate limit fails.
+            pace_below: Number of remaining requests below which requests
+                are spread over the rest of the rate limit window.
+        """
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_wait = max_wait
+        self.pace_below = pace_below
+        self._hosts: dict[str, _HostLimits] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, host: str, write_interval: float = 0.0) -> float:
+        """Reserve the next request to host.
+
+        Args:
+            host: Host of the request.
+            write_interval: Minimum interval between the write requests to
+                the host, in seconds, 0 for read requests.
+
+        Returns:
+            The delay before sending the request, in seconds.
+
+        Raises:
+            RateLimitError: If the delay exceeds max_wait, the request is
+                then not reserved.
+        """
+        now = time.time()
+        with self._lock:
+            limits = self._hosts.setdefault(host, _HostLimits())
+            start = max(now, limits.not_before)
+            limited = limits.remaining is not None and limits.reset > now
+            if limited:
+                if limits.remaining <= 0:
+                    start = max(start, limits.reset)
+                elif limits.remaining <= self.pace_below:
+                    interval = (limits.reset - now) / limits.remaining
+                    start = max(start, limits.last_request + interval)
+            if write_interval > 0:
+                start = max(start, limits.last_write + write_interval)
+            if start - now > self.max_wait:
+                raise RateLimitError(
+                    f"rate limit of {host} exceeded, "
+                    f"next request allowed in {start - now:.0f}s"
+                )
+            if limited:
+                limits.remaining -= 1
+            if write_interval > 0:
+                limits.last_write = start
+            limits.last_request = start
+        return start - now
+
+    def update(self, host: str, response: httpx.Response) -> None:
+        """Record the rate limit headers of a response of host."""
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            remaining_requests, reset_time = int(remaining), float(reset)
+        except ValueError:
+            return
+        with self._lock:
+            limits = self._hosts.setdefault(host, _HostLimits())
+            limits.remaining = remaining_requests
+            limits.reset = reset_time
+
+    def retry_delay(
+        self,
+        method: str,
+        attempt: int,
+        response: httpx.Response | None = None,
+        error: Exception | None = None,
+    ) -> float | None:
+        """Get the delay before retrying a failed request.
+
+        Args:
+            method: HTTP method of the request.
+            attempt: Number of retries of the request so far.
+            response: Response of the request, if any.
+            error: Transport error of the request, if no response.
+
+        Returns:
+            The delay in seconds, or None when the request is not retried.
+        """
+        if error is not None:
+            if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)) or (
+                method != "POST" and isinstance(error, httpx.TransportError)
+            ):
+                return self._backoff(attempt)
+            return None
+
+        headers = response.headers
+        retry_after = _parse_retry_after(headers.get("Retry-After"))
+        exhausted = headers.get("X-RateLimit-Remaining") == "0"
+        status = response.status_code
+        rate_limited = status == 429 or (
+            status == 403 and (retry_after is not None or exhausted)
+        )
+        if not rate_limited and (status not in self.RETRY_STATUSES or method == "POST"):
+            return None
+
+        delay = retry_after
+        if delay is None and rate_limited and exhausted:
+            try:
+                delay = float(headers.get("X-RateLimit-Reset", "")) - time.time()
+            except ValueError:
+                pass
+        if delay is None:
+            delay = self._backoff(attempt)
+        if delay > self.max_wait:
+            logger.warning(
+                "not retrying %s %s, rate limited for %.0fs",
+                method,
+                response.request.url,
+                delay,
+            )
+            return None
+        return max(delay, 0.0)
+
+    def _backoff(self, attempt: int) -> float:
+        """Get the jittered exponential backoff delay of a retry."""
+        delay = min(self.max_backoff, self.backoff * 2**attempt)
+        return random.uniform(delay / 2, delay)
+
+    def _hold(
+        self, host: str, delay: float, method: str, url: str, reason: object
+    ) -> None:
+        """Hold the requests to host for delay seconds before a retry."""
+        logger.warning("retrying %s %s in %.1fs: %s", method, url, delay, reason)
+        with self._lock:
+            limits = self._hosts.setdefault(host, _HostLimits())
+            limits.not_before = max(limits.not_before, time.time() + delay)
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        send: Callable[[], httpx.Response],
+        max_retries: int = 3,
+        write_interval: float = 0.0,
+    ) -> httpx.Response:
+        """Send a request, paced and retried.
+
+        Args:
+            method: HTTP method of the request.
+            url: URL of the request.
+            send: Function sending the request.
+            max_retries: Maximum number of retries.
+            write_interval: Minimum interval between write requests to the
+                host, see reserve.
+
+        Returns:
+            The response of the last attempt.
+
+        Raises:
+            httpx.TransportError: If the last attempt failed.
+            RateLimitError: If the rate limit holds the request longer than
+                max_wait.
+        """
+        host = httpx.URL(url).host
+        for attempt in itertools.count():
+            time.sleep(self.reserve(host, write_interval))
+            try:
+                response = send()
+            except httpx.TransportError as e:
+                delay = self.retry_delay(method, attempt, error=e)
+                if delay is None or attempt >= max_retries:
+                    raise
+                self._hold(host, delay, method, url, e)
+                continue
+            self.update(host, response)
+            delay = self.retry_delay(method, attempt, response=response)
+            if delay is None or attempt >= max_retries:
+                return response
+            self._hold(host, delay, method, url, f"HTTP {response.status_code}")
+
+    async def send_async(
+        self,
+        method: str,
+        url: str,
+        send: Callable[[], Awaitable[httpx.Response]],
+        max_retries: int = 3,
+        write_interval: float = 0.0,
+    ) -> httpx.Response:
+        """Send a request with an async client, paced and retried, see send."""
+        host = httpx.URL(url).host
+        for attempt in itertools.count():
+            await asyncio.sleep(self.reserve(host, write_interval))
+            try:
+                response = await send()
+            except httpx.TransportError as e:
+                delay = self.retry_delay(method, attempt, error=e)
+                if delay is None or attempt >= max_retries:
+                    raise
+                self._hold(host, delay, method, url, e)
+                continue
+            self.update(host, response)
+            delay = self.retry_delay(method, attempt, response=response)
+            if delay is None or attempt >= max_retries:
+                return response
+            self._hold(host, delay, method, url, f"HTTP {response.status_code}")
+
+
+# scheduler shared by the uploads of the process
+upload_scheduler = RetryScheduler()
+
 
 class CalendarUploader(ABC):
     """Abstract base class for calendar uploaders.
@@ -19,13 +363,42 @@ class CalendarUploader(ABC):
     Subclasses should implement the upload method according to the specific service API.
     """
 
-    def __init__(self, config: dict[str, Any]) -> None:
+    # default timeout of an upload, in seconds
+    DEFAULT_TIMEOUT = 30.0
+    # default number of retries of a failed request, see RetryScheduler
+    DEFAULT_MAX_RETRIES = 3
+    # minimum interval between the write requests to the service, in seconds
+    WRITE_INTERVAL = 0.0
+
+    def __init__(
+        self,
+        config: dict[str, Any],
+        client: httpx.Client | None = None,
+        state: "UploadState | None" = None,
+        scheduler: RetryScheduler | None = None,
+    ) -> None:
         """Initialize the uploader with configuration.
 
         Args:
-            config: Configuration dictionary specific to the uploader service.
+            config: Configuration dictionary specific to the uploader service,
+                its optional timeout key bounds the duration of an upload, in
+                seconds, extended by the retries of a scheduler, and its
+                optional max_retries key the number of retries of a failed
+                request.
+            client: Optional pooled client sending the requests of upload, so
+                that its connections are reused across uploads. A one-shot
+                connection is used for each request when None.
+            state: Optional state of the previous uploads, updates of an
+                existing target with unchanged content are then skipped.
+            scheduler: Optional scheduler pacing and retrying the requests,
+                each request is sent once when None.
         """
         self.config = config
+        self.client = client
+        self.state = state
+        self.scheduler = scheduler
+        self.timeout: float = float(config.get("timeout") or self.DEFAULT_TIMEOUT)
+        self.max_retries: int = int(config.get("max_retries", self.DEFAULT_MAX_RETRIES))
 
     @abstractmethod
     def upload(self, file: Path) -> dict[str, Any]:
@@ -42,6 +415,128 @@ class CalendarUploader(ABC):
         """
         pass
 
+    async def upload_async(
+        self, file: Path, client: httpx.AsyncClient
+    ) -> dict[str, Any]:
+        """Upload a calendar file to the service without blocking the event loop.
+
+        The default implementation runs upload in a thread, subclasses send
+        their requests with client instead.
+
+        Args:
+            file: Path to the calendar file to upload.
+            client: Client shared by the concurrent uploads.
+
+        Returns:
+            Response data from the upload operation.
+
+        Raises:
+            httpx.HTTPError: If the upload request fails.
+        """
+        return await asyncio.to_thread(self.upload, file)
+
+    def _state_target(self, file: Path) -> str | None:
+        """Get the key of the updated target in the upload state.
+
+        Args:
+            file: Path to the uploaded calendar file.
+
+        Returns:
+            The key, or None when the content is always uploaded, e.g. when
+            creating a new paste or gist.
+        """
+        return None
+
+    def _get_digest(self, file: Path) -> str | None:
+        """Get the content hash of the upload, None when the state is unused."""
+        if self.state is None or self._state_target(file) is None:
+            return None
+        return content_hash(file.read_bytes())
+
+    def _is_unchanged(self, file: Path, digest: str | None) -> bool:
+        """Return whether the content was already uploaded to the target."""
+        if digest is None:
+            return False
+        return self.state.get(self._state_target(file)).get("hash") == digest
+
+    def _record_upload(
+        self,
+        file: Path,
+        digest: str | None,
+        response: httpx.Response | None = None,
+        files: Iterable[str] | None = None,
+    ) -> None:
+        """Record a successful upload in the state, with the ETag of response
+        and the names of the remote files."""
+        if digest is not None:
+            etag = response.headers.get("ETag") if response is not None else None
+            self.state.set(self._state_target(file), digest, etag, files)
+
+    def _unchanged_result(self, file: Path) -> dict[str, Any]:
+        """Get the result of a skipped upload."""
+        logger.debug(
+            "%s unchanged since its last upload to %s", file, self._state_target(file)
+        )
+        return {"unchanged": True}
+
+    def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a request with the injected client, or a one-shot connection,
+        paced and retried by the scheduler of the uploader."""
+
+        def send() -> httpx.Response:
+            if self.client is None:
+                return getattr(httpx, method.lower())(
+                    url, timeout=self.timeout, **kwargs
+                )
+            return self.client.request(
+                method, url, timeout=self._get_timeout(self.client), **kwargs
+            )
+
+        if self.scheduler is None:
+            return send()
+        return self.scheduler.send(
+            method, url, send, self.max_retries, self._write_interval(method)
+        )
+
+    async def _request_async(
+        self, client: httpx.AsyncClient, method: str, url: str, **kwargs: Any
+    ) -> httpx.Response:
+        """Send a request with an async client, see _request."""
+
+        def send() -> Awaitable[httpx.Response]:
+            return client.request(
+                method, url, timeout=self._get_timeout(client), **kwargs
+            )
+
+        if self.scheduler is None:
+            return await send()
+        return await self.scheduler.send_async(
+            method, url, send, self.max_retries, self._write_interval(method)
+        )
+
+    def _write_interval(self, method: str) -> float:
+        return 0.0 if method == "GET" else self.WRITE_INTERVAL
+
+    def _get_upload_timeout(self) -> float:
+        """Get the maximum duration of an upload, in seconds.
+
+        With a scheduler, each of the max_retries + 1 attempts of a request
+        may take timeout, after waiting at most max_wait for the rate limit.
+        """
+        if self.scheduler is None:
+            return self.timeout
+        return self.timeout * (self.max_retries + 1) + self.scheduler.max_wait
+
+    def _get_timeout(self, client: httpx.Client | httpx.AsyncClient) -> httpx.Timeout:
+        """Get the timeout of a request sent with a pooled client.
+
+        The read and write timeouts are those of the uploader, the connect and
+        pool timeouts those of the client.
+        """
+        return httpx.Timeout(
+            self.timeout, connect=client.timeout.connect, pool=client.timeout.pool
+        )
+
 
 class PastebinWorkerUploader(CalendarUploader):
     """Uploader for pastebin-compatible services.
@@ -52,7 +547,13 @@ class PastebinWorkerUploader(CalendarUploader):
 
     API_BASE_URL = "https://komj.uk"
 
-    def __init__(self, config: dict[str, Any]) -> None:
+    def __init__(
+        self,
+        config: dict[str, Any],
+        client: httpx.Client | None = None,
+        state: "UploadState | None" = None,
+        scheduler: RetryScheduler | None = None,
+    ) -> None:
         """Initialize the pastebin uploader.
 
         Args:
@@ -60,8 +561,11 @@ class PastebinWorkerUploader(CalendarUploader):
                 - base_url: Base URL of the pastebin service
                 - manage_url: Optional URL for updating existing paste
                 - expiration: Optional expiration time for the paste
+            client: Optional pooled client, see CalendarUploader.
+            state: Optional upload state, see CalendarUploader.
+            scheduler: Optional retry scheduler, see CalendarUploader.
         """
-        super().__init__(config)
+        super().__init__(config, client, state, scheduler)
         self.base_url: str = config.get("base_url", self.API_BASE_URL)
         self.manage_url: str | None = config.get("manage_url")
         self.expiration: int | str = config.get("expiration", "")
@@ -78,14 +582,77 @@ class PastebinWorkerUploader(CalendarUploader):
         Raises:
             httpx.HTTPError: If the upload request fails.
         """
+        digest = self._get_digest(file)
+        if self._is_unchanged(file, digest):
+            return self._unchanged_result(file)
+
         if not self.manage_url:
             response = self._create_paste(file)
         else:
             response = self._update_paste(file)
+        self._record_upload(file, digest)
 
         logger.debug(json.dumps(response.json(), ensure_ascii=False, default=str))
         return response.json()
 
+    async def upload_async(
+        self, file: Path, client: httpx.AsyncClient
+    ) -> dict[str, Any]:
+        """Upload a calendar file to pastebin with an async client.
+
+        Args:
+            file: Path to the calendar file to upload.
+            client: Client shared by the concurrent uploads.
+
+        Returns:
+            JSON response from the pastebin service.
+
+        Raises:
+            httpx.HTTPError: If the upload request fails.
+        """
+        digest = self._get_digest(file)
+        if self._is_unchanged(file, digest):
+            return self._unchanged_result(file)
+
+        if not self.manage_url:
+            method, url = "POST", f"{self.base_url}/"
+        else:
+            method, url = "PUT", self.manage_url
+
+        response = await self._request_async(
+            client,
+            method,
+            url,
+            data=self._get_data(create=not self.manage_url),
+            files={"c": (file.name, file.read_bytes())},
+        )
+        response.raise_for_status()
+        self._record_upload(file, digest)
+
+        logger.debug(json.dumps(response.json(), ensure_ascii=False, default=str))
+        return response.json()
+
+    def _state_target(self, file: Path) -> str | None:
+        # updating a paste with an expiration extends it, so it is never skipped
+        if not self.manage_url or self.expiration:
+            return None
+        return f"pastebin:{self.manage_url}"
+
+    def _get_data(self, create: bool) -> dict[str, Any]:
+        """Get the form fields of a paste upload.
+
+        Args:
+            create: Whether the paste is created rather than updated.
+
+        Returns:
+            Dictionary of form fields.
+        """
+        # private mode by default
+        data: dict[str, Any] = {"p": True} if create else {}
+        if self.expiration:
+            data["e"] = self.expiration
+        return data
+
     def _create_paste(self, file: Path) -> httpx.Response:
         """Create a new paste on the pastebin service.
 
@@ -96,15 +663,13 @@ class PastebinWorkerUploader(CalendarUploader):
             HTTP response from the pastebin service.
         """
         with open(file, "rb") as f:
-            files = {"c": f}
-            # private mode by default
-            data: dict[str, Any] = {"p": True}
-            if self.expiration:
-                data["e"] = self.expiration
+            # read once, a retried request sends the content again
+            files = {"c": (file.name, f.read())}
+        data = self._get_data(create=True)
 
-            response = httpx.post(f"{self.base_url}/", data=data, files=files)
-            response.raise_for_status()
-            return response
+        response = self._request("POST", f"{self.base_url}/", data=data, files=files)
+        response.raise_for_status()
+        return response
 
     def _update_paste(self, file: Path) -> httpx.Response:
         """Update an existing paste on the pastebin service.
@@ -116,14 +681,12 @@ class PastebinWorkerUploader(CalendarUploader):
             HTTP response from the pastebin service.
         """
         with open(file, "rb") as f:
-            files = {"c": f}
-            data: dict[str, Any] = {}
-            if self.expiration:
-                data["e"] = self.expiration
+            files = {"c": (file.name, f.read())}
+        data = self._get_data(create=False)
 
-            response = httpx.put(self.manage_url, data=data, files=files)
-            response.raise_for_status()
-            return response
+        response = self._request("PUT", self.manage_url, data=data, files=files)
+        response.raise_for_status()
+        return response
 
 
 class GitHubGistUploader(CalendarUploader):
@@ -135,8 +698,16 @@ class GitHubGistUploader(CalendarUploader):
     """
 
     API_BASE_URL = "https://api.github.com"
+    # GitHub asks for at least a second between the write requests of a user
+    WRITE_INTERVAL = 1.0
 
-    def __init__(self, config: dict[str, Any]) -> None:
+    def __init__(
+        self,
+        config: dict[str, Any],
+        client: httpx.Client | None = None,
+        state: "UploadState | None" = None,
+        scheduler: RetryScheduler | None = None,
+    ) -> None:
         """Initialize the GitHub Gist uploader.
 
         Args:
@@ -145,8 +716,11 @@ class GitHubGistUploader(CalendarUploader):
                 - gist_id: Optional gist ID for updating existing gist
                 - description: Optional description for the gist
                 - public: Whether the gist should be public (default: False)
+            client: Optional pooled client, see CalendarUploader.
+            state: Optional upload state, see CalendarUploader.
+            scheduler: Optional retry scheduler, see CalendarUploader.
         """
-        super().__init__(config)
+        super().__init__(config, client, state, scheduler)
         self.token: str = os.environ.get("GITHUB_TOKEN") or config.get("token", "")
         self.gist_id: str | None = config.get("gist_id")
         self.description: str = config.get("description", "Lunar Birthday iCalendar")
@@ -169,11 +743,198 @@ class GitHubGistUploader(CalendarUploader):
             httpx.HTTPError: If the upload request fails.
             ValueError: If the GitHub token is not provided.
         """
+        digest = self._get_digest(file)
+        if self._is_unchanged(file, digest):
+            etag = self.state.get(self._state_target(file)).get("etag")
+            try:
+                unchanged = not etag or self._is_remote_unchanged(
+                    self._request(
+                        "GET", self._gist_url(), headers=self._get_headers(etag)
+                    ),
+                    file,
+                    digest,
+                )
+            except httpx.HTTPError as e:
+                unchanged = self._check_failed(file, e)
+            if unchanged:
+                return self._unchanged_result(file)
+
         if not self.gist_id:
             response = self._create_gist(file)
         else:
             response = self._update_gist(file)
+        self._record_upload(file, digest, response, self._get_file_names(file, digest))
+
+        return self._get_result(response)
+
+    async def upload_async(
+        self, file: Path, client: httpx.AsyncClient
+    ) -> dict[str, Any]:
+        """Upload a calendar file to GitHub Gist with an async client.
+
+        Args:
+            file: Path to the calendar file to upload.
+            client: Client shared by the concurrent uploads.
+
+        Returns:
+            JSON response from the GitHub Gist API.
+
+        Raises:
+            httpx.HTTPError: If the upload request fails.
+        """
+        digest = self._get_digest(file)
+        if self._is_unchanged(file, digest):
+            etag = self.state.get(self._state_target(file)).get("etag")
+            try:
+                unchanged = not etag or self._is_remote_unchanged(
+                    await self._request_async(
+                        client, "GET", self._gist_url(), headers=self._get_headers(etag)
+                    ),
+                    file,
+                    digest,
+                )
+            except httpx.HTTPError as e:
+                unchanged = self._check_failed(file, e)
+            if unchanged:
+                return self._unchanged_result(file)
+
+        content = file.read_text(encoding="utf-8")
+        if not self.gist_id:
+            method, url = "POST", f"{self.API_BASE_URL}/gists"
+        else:
+            method, url = "PATCH", self._gist_url()
+
+        response = await self._request_async(
+            client,
+            method,
+            url,
+            headers=self._get_headers(),
+            json=self._get_payload(file, content),
+        )
+        response.raise_for_status()
+        self._record_upload(file, digest, response, self._get_files(file, content))
+        return self._get_result(response)
+
+    def _state_target(self, file: Path) -> str | None:
+        # several calendars can be files of the same gist
+        return f"github_gist:{self.gist_id}/{file.name}" if self.gist_id else None
+
+    def _get_digest(self, file: Path) -> str | None:
+        if self.state is None or self._state_target(file) is None:
+            return None
+        # the uploaded content is the text, with universal newlines, and the
+        # description is part of the gist
+        content = file.read_text(encoding="utf-8")
+        return _gist_digest(self.description, self._get_files(file, content))
+
+    def _get_files(self, file: Path, content: str) -> dict[str, str]:
+        """Get the gist files of a calendar, split when larger than
+        GIST_FILE_MAX_BYTES.
+
+        Args:
+            file: Path to the calendar file, its name is the gist file name.
+            content: Content of the calendar file.
+
+        Returns:
+            The content of each gist file. The first part of a split calendar
+            keeps the name of the file, so that a growing calendar replaces
+            its gist file, and the next parts are named <stem>-part<N><suffix>.
+        """
+        parts = split_calendar(content)
+        if len(parts) > 1:
+            logger.info("splitting %s into %d gist files", file, len(parts))
+        return {
+            f"{file.stem}-part{index}{file.suffix}" if index > 1 else file.name: part
+            for index, part in enumerate(parts, start=1)
+        }
+
+    def _get_file_names(self, file: Path, digest: str | None) -> list[str] | None:
+        """Get the gist file names of a calendar, None when the state is unused."""
+        if digest is None:
+            return None
+        return list(self._get_files(file, file.read_text(encoding="utf-8")))
+
+    def _get_stale_files(self, file: Path, files: dict[str, str]) -> list[str]:
+        """Get the gist files of the last upload of a calendar that its
+        upload no longer holds, such as the parts of a calendar that shrank.
+
+        Args:
+            file: Path to the calendar file.
+            files: Gist files of the upload, see _get_files.
+
+        Returns:
+            The names of the gist files to delete, known from the upload state.
+        """
+        if self.state is None or self._state_target(file) is None:
+            return []
+        previous = self.state.get(self._state_target(file)).get("files", [])
+        return [name for name in previous if name not in files]
+
+    def _matches_remote(
+        self, result: dict[str, Any], files: dict[str, str], digest: str
+    ) -> bool:
+        """Return whether a gist holds the files of a calendar.
+
+        Args:
+            result: JSON response of a GET of the gist.
+            files: Gist files of the calendar, see _get_files.
+            digest: Content hash of the calendar, see _get_digest.
+        """
+        remote_files = result.get("files") or {}
+        remote_contents = {}
+        for name in files:
+            remote = remote_files.get(name)
+            if not remote or remote.get("truncated") or remote.get("content") is None:
+                return False
+            remote_contents[name] = remote["content"]
+        return _gist_digest(result.get("description") or "", remote_contents) == digest
+
+    def _gist_url(self) -> str:
+        return f"{self.API_BASE_URL}/gists/{self.gist_id}"
+
+    def _is_remote_unchanged(
+        self, response: httpx.Response, file: Path, digest: str
+    ) -> bool:
+        """Check the response of a conditional GET of the gist.
+
+        GitHub answers 304 Not Modified, without counting the request against
+        the rate limit, while the ETag of the last upload is current. When
+        the gist changed since, its content is compared with the upload, and
+        the state records the new ETag if they are the same.
 
+        Args:
+            response: Response of the GET request with If-None-Match.
+            file: Path to the calendar file to upload.
+            digest: Content hash of the upload.
+
+        Returns:
+            Whether the gist already holds the content of the upload.
+
+        Raises:
+            httpx.HTTPError: If the request failed.
+        """
+        if response.status_code == httpx.codes.NOT_MODIFIED:
+            return True
+        response.raise_for_status()
+        files = self._get_files(file, file.read_text(encoding="utf-8"))
+        if not self._matches_remote(response.json(), files, digest):
+            return False
+        self._record_upload(file, digest, response, files)
+        return True
+
+    def _check_failed(self, file: Path, error: httpx.HTTPError) -> bool:
+        """Log a failed check of the gist, the calendar is then uploaded.
+
+        Returns:
+            False, the calendar is not known to be unchanged.
+        """
+        logger.warning(
+            "failed to check gist %s, uploading %s: %s", self.gist_id, file, error
+        )
+        return False
+
+    def _get_result(self, response: httpx.Response) -> dict[str, Any]:
+        """Log and return the JSON response of a gist operation."""
         result = response.json()
         logger.info(
             "GitHub Gist operation successful: gist_id=%s, url=%s",
@@ -183,17 +944,58 @@ class GitHubGistUploader(CalendarUploader):
         logger.debug(json.dumps(result, ensure_ascii=False, default=str))
         return result
 
-    def _get_headers(self) -> dict[str, str]:
+    def _get_payload(self, file: Path, content: str) -> dict[str, Any]:
+        """Get the JSON payload creating or updating the gist.
+
+        Args:
+            file: Path to the calendar file, its name is the gist file name.
+            content: Content of the calendar file.
+
+        Returns:
+            The JSON payload, public is only set when creating the gist.
+        """
+        files = self._get_files(file, content)
+        return self._get_batch_payload(files, self._get_stale_files(file, files))
+
+    def _get_batch_payload(
+        self, files: dict[str, str], deleted: Iterable[str] = ()
+    ) -> dict[str, Any]:
+        """Get the JSON payload creating or updating the gist with files.
+
+        Args:
+            files: Content of each gist file.
+            deleted: Names of the gist files to delete.
+
+        Returns:
+            The JSON payload, public is only set when creating the gist.
+        """
+        payload: dict[str, Any] = {"description": self.description}
+        if not self.gist_id:
+            payload["public"] = self.public
+        # a null file deletes it from the gist
+        payload["files"] = dict.fromkeys(deleted)
+        payload["files"].update(
+            {name: {"content": text} for name, text in files.items()}
+        )
+        return payload
+
+    def _get_headers(self, etag: str | None = None) -> dict[str, str]:
         """Get HTTP headers for GitHub API requests.
 
+        Args:
+            etag: Optional ETag of a conditional request.
+
         Returns:
             Dictionary of HTTP headers including authorization.
         """
-        return {
+        headers = {
             "Accept": "application/vnd.github+json",
             "Authorization": f"Bearer {self.token}",
             "X-GitHub-Api-Version": "2022-11-28",
         }
+        if etag:
+            headers["If-None-Match"] = etag
+        return headers
 
     def _create_gist(self, file: Path) -> httpx.Response:
         """Create a new gist on GitHub.
@@ -207,17 +1009,11 @@ class GitHubGistUploader(CalendarUploader):
         with open(file, "r", encoding="utf-8") as f:
             content = f.read()
 
-        payload = {
-            "description": self.description,
-            "public": self.public,
-            "files": {file.name: {"content": content}},
-        }
-
-        response = httpx.post(
+        response = self._request(
+            "POST",
             f"{self.API_BASE_URL}/gists",
             headers=self._get_headers(),
-            json=payload,
-            timeout=30.0,
+            json=self._get_payload(file, content),
         )
         response.raise_for_status()
         return response
@@ -234,16 +1030,381 @@ class GitHubGistUploader(CalendarUploader):
         with open(file, "r", encoding="utf-8") as f:
             content = f.read()
 
-        payload = {
-            "description": self.description,
-            "files": {file.name: {"content": content}},
-        }
-
-        response = httpx.patch(
-            f"{self.API_BASE_URL}/gists/{self.gist_id}",
+        response = self._request(
+            "PATCH",
+            self._gist_url(),
             headers=self._get_headers(),
-            json=payload,
-            timeout=30.0,
+            json=self._get_payload(file, content),
         )
         response.raise_for_status()
         return response
+
+
+async def upload_with_timeout(
+    uploader: CalendarUploader, file: Path, client: httpx.AsyncClient
+) -> dict[str, Any]:
+    """Run upload_async, bounded by the timeout of the uploader.
+
+    The timeout of an uploader with a scheduler is extended by its retries,
+    see CalendarUploader._get_upload_timeout.
+
+    Raises:
+        TimeoutError: If the upload did not complete in time.
+    """
+    return await asyncio.wait_for(
+        uploader.upload_async(file, client), uploader._get_upload_timeout()
+    )
+
+
+async def upload_concurrently(
+    uploads: Iterable[tuple[CalendarUploader, Path]],
+    client: httpx.AsyncClient | None = None,
+) -> list[dict[str, Any] | Exception]:
+    """Run uploads concurrently, sharing one async client.
+
+    A failing or timed out upload does not cancel the others, its exception
+    is returned in place of its result.
+
+    Args:
+        uploads: Pairs of uploader and calendar file to upload.
+        client: Client shared by the uploads, a new one is created and
+            closed when None.
+
+    Returns:
+        The result or exception of each upload, in order.
+    """
+    if client is None:
+        async with httpx.AsyncClient() as client:
+            return await upload_concurrently(uploads, client)
+
+    async def run(uploader: CalendarUploader, file: Path) -> dict[str, Any] | Exception:
+        try:
+            return await upload_with_timeout(uploader, file, client)
+        except Exception as e:
+            return e
+
+    return await asyncio.gather(*(run(uploader, file) for uploader, file in uploads))
+
+
+class AsyncUploadPipeline:
+    """Concurrent uploads submitted from synchronous code.
+
+    An event loop runs in a background thread, the uploads submitted from any
+    thread run on it concurrently and share one httpx.AsyncClient, so that
+    the uploads of a config file overlap with each other and with the
+    generation of the next config files.
+    """
+
+    def __init__(self, concurrency: int = 8, **client_options: Any) -> None:
+        """Initialize a pipeline, started when entering its context.
+
+        Args:
+            concurrency: Maximum number of uploads running at a time.
+            client_options: Keyword arguments of the httpx.AsyncClient.
+        """
+        if concurrency <= 0:
+            raise ValueError("concurrency must be a positive integer")
+        self.concurrency = concurrency
+        self.client_options = client_options
+        self.client: httpx.AsyncClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._futures: list[concurrent.futures.Future] = []
+
+    def __enter__(self) -> "AsyncUploadPipeline":
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="upload-pipeline", daemon=True
+        )
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._open(), self._loop).result()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    async def _open(self) -> None:
+        self.client = httpx.AsyncClient(**self.client_options)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def _upload(self, uploader: CalendarUploader, file: Path) -> dict[str, Any]:
+        async with self._semaphore:
+            return await upload_with_timeout(uploader, file, self.client)
+
+    def submit(
+        self, uploader: CalendarUploader, file: Path
+    ) -> concurrent.futures.Future:
+        """Schedule an upload.
+
+        Args:
+            uploader: Uploader of the file.
+            file: Path to the calendar file to upload.
+
+        Returns:
+            Future of the upload result, failed uploads set its exception.
+        """
+        if self._loop is None:
+            raise RuntimeError("the pipeline is not started")
+        future = asyncio.run_coroutine_threadsafe(
+            self._upload(uploader, file), self._loop
+        )
+        self._futures.append(future)
+        return future
+
+    def close(self) -> None:
+        """Wait for the submitted uploads, then stop the event loop."""
+        if self._loop is None:
+            return
+        concurrent.futures.wait(self._futures)
+        self._futures.clear()
+        asyncio.run_coroutine_threadsafe(self.client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = self._thread = None
+
+
+# compared by identity, the files can be large
+@dataclasses.dataclass(slots=True, eq=False)
+class _GistBatchEntry:
+    """Calendar file of a GistBatch, with its gist files and content hash."""
+
+    uploader: GitHubGistUploader
+    file: Path
+    future: concurrent.futures.Future
+    files: dict[str, str]
+    deleted: list[str]
+    digest: str | None
+    size: int
+
+
+class GistBatch:
+    """GitHub Gist uploads of many calendars, pushed several per request.
+
+    The calendars added to a batch are uploaded by flush(). The calendars of
+    the same gist, or of new gists with the same token, description and
+    visibility, are pushed as the files of one PATCH or POST request per
+    size gist files, so that hundreds of calendars cost a handful of rate
+    limited requests. A request pushes at most max_bytes of files, and each
+    request of new gists creates a gist.
+
+    Calendars with the same file name, such as a/family.ics and b/family.ics,
+    cannot share a gist: the later one fails when they target the same gist,
+    and is pushed to another new gist otherwise.
+    """
+
+    DEFAULT_SIZE = 50
+
+    def __init__(
+        self, size: int = DEFAULT_SIZE, max_bytes: int = GIST_BATCH_MAX_BYTES
+    ) -> None:
+        """Initialize an empty batch.
+
+        Args:
+            size: Maximum number of gist files pushed by a request, at most
+                GIST_MAX_FILES. A calendar split into more files is pushed on
+                its own.
+            max_bytes: Maximum size of the files pushed by a request, a
+                calendar larger than that is pushed on its own.
+        """
+        if not 0 < size <= GIST_MAX_FILES:
+            raise ValueError(f"size must be between 1 and {GIST_MAX_FILES}")
+        self.size = size
+        self.max_bytes = max_bytes
+        self._entries: list[tuple[GitHubGistUploader, Path, concurrent.futures.Future]]
+        self._entries = []
+        self._lock = threading.Lock()
+
+    def add(
+        self, uploader: GitHubGistUploader, file: Path
+    ) -> concurrent.futures.Future:
+        """Add a calendar to the batch.
+
+        Args:
+            uploader: Uploader of the gist of the calendar.
+            file: Path to the calendar file to upload.
+
+        Returns:
+            Future of the upload result, set by flush(). Failed uploads set
+            its exception.
+        """
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            self._entries.append((uploader, file, future))
+        return future
+
+    def flush(self) -> None:
+        """Upload the calendars added since the last flush."""
+        with self._lock:
+            entries, self._entries = self._entries, []
+
+        groups: dict[tuple, list] = {}
+        for uploader, file, future in entries:
+            key = (
+                uploader.token,
+                uploader.gist_id,
+                uploader.description,
+                uploader.public,
+            )
+            groups.setdefault(key, []).append((uploader, file, future))
+        for group in groups.values():
+            try:
+                self._upload_group(group)
+            except Exception as e:
+                for _, _, future in group:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _upload_group(
+        self,
+        group: list[tuple[GitHubGistUploader, Path, concurrent.futures.Future]],
+    ) -> None:
+        """Upload the calendars of the same gist, or of new gists."""
+        entries = []
+        for uploader, file, future in group:
+            try:
+                files = uploader._get_files(file, file.read_text(encoding="utf-8"))
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            digest = None
+            if uploader.state is not None and uploader._state_target(file):
+                digest = _gist_digest(uploader.description, files)
+            deleted = uploader._get_stale_files(file, files)
+            size = sum(len(text.encode("utf-8")) for text in files.values())
+            entries.append(
+                _GistBatchEntry(uploader, file, future, files, deleted, digest, size)
+            )
+        if not entries:
+            return
+
+        uploader = entries[0].uploader
+        if uploader.gist_id:
+            entries = self._drop_duplicates(entries)
+        url = (
+            uploader._gist_url()
+            if uploader.gist_id
+            else f"{uploader.API_BASE_URL}/gists"
+        )
+        method = "PATCH" if uploader.gist_id else "POST"
+        for chunk in self._chunks(self._skip_unchanged(entries)):
+            files = {
+                name: text for entry in chunk for name, text in entry.files.items()
+            }
+            deleted = [name for entry in chunk for name in entry.deleted]
+            try:
+                response = uploader._request(
+                    method,
+                    url,
+                    headers=uploader._get_headers(),
+                    json=uploader._get_batch_payload(files, deleted),
+                )
+                response.raise_for_status()
+                result = uploader._get_result(response)
+            except Exception as e:
+                for entry in chunk:
+                    entry.future.set_exception(e)
+                continue
+            for entry in chunk:
+                entry.uploader._record_upload(
+                    entry.file, entry.digest, response, entry.files
+                )
+                entry.future.set_result(result)
+
+    def _skip_unchanged(self, entries: list[_GistBatchEntry]) -> list[_GistBatchEntry]:
+        """Resolve the calendars the gist already holds, return the others.
+
+        As for a single upload, the calendars whose content did not change
+        locally are checked against the gist, with one conditional GET for
+        all of them.
+        """
+        skipped: list[_GistBatchEntry] = []
+        checked: list[_GistBatchEntry] = []
+        etags = set()
+        for entry in entries:
+            uploader, file = entry.uploader, entry.file
+            if not uploader._is_unchanged(file, entry.digest):
+                continue
+            etag = uploader.state.get(uploader._state_target(file)).get("etag")
+            if etag:
+                checked.append(entry)
+                etags.add(etag)
+            else:
+                skipped.append(entry)
+
+        if checked:
+            uploader = checked[0].uploader
+            # a 304 only proves every calendar current when they share the ETag
+            etag = etags.pop() if len(etags) == 1 else None
+            try:
+                response = uploader._request(
+                    "GET", uploader._gist_url(), headers=uploader._get_headers(etag)
+                )
+                if response.status_code == httpx.codes.NOT_MODIFIED:
+                    skipped.extend(checked)
+                else:
+                    response.raise_for_status()
+                    result = response.json()
+                    for entry in checked:
+                        if entry.uploader._matches_remote(
+                            result, entry.files, entry.digest
+                        ):
+                            entry.uploader._record_upload(
+                                entry.file, entry.digest, response, entry.files
+                            )
+                            skipped.append(entry)
+            except httpx.HTTPError as e:
+                logger.warning("failed to check gist %s: %s", uploader.gist_id, e)
+
+        for entry in skipped:
+            entry.future.set_result(entry.uploader._unchanged_result(entry.file))
+        return [entry for entry in entries if entry not in skipped]
+
+    def _drop_duplicates(self, entries: list[_GistBatchEntry]) -> list[_GistBatchEntry]:
+        """Fail the calendars whose gist files another calendar already pushes
+        or deletes.
+
+        Pushing both would silently replace the files of the first calendar.
+        """
+        names: dict[str, Path] = {}
+        unique = []
+        for entry in entries:
+            entry_names = [*entry.files, *entry.deleted]
+            duplicates = sorted(names.keys() & set(entry_names))
+            if duplicates:
+                entry.future.set_exception(
+                    ValueError(
+                        f"gist file {duplicates[0]} of {entry.file} is already "
+                        f"uploaded from {names[duplicates[0]]} to gist "
+                        f"{entry.uploader.gist_id}"
+                    )
+                )
+                continue
+            names.update(dict.fromkeys(entry_names, entry.file))
+            unique.append(entry)
+        return unique
+
+    def _chunks(
+        self, entries: list[_GistBatchEntry]
+    ) -> Iterable[list[_GistBatchEntry]]:
+        """Group the entries by at most size gist files and max_bytes.
+
+        Entries with the same gist file name go to different chunks.
+        """
+        chunk: list[_GistBatchEntry] = []
+        names: set[str] = set()
+        chunk_bytes = 0
+        for entry in entries:
+            if chunk and (
+                len(names) + len(entry.files) > self.size
+                or chunk_bytes + entry.size > self.max_bytes
+                or not names.isdisjoint(entry.files)
+            ):
+                yield chunk
+                chunk, names, chunk_bytes = [], set(), 0
+            chunk.append(entry)
+            names.update(entry.files)
+            chunk_bytes += entry.size
+        if chunk:
+            yield chunk
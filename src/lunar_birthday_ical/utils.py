@@ -1,8 +1,21 @@
+import array
 import datetime
 import logging
 import zoneinfo
+from collections.abc import Sequence
 
-from lunar_python import Lunar, LunarYear
+try:
+    import numpy
+except ImportError:  # pragma: no cover - numpy is an optional dependency
+    numpy = None
+
+from lunar_birthday_ical.lunar import (
+    lunar_leap_month,
+    lunar_month_days,
+    lunar_to_solar,
+    solar_to_lunar_ymd,
+)
+from lunar_birthday_ical.timezones import UTC
 
 logger = logging.getLogger(__name__)
 
@@ -26,9 +39,8 @@ def local_datetime_to_utc_datetime(
     local_datetime: datetime.datetime,
 ) -> datetime.datetime:
     # 将 local_datetime "强制"转换为 UTC 时间, 注意 local_datetime 需要携带 tzinfo 信息
-    utc = zoneinfo.ZoneInfo("UTC")
     # 这里宁可让它抛出错误信息, 也不要设置 默认值
-    utc_datetime = local_datetime.replace(tzinfo=utc) - local_datetime.utcoffset()
+    utc_datetime = local_datetime.replace(tzinfo=UTC) - local_datetime.utcoffset()
 
     return utc_datetime
 
@@ -57,40 +69,104 @@ def get_future_solar_datetime(
     Returns:
         The solar datetime corresponding to the same lunar date in the target year.
     """
-    # 计算给定 公历日期 对应的 农历日期
-    # Lunar.fromDate 所接受的类型为 datetime.datetime, 实际上处理后会把 time 部分丢弃
-    lunar_date = Lunar.fromDate(solar_datetime)
-    target_lunar_year = LunarYear.fromYear(target_year)
-
-    # 获取目标农历年的闰月
-    # 获取闰月 :return: 闰月数字, 1代表闰1月, 0代表无闰月
-    leap_month = target_lunar_year.getLeapMonth()
-
-    # 确定目标年份的农历月, 闰月使用负数, 非闰月使用正数
-    if lunar_date.getMonth() > 0:
-        target_lunar_month = target_lunar_year.getMonth(lunar_date.getMonth())
-    elif abs(lunar_date.getMonth()) == leap_month:
-        target_lunar_month = target_lunar_year.getMonth(lunar_date.getMonth())
-    else:
-        target_lunar_month = target_lunar_year.getMonth(abs(lunar_date.getMonth()))
-
-    # 确定农历日
-    target_lunar_day = min(lunar_date.getDay(), target_lunar_month.getDayCount())
-
-    # 创建目标年份的农历日期
-    target_lunar_date = Lunar.fromYmd(
-        target_year, target_lunar_month.getMonth(), target_lunar_day
-    )
+    return get_future_solar_datetimes(solar_datetime, target_year, target_year)[0]
+
+
+def get_future_solar_datetimes(
+    solar_datetime: datetime.datetime, year_start: int, year_end: int
+) -> list[datetime.datetime]:
+    """
+    Calculate the solar datetimes for the same lunar date in a range of years.
 
-    # 转换为公历日期, 恢复原本的时间和 timezone
+    This is the batch version of `get_future_solar_datetime`, the lunar month
+    and day of `solar_datetime` are derived only once for the whole range.
+
+    Args:
+        solar_datetime: The original solar datetime.
+        year_start: The first target year, inclusive.
+        year_end: The last target year, inclusive.
+
+    Returns:
+        The solar datetimes corresponding to the same lunar date in each target
+        year, in ascending year order.
+    """
+    # 计算给定 公历日期 对应的 农历日期, 只使用 date 部分, time 部分会被丢弃
+    _, lunar_month, lunar_day = solar_to_lunar_ymd(solar_datetime.date())
+    # 恢复原本的时间和 timezone
     solar_time = solar_datetime.time()
-    target_solar_datetime = datetime.datetime.strptime(
-        target_lunar_date.getSolar().toYmd(), "%Y-%m-%d"
-    ).replace(
-        hour=solar_time.hour,
-        minute=solar_time.minute,
-        second=solar_time.second,
-        tzinfo=solar_datetime.tzinfo,
-    )
+    target_time = datetime.time(solar_time.hour, solar_time.minute, solar_time.second)
+
+    target_solar_datetimes = []
+    for target_year in range(year_start, year_end + 1):
+        # 获取目标农历年的闰月
+        # 获取闰月 :return: 闰月数字, 1代表闰1月, 0代表无闰月
+        leap_month = lunar_leap_month(target_year)
+
+        # 确定目标年份的农历月, 闰月使用负数, 非闰月使用正数
+        if lunar_month > 0 or abs(lunar_month) == leap_month:
+            target_lunar_month = lunar_month
+        else:
+            target_lunar_month = abs(lunar_month)
+
+        # 确定农历日
+        target_lunar_day = min(
+            lunar_day, lunar_month_days(target_year, target_lunar_month)
+        )
+
+        # 创建目标年份的农历日期, 转换为公历日期
+        target_solar_date = lunar_to_solar(
+            target_year, target_lunar_month, target_lunar_day
+        )
+        target_solar_datetimes.append(
+            datetime.datetime.combine(
+                target_solar_date, target_time, solar_datetime.tzinfo
+            )
+        )
+
+    return target_solar_datetimes
+
+
+def get_integer_days(
+    start_date: datetime.date,
+    year_start: int,
+    year_end: int,
+    days_interval: int,
+    days_max: int,
+) -> Sequence[int]:
+    """
+    Calculate the integer day milestones which fall in a range of years.
 
-    return target_solar_datetime
+    Only multiples of `days_interval` up to `days_max` are milestones. The
+    first and last milestone in the year window are derived arithmetically, so
+    the cost scales with the number of milestones returned, not with
+    `days_max`. The offsets are generated with NumPy when it is installed.
+
+    Args:
+        start_date: The date to count days from.
+        year_start: The first year of the window, inclusive.
+        year_end: The last year of the window, inclusive.
+        days_interval: Interval between two milestones, in days.
+        days_max: Maximum number of days.
+
+    Returns:
+        The milestones as a number of days since `start_date`, in ascending order,
+        as a NumPy array or an array.array, both support `tolist()`.
+    """
+    if days_interval <= 0:
+        raise ValueError("days_interval must be a positive integer")
+
+    # 年份窗口相对于 start_date 的天数范围
+    days_low = (datetime.date(year_start, 1, 1) - start_date).days
+    days_high = (datetime.date(year_end, 12, 31) - start_date).days
+
+    # 窗口内第一个和最后一个 days_interval 的倍数, 第一个至少为 days_interval
+    first = max(1, -(-days_low // days_interval))
+    last = min(days_max, days_high) // days_interval
+    if first > last:
+        return array.array("q")
+
+    if numpy is not None:
+        return numpy.arange(first, last + 1, dtype=numpy.int64) * days_interval
+    return array.array(
+        "q", range(first * days_interval, last * days_interval + 1, days_interval)
+    )
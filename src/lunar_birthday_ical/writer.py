@@ -0,0 +1,280 @@
+"""Streaming iCalendar serializer.
+
+Renders VEVENT / VALARM components straight to text, one event at a time,
+without building an icalendar object tree. The output follows the same
+property order, escaping and line folding as icalendar's to_ical(), so both
+code paths produce byte-identical files.
+"""
+
+import datetime
+import re
+from typing import BinaryIO
+
+CRLF = "\r\n"
+
+# chars presence of which in parameter value will cause the value
+# to be enclosed in double-quotes
+QUOTABLE = re.compile("[,;:’]")
+RFC_6868_ESCAPE = re.compile(r'\^|\r\n|\r|\n|"')
+RFC_6868_REPLACEMENTS = {"^": "^^", "\r\n": "^n", "\r": "^n", "\n": "^n", '"': "^'"}
+
+
+def escape_text(text: str) -> str:
+    """Escape a TEXT value as defined in RFC 5545 section 3.3.11."""
+    # NOTE: ORDER MATTERS!
+    return (
+        text.replace(r"\N", "\n")
+        .replace("\\", "\\\\")
+        .replace(";", r"\;")
+        .replace(",", r"\,")
+        .replace("\r\n", r"\n")
+        .replace("\n", r"\n")
+        .replace("\r", r"\n")
+    )
+
+
+def escape_param(value: str) -> str:
+    """Escape a parameter value as defined in RFC 6868, quoting it if needed."""
+    value = RFC_6868_ESCAPE.sub(lambda m: RFC_6868_REPLACEMENTS[m.group(0)], value)
+    value = value.replace('"', "'")
+    if QUOTABLE.search(value):
+        return f'"{value}"'
+    return value
+
+
+def fold_line(line: str, limit: int = 75) -> str:
+    """Fold a content line as defined in RFC 5545 section 3.1.
+
+    Lines are split so that no physical line exceeds limit octets, never
+    inside a multi-byte character nor right after an escape character.
+    """
+    if len(line) < limit and line.isascii():
+        return line
+
+    folded_lines: list[str] = []
+    current_chars: list[str] = []
+    byte_count = 0
+    for char in line:
+        char_byte_len = len(char.encode("utf-8"))
+        if current_chars and byte_count + char_byte_len >= limit:
+            # avoid splitting backslash or RFC 6868 escapes across lines
+            if len(current_chars) > 1 and current_chars[-1] in "\\^":
+                escaped_prefix = current_chars.pop()
+                folded_lines.append("".join(current_chars))
+                current_chars = [escaped_prefix]
+                byte_count = len(escaped_prefix.encode("utf-8"))
+            else:
+                folded_lines.append("".join(current_chars))
+                current_chars = []
+                byte_count = 0
+        current_chars.append(char)
+        byte_count += char_byte_len
+
+    if current_chars:
+        folded_lines.append("".join(current_chars))
+
+    return (CRLF + " ").join(folded_lines)
+
+
+def format_datetime(value: datetime.datetime) -> str:
+    """Format an aware datetime as a UTC DATE-TIME value."""
+    v = value.astimezone(datetime.timezone.utc)
+    return f"{v.year:04}{v.month:02}{v.day:02}T{v.hour:02}{v.minute:02}{v.second:02}Z"
+
+
+def format_duration(value: datetime.timedelta) -> str:
+    """Format a timedelta as a DURATION value, e.g. -P1D or PT1H30M."""
+    sign = ""
+    if value.days < 0:
+        sign = "-"
+        value = -value
+    timepart = ""
+    if value.seconds:
+        timepart = "T"
+        hours = value.seconds // 3600
+        minutes = value.seconds % 3600 // 60
+        seconds = value.seconds % 60
+        if hours:
+            timepart += f"{hours}H"
+        if minutes or (hours and seconds):
+            timepart += f"{minutes}M"
+        if seconds:
+            timepart += f"{seconds}S"
+    if value.days == 0 and timepart:
+        return f"{sign}P{timepart}"
+    return f"{sign}P{value.days}D{timepart}"
+
+
+def content_line(name: str, value: str, params: dict[str, str] | None = None) -> str:
+    """Render a folded content line terminated by CRLF.
+
+    Args:
+        name: Property name.
+        value: Property value, already escaped / formatted.
+        params: Optional property parameters, rendered in sorted order.
+    """
+    if params:
+        rendered_params = ";".join(
+            f"{key.upper()}={escape_param(params[key])}" for key in sorted(params)
+        )
+        line = f"{name};{rendered_params}:{value}"
+    else:
+        line = f"{name}:{value}"
+    return fold_line(line) + CRLF
+
+
+class AlarmTemplate:
+    """DISPLAY VALARM component pre-rendered up to its DESCRIPTION and UID.
+
+    Events sharing their reminders can share the templates of their alarms,
+    only the DESCRIPTION and UID lines are rendered per event.
+    """
+
+    __slots__ = ("trigger", "trigger_line")
+
+    HEADER = "BEGIN:VALARM" + CRLF + content_line("ACTION", "DISPLAY")
+    FOOTER = "END:VALARM" + CRLF
+
+    def __init__(self, trigger: datetime.datetime | datetime.timedelta) -> None:
+        """Pre-render the TRIGGER line of the alarm.
+
+        Args:
+            trigger: Absolute or relative trigger of the alarm.
+        """
+        if isinstance(trigger, datetime.datetime):
+            trigger_value = format_datetime(trigger)
+        else:
+            trigger_value = format_duration(trigger)
+        self.trigger = trigger
+        self.trigger_line = content_line("TRIGGER", trigger_value)
+
+    def render(self, uid: str, description_line: str) -> str:
+        """Render the alarm.
+
+        Args:
+            uid: Alarm UID.
+            description_line: Rendered DESCRIPTION line, see content_line.
+        """
+        return "".join(
+            [
+                self.HEADER,
+                description_line,
+                self.trigger_line,
+                content_line("UID", escape_text(uid)),
+                self.FOOTER,
+            ]
+        )
+
+
+def render_alarm(
+    uid: str,
+    trigger: datetime.datetime | datetime.timedelta,
+    description: str,
+) -> str:
+    """Render a DISPLAY VALARM component."""
+    return AlarmTemplate(trigger).render(
+        uid, content_line("DESCRIPTION", escape_text(description))
+    )
+
+
+def render_attendee(email: str) -> str:
+    """Render a required-participant ATTENDEE property."""
+    return content_line(
+        "ATTENDEE",
+        f"mailto:{email}",
+        {"CN": email.split("@")[0], "ROLE": "REQ-PARTICIPANT"},
+    )
+
+
+def render_event(
+    uid: str,
+    dtstamp: datetime.datetime,
+    dtstart: datetime.datetime,
+    dtend: datetime.datetime,
+    summary: str,
+    description: str,
+    alarms: list[str],
+    attendees: list[str],
+    recurrence_id: datetime.datetime | None = None,
+    rrule: str | None = None,
+    rdates: list[datetime.datetime] | None = None,
+) -> str:
+    """Render a VEVENT component.
+
+    Args:
+        uid: Event UID.
+        dtstamp: Event DTSTAMP.
+        dtstart: Event start, an aware datetime.
+        dtend: Event end, an aware datetime.
+        summary: Event summary.
+        description: Event description.
+        alarms: Rendered VALARM components, see render_alarm.
+        attendees: Rendered ATTENDEE properties, see render_attendee.
+        recurrence_id: Start of the overridden occurrence of a recurring event.
+        rrule: Recurrence rule value, e.g. "FREQ=YEARLY;COUNT=5".
+        rdates: Additional occurrences of a recurring event.
+
+    Returns:
+        The VEVENT component text, lines terminated by CRLF.
+    """
+    recurrence = []
+    if recurrence_id is not None:
+        recurrence.append(content_line("RECURRENCE-ID", format_datetime(recurrence_id)))
+    if rrule:
+        recurrence.append(content_line("RRULE", rrule))
+    if rdates:
+        recurrence.append(
+            content_line("RDATE", ",".join(format_datetime(d) for d in rdates))
+        )
+
+    return "".join(
+        [
+            "BEGIN:VEVENT" + CRLF,
+            content_line("SUMMARY", escape_text(summary)),
+            content_line("DTSTART", format_datetime(dtstart)),
+            content_line("DTEND", format_datetime(dtend)),
+            content_line("DTSTAMP", format_datetime(dtstamp)),
+            content_line("UID", escape_text(uid)),
+            *recurrence,
+            *attendees,
+            content_line("DESCRIPTION", escape_text(description)),
+            *alarms,
+            "END:VEVENT" + CRLF,
+        ]
+    )
+
+
+class CalendarWriter:
+    """Write a VCALENDAR document to a binary stream, one event at a time."""
+
+    def __init__(self, stream: BinaryIO) -> None:
+        """Initialize the writer.
+
+        Args:
+            stream: Binary stream the calendar is written to.
+        """
+        self.stream = stream
+        self.bytes_written = 0
+
+    def write(self, text: str) -> None:
+        """Write already rendered calendar text."""
+        self.bytes_written += self.stream.write(text.encode("utf-8"))
+
+    def begin(self, properties: list[tuple[str, str]]) -> None:
+        """Write the VCALENDAR header.
+
+        Args:
+            properties: Calendar properties as (name, unescaped TEXT value)
+                pairs, in output order.
+        """
+        self.write(
+            "BEGIN:VCALENDAR"
+            + CRLF
+            + "".join(
+                content_line(name, escape_text(value)) for name, value in properties
+            )
+        )
+
+    def end(self) -> None:
+        """Write the VCALENDAR footer."""
+        self.write("END:VCALENDAR" + CRLF)
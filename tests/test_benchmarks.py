@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from benchmarks.suite import RESULTS_VERSION, compare, main, make_config
+
+
+def results(**timings: float) -> dict:
+    return {
+        "version": RESULTS_VERSION,
+        "results": {name: {"min": t, "median": t} for name, t in timings.items()},
+    }
+
+
+def test_make_config():
+    config = make_config(1_000, 50)
+
+    assert config["global"]["year_end"] - config["global"]["year_start"] == 49
+    assert len(config["events"]) == 8
+    assert len({item["name"] for item in config["events"]}) == 8
+    assert config == make_config(1_000, 50)
+
+
+def test_compare():
+    baseline = results(a=1.0, b=1.0, c=1.0)
+    current = results(a=1.1, b=1.3, c=0.5, d=9.0)
+
+    assert compare(baseline, current, threshold=0.2) == ["b"]
+    assert compare(baseline, current, threshold=0.05) == ["a", "b"]
+
+
+def test_compare_version():
+    baseline = results(a=1.0) | {"version": RESULTS_VERSION + 1}
+
+    with pytest.raises(ValueError):
+        compare(baseline, results(a=1.0))
+
+
+def test_main(tmp_path):
+    output = tmp_path / "baseline.json"
+    argv = ["--sizes", "10", "--spans", "5", "-r", "1", "-k", "x5y]"]
+
+    assert main(argv + ["--save", str(output)]) == 0
+    saved = json.loads(output.read_text(encoding="utf-8"))
+    assert set(saved["results"]) == {"generate[10x5y]", "save[10x5y]"}
+    assert saved["results"]["generate[10x5y]"]["events"] > 10
+
+    # every benchmark is flagged against a baseline a thousand times faster
+    for result in saved["results"].values():
+        result["min"] /= 1000
+    output.write_text(json.dumps(saved), encoding="utf-8")
+    assert main(argv + ["--compare", str(output)]) == 1
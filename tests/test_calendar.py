@@ -1,5 +1,9 @@
+import copy
+import json
 from pathlib import Path
 
+import httpx
+import pytest
 import yaml
 from chaos_utils.dict_utils import deep_merge
 from icalendar import Calendar, Event, vCalAddress, vText
@@ -10,6 +14,8 @@ from lunar_birthday_ical.config import (
     tests_config,
     tests_config_overwride_global,
 )
+from lunar_birthday_ical.event_cache import EventCache
+from lunar_birthday_ical.uploader import AsyncUploadPipeline, GistBatch
 
 
 def test_add_reminders_to_event():
@@ -91,3 +97,301 @@ def test_create_calendar_with_override_timezone(tmp_path: Path):
     assert len(calendar.subcomponents) > 0
     assert calendar.get("X-WR-CALNAME") == calendar_name
     assert calendar.get("X-WR-TIMEZONE") == vText(b"America/Los_Angeles")
+
+
+def test_create_calendar_stream(tmp_path: Path):
+    config = deep_merge(default_config, copy.deepcopy(tests_config))
+    config["global"]["deterministic"] = True
+    config["global"]["holiday_keys"] = ["mothers_day"]
+    config["global"]["attendees"] = ["test@example.com", "b,c@example.net"]
+    config["events"][0]["summary"] = "长" * 40 + "; {name}, {year}\n"
+
+    outputs = []
+    for stream in (False, True):
+        config_file = tmp_path / str(stream) / "test-calendar.yaml"
+        config_file.parent.mkdir()
+        config_file.write_text(yaml.safe_dump(config))
+
+        app = LunarCalendarApp(config_file, stream=stream)
+        app.generate()
+        outputs.append(app.save().read_bytes())
+
+    assert outputs[0] == outputs[1]
+
+
+def test_create_calendar_deterministic(tmp_path: Path):
+    config = deep_merge(default_config, tests_config)
+    config["global"]["deterministic"] = True
+    config["global"]["holiday_keys"] = ["fathers_day"]
+
+    outputs = []
+    for run, stream in enumerate((False, False, True)):
+        config_file = tmp_path / str(run) / "test-calendar.yaml"
+        config_file.parent.mkdir()
+        config_file.write_text(yaml.safe_dump(config))
+
+        app = LunarCalendarApp(config_file, stream=stream)
+        app.generate()
+        outputs.append(app.save().read_bytes())
+
+    assert outputs[0] == outputs[1] == outputs[2]
+
+    calendar = Calendar.from_ical(outputs[0])
+    events = calendar.walk("VEVENT")
+    assert len({str(event.get("UID")) for event in events}) == len(events)
+    assert events[0].get("DTSTAMP").to_ical() == b"20250101T000000Z"
+
+
+def test_create_calendar_deterministic_dtstamp(tmp_path: Path):
+    config = deep_merge(default_config, tests_config)
+    config["global"]["deterministic"] = True
+    config["global"]["dtstamp"] = "2024-06-01T12:00:00+08:00"
+    config_file = tmp_path / "test-calendar.yaml"
+    config_file.write_text(yaml.safe_dump(config))
+
+    app = LunarCalendarApp(config_file)
+    app.generate()
+    calendar = Calendar.from_ical(app.save().read_bytes())
+
+    event = calendar.walk("VEVENT")[0]
+    assert event.get("DTSTAMP").to_ical() == b"20240601T040000Z"
+
+
+def test_create_calendar_with_event_cache(tmp_path: Path):
+    config = deep_merge(default_config, copy.deepcopy(tests_config))
+    config["global"]["deterministic"] = True
+    config["global"]["holiday_keys"] = ["mothers_day"]
+    config_file = tmp_path / "test-calendar.yaml"
+    config_file.write_text(yaml.safe_dump(config))
+
+    app = LunarCalendarApp(config_file)
+    app.generate()
+    expected = app.save().read_bytes()
+
+    cache = EventCache(tmp_path / "cache")
+    for stream in (False, True, False):
+        app = LunarCalendarApp(config_file, stream=stream, cache=cache)
+        app.generate()
+        assert app.save().read_bytes() == expected
+    # two items and the holidays, generated once then spliced from the cache
+    assert cache.stats() == {"hits": 6, "misses": 3, "evictions": 0}
+
+    config["events"][0]["name"] = "王五"
+    config_file.write_text(yaml.safe_dump(config))
+    app = LunarCalendarApp(config_file, cache=cache)
+    app.generate()
+    assert "王五".encode() in app.save().read_bytes()
+    assert cache.stats()["misses"] == 4
+
+
+def test_create_calendar_parallel(tmp_path: Path):
+    config = deep_merge(default_config, tests_config)
+    config["global"]["deterministic"] = True
+    config["global"]["holiday_keys"] = ["mothers_day"]
+    config_file = tmp_path / "test-calendar.yaml"
+    config_file.write_text(yaml.safe_dump(config))
+
+    app = LunarCalendarApp(config_file)
+    app.generate()
+    expected = app.save().read_bytes()
+
+    cache = EventCache(tmp_path / "cache")
+    for stream, cached in ((False, None), (True, None), (False, cache), (True, cache)):
+        app = LunarCalendarApp(config_file, stream=stream, cache=cached, jobs=2)
+        app.generate()
+        assert app.save().read_bytes() == expected
+
+
+def test_create_calendar_compress(tmp_path: Path):
+    config = deep_merge(default_config, copy.deepcopy(tests_config))
+    config["global"]["deterministic"] = True
+    config["global"]["compress"] = True
+    config["global"]["holiday_keys"] = ["mothers_day"]
+    config["global"]["attendees"] = ["test@example.com"]
+
+    outputs = []
+    for stream in (False, True):
+        config_file = tmp_path / str(stream) / "test-calendar.yaml"
+        config_file.parent.mkdir()
+        config_file.write_text(yaml.safe_dump(config))
+
+        app = LunarCalendarApp(config_file, stream=stream)
+        app.generate()
+        outputs.append(app.save().read_bytes())
+
+    assert outputs[0] == outputs[1]
+
+    events = {
+        str(event.get("SUMMARY")): event
+        for event in Calendar.from_ical(outputs[0]).walk("VEVENT")
+    }
+    # one master event per series, no overrides with the default templates
+    assert len(events) == 4
+    assert events["李四 生日🎂快乐!"].get("RRULE").to_ical() == b"FREQ=YEARLY;COUNT=6"
+    assert (
+        events["Mother's Day"].get("RRULE").to_ical()
+        == b"FREQ=YEARLY;COUNT=6;BYDAY=2SU;BYMONTH=5"
+    )
+    assert len(events["张三 农历生日🎂快乐!"].get("RDATE").dts) == 5
+    assert "RDATE" in events["李四 降临地球🌏又满 1000 天啦!"]
+    alarm = events["Mother's Day"].walk("VALARM")[0]
+    assert alarm.get("TRIGGER").to_ical() == b"-P1D"
+
+
+def test_create_calendar_compress_overrides(tmp_path: Path):
+    config = deep_merge(default_config, copy.deepcopy(tests_config))
+    config["global"]["compress"] = True
+    config["global"]["summary"] = "{name} 生日🎂快乐!"
+    config["global"]["description"] = "{name} {year} 年生日"
+    config["events"] = config["events"][1:]
+    config["events"][0]["event_keys"] = ["solar_birthday"]
+    config_file = tmp_path / "test-calendar.yaml"
+    config_file.write_text(yaml.safe_dump(config))
+
+    app = LunarCalendarApp(config_file)
+    app.generate()
+    events = Calendar.from_ical(app.save().read_bytes()).walk("VEVENT")
+
+    master, *overrides = events
+    assert "RRULE" in master
+    assert len(overrides) == 5
+    assert {str(event.get("UID")) for event in events} == {str(master.get("UID"))}
+    assert [event.get("RECURRENCE-ID").to_ical() for event in overrides] == [
+        f"{year}0201T020000Z".encode() for year in range(2026, 2031)
+    ]
+    assert str(overrides[0].get("DESCRIPTION")) == "李四 2026 年生日"
+
+
+def test_create_calendar_compress_dst(tmp_path: Path):
+    config = deep_merge(default_config, copy.deepcopy(tests_config_overwride_global))
+    config["global"]["compress"] = True
+    config["global"]["holiday_keys"] = ["thanksgiving_day"]
+    config["global"]["year_end"] = 2026
+    config["events"] = []
+    config_file = tmp_path / "test-calendar.yaml"
+    config_file.write_text(yaml.safe_dump(config))
+
+    app = LunarCalendarApp(config_file)
+    app.generate()
+    (event,) = Calendar.from_ical(app.save().read_bytes()).walk("VEVENT")
+
+    # 10:00 PST is 18:00 UTC on the same day, the rule still matches
+    assert event.get("RRULE").to_ical() == b"FREQ=YEARLY;COUNT=2;BYDAY=4TH;BYMONTH=11"
+
+
+def test_create_calendar_shared_alarms(tmp_path: Path):
+    config = deep_merge(default_config, copy.deepcopy(tests_config))
+    config["global"]["attendees"] = ["test@example.com"]
+    config_file = tmp_path / "test-calendar.yaml"
+    config_file.write_text(yaml.safe_dump(config))
+
+    app = LunarCalendarApp(config_file, stream=True)
+    app.generate()
+    events = Calendar.from_ical(app.save().read_bytes()).walk("VEVENT")
+
+    # every event of the config shares the same reminders and attendees
+    assert len(app._alarm_templates) == 1
+    assert len(app._attendee_lines) == 1
+    for event in events:
+        triggers = [alarm.get("TRIGGER").to_ical() for alarm in event.walk("VALARM")]
+        assert triggers == [b"-P1D", b"-P3D"]
+
+
+def test_create_calendar_roster(tmp_path: Path):
+    config = deep_merge(default_config, copy.deepcopy(tests_config))
+    config["global"]["deterministic"] = True
+    config_file = tmp_path / "inline" / "test-calendar.yaml"
+    config_file.parent.mkdir()
+    config_file.write_text(yaml.safe_dump(config))
+
+    app = LunarCalendarApp(config_file)
+    app.generate()
+    expected = app.save().read_bytes()
+
+    roster_file = tmp_path / "roster" / "people.jsonl"
+    roster_file.parent.mkdir()
+    roster_file.write_text(
+        "\n".join(json.dumps(item, ensure_ascii=False) for item in config.pop("events"))
+    )
+    config["roster"] = roster_file.name
+    config_file = tmp_path / "roster" / "test-calendar.yaml"
+    config_file.write_text(yaml.safe_dump(config))
+
+    for stream, jobs in ((False, 1), (True, 1), (False, 2)):
+        app = LunarCalendarApp(config_file, stream=stream, jobs=jobs)
+        app.generate()
+        assert app.save().read_bytes() == expected
+
+
+def test_create_calendar_stream_failure(tmp_path: Path):
+    config = deep_merge(default_config, copy.deepcopy(tests_config))
+    roster_file = tmp_path / "people.jsonl"
+    roster_file.write_text(
+        json.dumps(config["events"][0], ensure_ascii=False) + "\n[1, 2]\n"
+    )
+    config["roster"] = roster_file.name
+    config_file = tmp_path / "test-calendar.yaml"
+    config_file.write_text(yaml.safe_dump(config))
+    output_file = config_file.with_suffix(".ics")
+    output_file.write_bytes(b"previous calendar")
+
+    app = LunarCalendarApp(config_file, stream=True)
+    with pytest.raises(ValueError, match="people.jsonl:2"):
+        app.generate()
+
+    # the previous calendar is kept, without a partial one next to it
+    assert output_file.read_bytes() == b"previous calendar"
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "people.jsonl",
+        "test-calendar.ics",
+        "test-calendar.yaml",
+    ]
+
+
+def test_upload_pipeline(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    config_file = tmp_path / "test-calendar.yaml"
+    config = copy.deepcopy(deep_merge(default_config, tests_config))
+    config["pastebin"] |= {"enabled": True, "base_url": "http://paste.test"}
+    # no token, the uploader cannot be created
+    config["github_gist"] |= {"enabled": True}
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    config_file.write_text(yaml.safe_dump(config))
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"manageUrl": "http://paste.test/m:p"})
+
+    app = LunarCalendarApp(config_file)
+    app.generate()
+    output_file = app.save()
+    with AsyncUploadPipeline(transport=httpx.MockTransport(handler)) as pipeline:
+        futures = app.upload(output_file, pipeline)
+
+    assert len(futures) == 1
+    assert futures[0].result() == {"manageUrl": "http://paste.test/m:p"}
+    assert app.upload_failures == {"github_gist": 1}
+
+
+def test_upload_gist_batch(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    config_file = tmp_path / "test-calendar.yaml"
+    config = copy.deepcopy(deep_merge(default_config, tests_config))
+    config["github_gist"] |= {"enabled": True, "token": "test_token"}
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    config_file.write_text(yaml.safe_dump(config))
+
+    app = LunarCalendarApp(config_file)
+    app.generate()
+    output_file = app.save()
+    batch = GistBatch()
+    futures = app.upload(output_file, gist_batch=batch)
+    assert len(futures) == 1 and not futures[0].done()
+
+    def post(url: str, **kwargs) -> httpx.Response:
+        assert list(kwargs["json"]["files"]) == ["test-calendar.ics"]
+        return httpx.Response(
+            201, json={"id": "gist_id"}, request=httpx.Request("POST", url)
+        )
+
+    monkeypatch.setattr(httpx, "post", post)
+    batch.flush()
+    assert futures[0].result() == {"id": "gist_id"}
+    assert app.upload_failures == {}
@@ -0,0 +1,67 @@
+import os
+from pathlib import Path
+
+import yaml
+
+from lunar_birthday_ical.config import tests_config
+from lunar_birthday_ical.event_cache import EventCache, make_cache_key
+from lunar_birthday_ical.plan import load_plan
+
+
+def test_make_cache_key():
+    assert make_cache_key({"a": 1, "b": 2}) == make_cache_key({"b": 2, "a": 1})
+    assert make_cache_key({"a": 1}) != make_cache_key({"a": 2})
+
+
+def test_event_cache_get_put(tmp_path: Path):
+    cache = EventCache(tmp_path / "cache")
+    assert cache.get("key") is None
+    cache.put("key", "BEGIN:VEVENT\r\nEND:VEVENT\r\n")
+    assert cache.get("key") == "BEGIN:VEVENT\r\nEND:VEVENT\r\n"
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_event_cache_prune_evicts_least_recently_used(tmp_path: Path):
+    cache = EventCache(tmp_path, max_entries=2)
+    for mtime, key in enumerate(["a", "b", "c"]):
+        cache.put(key, key)
+        os.utime(tmp_path / f"{key}.ics", (mtime, mtime))
+    # reading refreshes the modification time
+    cache.get("a")
+
+    assert cache.prune() == 1
+    assert cache.get("b") is None
+    assert cache.get("a") == "a"
+    assert cache.get("c") == "c"
+
+
+def test_event_cache_prune_max_bytes(tmp_path: Path):
+    cache = EventCache(tmp_path, max_bytes=10)
+    for mtime, key in enumerate(["a", "b", "c"]):
+        cache.put(key, key * 4)
+        os.utime(tmp_path / f"{key}.ics", (mtime, mtime))
+
+    assert cache.prune() == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["b.ics", "c.ics"]
+
+
+def test_event_cache_prune_plans(tmp_path: Path):
+    cache = EventCache(tmp_path / "cache", max_entries=2)
+    cache.put("event", "event")
+    os.utime(cache.directory / "event.ics", (0, 0))
+    plans_dir = cache.directory / "plans"
+    config_file = tmp_path / "test-calendar.yaml"
+    plans = []
+    for mtime, year in enumerate(range(2020, 2025), start=1):
+        config_file.write_text(
+            yaml.safe_dump({**tests_config, "global": {"year_start": year}})
+        )
+        load_plan(config_file, plans_dir)
+        (plan,) = set(plans_dir.iterdir()) - set(plans)
+        os.utime(plan, (mtime, mtime))
+        plans.append(plan)
+
+    # the compiled plans are entries, evicted least recently used first
+    assert cache.prune() == 4
+    assert cache.get("event") is None
+    assert sorted(plans_dir.iterdir()) == sorted(plans[-2:])
@@ -0,0 +1,88 @@
+import datetime
+import pickle
+
+import pytest
+
+from lunar_birthday_ical.events import EventList, InternTable
+
+UTC = datetime.timezone.utc
+
+
+def add_event(events: EventList, uid: str, day: int, summary: str = "生日") -> None:
+    dtstart = datetime.datetime(2025, 1, day, 2, tzinfo=UTC)
+    events.add(
+        uid=uid,
+        dtstart=dtstart,
+        dtend=dtstart + datetime.timedelta(hours=2),
+        summary=summary,
+        description="description",
+        reminders=[1, 3],
+        attendees=["test@example.com"],
+    )
+
+
+def test_intern_table():
+    table = InternTable()
+    assert table.intern("a") == 0
+    assert table.intern(("b",)) == 1
+    assert table.intern("a") == 0
+    assert len(table) == 2
+    assert table[1] == ("b",)
+
+    restored = pickle.loads(pickle.dumps(table))
+    assert restored.intern("a") == 0
+    assert restored.intern("c") == 2
+
+
+def test_event_list_interns_values():
+    events = EventList()
+    add_event(events, "1", 1)
+    add_event(events, "2", 2)
+
+    first, second = events
+    assert first.summary == second.summary
+    assert first.attendees == second.attendees
+    assert events.table[first.reminders] == (1, 3)
+    assert len(events.table) == 4
+
+
+def test_event_list_extend():
+    events = EventList()
+    add_event(events, "1", 1, summary="a")
+    other = EventList()
+    add_event(other, "2", 2, summary="b")
+    add_event(other, "3", 3, summary="a")
+
+    events.extend(pickle.loads(pickle.dumps(other)))
+    assert [record.uid for record in events] == ["1", "2", "3"]
+    assert [events.table[record.summary] for record in events] == ["a", "b", "a"]
+
+
+def test_event_list_sort_and_dedup():
+    events = EventList()
+    for uid, day in [("b", 3), ("a", 1), ("b", 3), ("c", 2)]:
+        add_event(events, uid, day)
+
+    assert events.dedup() == 1
+    events.sort()
+    assert [record.uid for record in events] == ["a", "c", "b"]
+
+
+def test_event_list_shard():
+    events = EventList()
+    for day in range(1, 21):
+        add_event(events, str(day % 5), day)
+
+    shards = events.shard(3)
+    assert sum(len(shard) for shard in shards) == len(events)
+    for shard in shards:
+        assert shard.table is events.table
+        assert [record.dtstart for record in shard] == sorted(
+            record.dtstart for record in shard
+        )
+    # all the events of a UID land in the same shard
+    assert len({uid for shard in shards for uid in {r.uid for r in shard}}) == 5
+    assert sum(len({r.uid for r in shard}) for shard in shards) == 5
+
+    with pytest.raises(ValueError):
+        events.shard(0)
@@ -0,0 +1,77 @@
+"""Tests for http_client."""
+
+import importlib.util
+
+import httpx
+import pytest
+
+from lunar_birthday_ical.http_client import (
+    ConnectionStats,
+    SharedHTTPClient,
+    client_options,
+)
+
+
+def test_shared_client_reuses_connections(server_url: str) -> None:
+    """Test the requests of a shared client reuse one connection."""
+    stats = ConnectionStats()
+    with SharedHTTPClient(stats=stats) as shared:
+        client = shared.get()
+        assert shared.get() is client
+        for _ in range(3):
+            client.post(server_url, content=b"calendar").raise_for_status()
+
+    assert client.is_closed
+    assert stats.as_dict() == {
+        "requests": 3,
+        "connections": 1,
+        "tls_handshakes": 0,
+        "reused": 2,
+    }
+
+
+def test_shared_client_not_created() -> None:
+    """Test closing a shared client which was never used."""
+    shared = SharedHTTPClient()
+    shared.close()
+    assert shared._client is None
+
+
+def test_async_client_stats(server_url: str) -> None:
+    """Test the stats of an async client."""
+    import asyncio
+
+    stats = ConnectionStats()
+
+    async def run() -> None:
+        options = client_options(stats=stats, asynchronous=True)
+        async with httpx.AsyncClient(**options) as client:
+            for _ in range(2):
+                (await client.post(server_url, content=b"")).raise_for_status()
+
+    asyncio.run(run())
+    assert stats.as_dict()["requests"] == 2
+    assert stats.as_dict()["connections"] == 1
+
+
+def test_client_options() -> None:
+    """Test the limits and timeouts of the client options."""
+    options = client_options(
+        max_connections=4, connect_timeout=2.5, keepalive_expiry=30.0
+    )
+
+    limits = options["limits"]
+    assert limits.max_connections == limits.max_keepalive_connections == 4
+    assert limits.keepalive_expiry == 30.0
+    assert options["timeout"].connect == options["timeout"].pool == 2.5
+    assert options["timeout"].read is None
+    assert "event_hooks" not in options
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("h2") is not None, reason="h2 is installed"
+)
+def test_client_options_http2_without_h2(caplog: pytest.LogCaptureFixture) -> None:
+    """Test HTTP/2 falls back to HTTP/1.1 without the h2 package."""
+    assert client_options(http2=True)["http2"] is False
+    assert "h2 package" in caplog.text
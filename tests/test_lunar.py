@@ -0,0 +1,60 @@
+import datetime
+
+from lunar_birthday_ical.lunar import (
+    cache_clear,
+    cache_stats,
+    format_lunar,
+    get_lunar_month,
+    lunar_leap_month,
+    lunar_month_days,
+    lunar_to_solar,
+    solar_to_lunar,
+    solar_to_lunar_ymd,
+)
+
+
+def test_solar_to_lunar():
+    lunar = solar_to_lunar(datetime.date(2020, 1, 25))
+    assert (lunar.getYear(), lunar.getMonth(), lunar.getDay()) == (2020, 1, 1)
+
+
+def test_solar_to_lunar_ignores_time():
+    lunar = solar_to_lunar(datetime.datetime(2020, 5, 23, 23, 59))
+    assert (lunar.getYear(), lunar.getMonth(), lunar.getDay()) == (2020, -4, 1)
+
+
+def test_lunar_to_solar_leap_month():
+    assert lunar_to_solar(2020, -4, 1) == datetime.date(2020, 5, 23)
+
+
+def test_get_lunar_month_missing_leap_month():
+    assert get_lunar_month(2021, -4) is None
+
+
+def test_solar_to_lunar_ymd():
+    assert solar_to_lunar_ymd(datetime.date(2020, 5, 23)) == (2020, -4, 1)
+    # outside of the precomputed table
+    assert solar_to_lunar_ymd(datetime.date(1850, 2, 12)) == (1850, 1, 1)
+
+
+def test_lunar_leap_month_and_month_days():
+    assert lunar_leap_month(2020) == 4
+    assert lunar_leap_month(2021) == 0
+    assert lunar_month_days(2020, -4) == 29
+    assert lunar_month_days(2021, -4) is None
+    assert lunar_month_days(1850, 1) == get_lunar_month(1850, 1).getDayCount()
+
+
+def test_format_lunar():
+    assert format_lunar(2020, -4, 1) == "二〇二〇年闰四月初一"
+    assert format_lunar(1989, 12, 30) == "一九八九年腊月三十"
+
+
+def test_cache_stats():
+    cache_clear()
+    # years covered by the precomputed table never reach the caches
+    lunar_to_solar(1850, 1, 1)
+    lunar_to_solar(1850, 1, 1)
+    stats = cache_stats()
+    assert stats["lunar_day"]["misses"] == 1
+    assert stats["lunar_day"]["hits"] == 1
@@ -0,0 +1,56 @@
+import datetime
+from pathlib import Path
+
+import pytest
+from lunar_python import Lunar
+
+from lunar_birthday_ical.lunar_table import LunarTable, build_table, get_lunar_table
+
+
+def test_table_covers_1900_to_2100():
+    table = get_lunar_table()
+    assert table.first_year == 1900
+    assert table.last_year == 2100
+
+
+@pytest.mark.parametrize("year", [1900, 1989, 2020, 2023, 2033, 2100])
+def test_table_matches_lunar_python(year: int):
+    table = get_lunar_table()
+    solar_date = table.to_solar(year, 1, 1)
+    end = solar_date + datetime.timedelta(days=table.year_days(year))
+    while solar_date < end:
+        lunar = Lunar.fromDate(
+            datetime.datetime(solar_date.year, solar_date.month, solar_date.day)
+        )
+        lunar_ymd = (lunar.getYear(), lunar.getMonth(), lunar.getDay())
+        assert table.to_lunar(solar_date) == lunar_ymd
+        assert table.to_solar(*lunar_ymd) == solar_date
+        solar_date += datetime.timedelta(days=1)
+
+
+def test_table_out_of_range():
+    table = get_lunar_table()
+    assert table.to_lunar(datetime.date(1900, 1, 30)) is None
+    assert table.to_lunar(datetime.date(2101, 6, 1)) is None
+    assert not table.has_year(2101)
+
+
+def test_table_invalid_lunar_date():
+    table = get_lunar_table()
+    with pytest.raises(ValueError):
+        table.to_solar(2021, -4, 1)
+    with pytest.raises(ValueError):
+        table.to_solar(2021, 12, 30)
+
+
+def test_build_table_is_reproducible(tmp_path: Path):
+    path = tmp_path / "lunar_table.bin"
+    build_table(path, 2020, 2022)
+    table = LunarTable.open(path)
+    assert (table.first_year, table.last_year) == (2020, 2022)
+    assert table.to_solar(2020, -4, 1) == datetime.date(2020, 5, 23)
+
+
+def test_table_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        LunarTable(b"\0" * 64)
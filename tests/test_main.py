@@ -1,3 +1,7 @@
+import copy
+import logging
+import pstats
+import subprocess
 import sys
 from pathlib import Path
 
@@ -6,7 +10,7 @@ import yaml
 from chaos_utils.dict_utils import deep_merge
 
 from lunar_birthday_ical.config import default_config, tests_config
-from lunar_birthday_ical.main import main
+from lunar_birthday_ical.main import main, process_config_file, process_config_files
 
 
 def test_main_no_args(monkeypatch: pytest.MonkeyPatch):
@@ -73,3 +77,191 @@ def test_main_lunar_leap_month_to_solar(monkeypatch: pytest.MonkeyPatch):
     with pytest.raises(SystemExit) as excinfo:
         main()
         assert excinfo.value.code == 0
+
+
+def test_main_concurrent_config_files(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    config = deep_merge(default_config, tests_config)
+    config_files = []
+    for index in range(4):
+        config_file = tmp_path / f"test-calendar-{index}.yaml"
+        config_file.write_text(yaml.safe_dump(config))
+        config_files.append(config_file)
+    broken_file = tmp_path / "broken.yaml"
+    broken_file.write_text("global: [")
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["main.py", "--workers", "3", str(broken_file), *map(str, config_files)],
+    )
+    with pytest.raises(SystemExit) as excinfo:
+        main()
+    assert excinfo.value.code == 1
+
+    for config_file in config_files:
+        assert config_file.with_suffix(".ics").exists()
+
+
+def test_process_config_file_profile(caplog: pytest.LogCaptureFixture, tmp_path: Path):
+    config_file = tmp_path / "test-calendar.yaml"
+    config = deep_merge(default_config, tests_config)
+    config["global"]["holiday_keys"] = ["mothers_day"]
+    config_file.write_text(yaml.safe_dump(config))
+
+    with caplog.at_level(logging.INFO, logger="lunar_birthday_ical.main"):
+        process_config_file(config_file, profile=True, profile_dir=tmp_path / "prof")
+
+    record = next(r for r in caplog.records if hasattr(r, "phases"))
+    assert record.config == str(config_file)
+    assert set(record.phases) >= {
+        "config.read",
+        "config.parse",
+        "config.merge",
+        "generate.lunar_birthday",
+        "generate.solar_birthday",
+        "generate.integer_days",
+        "generate.holidays",
+        "serialize",
+    }
+    assert record.phases["generate.lunar_birthday"]["calls"] == 1
+    assert sum(p["seconds"] for p in record.phases.values()) <= record.elapsed
+
+    stats = pstats.Stats(str(tmp_path / "prof" / "test-calendar.pstats"))
+    assert stats.total_calls > 0
+
+
+def test_process_config_file_trace_memory(
+    caplog: pytest.LogCaptureFixture, tmp_path: Path
+):
+    config_file = tmp_path / "test-calendar.yaml"
+    config = deep_merge(default_config, tests_config)
+    config_file.write_text(yaml.safe_dump(config))
+
+    with caplog.at_level(logging.INFO, logger="lunar_birthday_ical.main"):
+        process_config_file(config_file, trace_memory=5)
+
+    record = next(r for r in caplog.records if hasattr(r, "memory"))
+    assert list(record.memory) == ["load", "generate", "save", "upload"]
+    for phase in record.memory.values():
+        assert phase["peak_bytes"] >= phase["start_bytes"]
+        assert len(phase["top"]) <= 5
+
+
+def test_main_metrics_file(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    config_file = tmp_path / "test-calendar.yaml"
+    config = deep_merge(default_config, tests_config)
+    config_file.write_text(yaml.safe_dump(config))
+    broken_file = tmp_path / "broken.yaml"
+    broken_file.write_text("global: [")
+    metrics_file = tmp_path / "metrics.prom"
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "main.py",
+            "--metrics-file",
+            str(metrics_file),
+            str(config_file),
+            str(broken_file),
+        ],
+    )
+    with pytest.raises(SystemExit):
+        main()
+
+    text = metrics_file.read_text(encoding="utf-8")
+    output_bytes = config_file.with_suffix(".ics").stat().st_size
+    assert f'config_success{{config="{config_file}"}} 1\n' in text
+    assert f'config_success{{config="{broken_file}"}} 0\n' in text
+    assert f'output_bytes{{config="{config_file}"}} {output_bytes}\n' in text
+    assert f'events{{config="{config_file}",event_key="integer_days"}} ' in text
+    assert 'phase="serialize"' in text
+    assert 'cache_hits{cache="timezone"}' in text
+
+
+def test_process_config_files_http_client(
+    caplog: pytest.LogCaptureFixture, server_url: str, tmp_path: Path
+):
+    config_files = []
+    for name in ("first", "second"):
+        config = copy.deepcopy(deep_merge(default_config, tests_config))
+        config["pastebin"].update({"enabled": True, "base_url": server_url.rstrip("/")})
+        config_file = tmp_path / f"{name}.yaml"
+        config_file.write_text(yaml.safe_dump(config))
+        config_files.append(config_file)
+
+    with caplog.at_level(logging.INFO):
+        failed = process_config_files(config_files, http_options={"max_connections": 1})
+
+    assert failed == []
+    (record,) = [r for r in caplog.records if hasattr(r, "http")]
+    assert record.http["requests"] == 2
+    assert record.http["connections"] == 1
+    assert record.http["reused"] == 1
+
+
+def test_main_http_max_connections(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(
+        sys, "argv", ["main.py", "--http-max-connections", "0", "config.yaml"]
+    )
+    with pytest.raises(SystemExit) as excinfo:
+        main()
+    assert excinfo.value.code == 2
+
+
+def test_main_gist_batch_size(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(sys, "argv", ["main.py", "--gist-batch", "301", "config.yaml"])
+    with pytest.raises(SystemExit) as excinfo:
+        main()
+    assert excinfo.value.code == 2
+
+
+def test_main_profile_dir_workers(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["main.py", "--profile-dir", str(tmp_path), "-w", "2", "config.yaml"],
+    )
+    with pytest.raises(SystemExit) as excinfo:
+        main()
+    assert excinfo.value.code == 2
+
+
+# cumulative import time budget of the CLI entry point, in microseconds
+IMPORT_TIME_BUDGET_US = 100_000
+HEAVY_MODULES = {"icalendar", "httpx", "yaml", "lunar_python", "argcomplete"}
+
+
+def import_times(code: str) -> dict[str, int]:
+    """Run code with -X importtime, return the cumulative time of each module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_main_import_time():
+    times = import_times("import lunar_birthday_ical.main")
+
+    assert not HEAVY_MODULES & times.keys()
+    assert times["lunar_birthday_ical.main"] < IMPORT_TIME_BUDGET_US
+
+
+def test_main_solar_to_lunar_imports():
+    times = import_times(
+        "import sys; sys.argv = ['main.py', '-S', '2025', '1', '1'];"
+        "from lunar_birthday_ical.main import main; main()"
+    )
+
+    assert "lunar_birthday_ical.lunar" in times
+    assert not HEAVY_MODULES & times.keys()
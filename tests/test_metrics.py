@@ -0,0 +1,53 @@
+import stat
+from pathlib import Path
+
+import pytest
+
+from lunar_birthday_ical.metrics import MetricsRegistry
+
+
+def test_render():
+    metrics = MetricsRegistry()
+    metrics.set("events", 3, config="b.yaml", event_key="lunar_birthday")
+    metrics.set("events", 2, config="a.yaml", event_key="lunar_birthday")
+    metrics.set("output_bytes", 1024, config='c:\\"quoted"\n.yaml')
+
+    assert metrics.render() == (
+        "# HELP lunar_birthday_ical_events"
+        " Events generated per event key, excluding cached items.\n"
+        "# TYPE lunar_birthday_ical_events gauge\n"
+        'lunar_birthday_ical_events{config="a.yaml",event_key="lunar_birthday"} 2\n'
+        'lunar_birthday_ical_events{config="b.yaml",event_key="lunar_birthday"} 3\n'
+        "# HELP lunar_birthday_ical_output_bytes Size of the generated .ics file.\n"
+        "# TYPE lunar_birthday_ical_output_bytes gauge\n"
+        'lunar_birthday_ical_output_bytes{config="c:\\\\\\"quoted\\"\\n.yaml"} 1024\n'
+    )
+
+
+def test_set_unknown_metric():
+    with pytest.raises(KeyError):
+        MetricsRegistry().set("unknown", 1)
+
+
+def test_record_cache():
+    metrics = MetricsRegistry()
+    metrics.record_cache("hit", {"hits": 3, "misses": 1, "evictions": 0})
+    metrics.record_cache("unused", {"hits": 0, "misses": 0, "evictions": 0})
+
+    text = metrics.render()
+    assert 'lunar_birthday_ical_cache_hit_ratio{cache="hit"} 0.75\n' in text
+    assert 'lunar_birthday_ical_cache_hits{cache="unused"} 0\n' in text
+    assert 'lunar_birthday_ical_cache_hit_ratio{cache="unused"}' not in text
+
+
+def test_write(tmp_path: Path):
+    path = tmp_path / "textfile" / "lunar_birthday_ical.prom"
+    metrics = MetricsRegistry()
+    metrics.set("config_success", 1, config="a.yaml")
+    metrics.write(path)
+
+    text = path.read_text(encoding="utf-8")
+    assert 'lunar_birthday_ical_config_success{config="a.yaml"} 1\n' in text
+    assert "lunar_birthday_ical_last_run_timestamp_seconds " in text
+    assert stat.S_IMODE(path.stat().st_mode) == 0o644
+    assert list(path.parent.iterdir()) == [path]
@@ -0,0 +1,69 @@
+import copy
+import datetime
+from pathlib import Path
+
+import pytest
+import yaml
+
+from lunar_birthday_ical.config import tests_config
+from lunar_birthday_ical.plan import compile_config, load_plan
+
+
+def test_compile_config():
+    plan = compile_config(copy.deepcopy(tests_config))
+
+    assert len(plan.items) == 2
+    item = plan.items[0]
+    assert item["name"] == "张三"
+    assert item["start_date"] == datetime.date(1989, 6, 3)
+    assert item["event_time"] == datetime.time(10, 0)
+    # merged with the global section
+    assert item["timezone"] == "Asia/Shanghai"
+    assert plan.config["global"]["year_start"] == 2025
+
+
+@pytest.mark.parametrize(
+    "override, message",
+    [
+        ({"global": {"timezone": "Mars/Olympus_Mons"}}, "timezone"),
+        ({"global": {"event_time": 36000}}, "double quotes"),
+        ({"events": [{"name": "张三", "start_date": "1989-13-03"}]}, "start_date"),
+        ({"events": [{"start_date": "1989-06-03"}]}, "name is required"),
+    ],
+)
+def test_compile_config_invalid(override: dict, message: str):
+    config = {**copy.deepcopy(tests_config), **override}
+    with pytest.raises(ValueError, match=message):
+        compile_config(config)
+
+
+def test_load_plan_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    config_file = tmp_path / "test-calendar.yaml"
+    config_file.write_text(yaml.safe_dump(tests_config))
+    cache_dir = tmp_path / "plans"
+
+    plan = load_plan(config_file, cache_dir)
+    assert len(list(cache_dir.glob("*.json"))) == 1
+
+    # a cached plan skips parsing the YAML file
+    monkeypatch.setattr(yaml, "safe_load", None)
+    assert load_plan(config_file, cache_dir) == plan
+
+    monkeypatch.undo()
+    config_file.write_text(yaml.safe_dump({**tests_config, "events": []}))
+    assert load_plan(config_file, cache_dir).items == []
+    assert len(list(cache_dir.glob("*.json"))) == 2
+
+
+def test_load_plan_cache_dates(tmp_path: Path):
+    config = copy.deepcopy(tests_config)
+    config["events"][0]["start_date"] = datetime.date(1989, 6, 3)
+    config_file = tmp_path / "test-calendar.yaml"
+    config_file.write_text(yaml.safe_dump(config))
+
+    plan = load_plan(config_file, tmp_path / "plans")
+    # the dates and times of the cached plan survive its JSON encoding
+    cached = load_plan(config_file, tmp_path / "plans")
+    assert cached == plan
+    assert cached.config["events"][0]["start_date"] == datetime.date(1989, 6, 3)
+    assert cached.items[0]["event_time"] == datetime.time(10, 0)
@@ -0,0 +1,74 @@
+import time
+import tracemalloc
+
+from lunar_birthday_ical.profiling import NULL_TIMER, MemoryTracer, PhaseTimer
+
+
+def test_phase_timer():
+    timer = PhaseTimer()
+    with timer.phase("b"):
+        time.sleep(0.01)
+    with timer.phase("a"):
+        pass
+    with timer.phase("b"):
+        pass
+    timer.record("a", 1.0)
+
+    phases = timer.as_dict()
+    assert list(phases) == ["b", "a"]
+    assert phases["b"]["calls"] == 2
+    assert phases["b"]["seconds"] >= 0.01
+    assert phases["a"]["calls"] == 2
+    assert phases["a"]["seconds"] >= 1.0
+
+
+def test_phase_timer_exception():
+    timer = PhaseTimer()
+    try:
+        with timer.phase("failing"):
+            raise ValueError
+    except ValueError:
+        pass
+
+    assert timer.as_dict()["failing"]["calls"] == 1
+
+
+def test_null_timer():
+    with NULL_TIMER.phase("a"):
+        pass
+    NULL_TIMER.record("b", 1.0)
+
+    assert NULL_TIMER.as_dict() == {}
+
+
+def test_memory_tracer():
+    tracer = MemoryTracer(top=3)
+    tracer.start()
+    try:
+        with tracer.phase("retained"):
+            retained = [bytearray(1024) for _ in range(1000)]
+        with tracer.phase("released"):
+            released = [bytearray(1024) for _ in range(1000)]
+            del released
+    finally:
+        tracer.stop()
+
+    assert not tracemalloc.is_tracing()
+    phases = tracer.phases
+    assert phases["retained"]["retained_bytes"] >= 1000 * 1024
+    assert phases["released"]["retained_bytes"] < 1000 * 1024
+    assert (
+        phases["released"]["peak_bytes"] - phases["released"]["start_bytes"]
+        >= 1000 * 1024
+    )
+    assert len(phases["retained"]["top"]) <= 3
+    assert phases["retained"]["top"][0]["site"].startswith(__file__)
+    assert len(retained) == 1000
+
+
+def test_memory_tracer_not_tracing():
+    tracer = MemoryTracer()
+    with tracer.phase("untraced"):
+        pass
+
+    assert tracer.phases == {}
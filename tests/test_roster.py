@@ -0,0 +1,79 @@
+import datetime
+import json
+from pathlib import Path
+
+import pytest
+
+from lunar_birthday_ical.roster import read_roster
+
+
+def test_read_roster_jsonl(tmp_path: Path):
+    roster = tmp_path / "roster.jsonl"
+    items = [
+        {"name": "张三", "start_date": "1989-06-03", "event_keys": ["lunar_birthday"]},
+        {"name": "李四", "start_date": "2006-02-01"},
+    ]
+    roster.write_text(
+        "\n".join(json.dumps(item, ensure_ascii=False) for item in items) + "\n\n"
+    )
+
+    records = read_roster(roster)
+    assert next(records) == (f"{roster}:1", items[0])
+    assert list(records) == [(f"{roster}:2", items[1])]
+
+
+def test_read_roster_csv(tmp_path: Path):
+    roster = tmp_path / "roster.csv"
+    roster.write_text(
+        "name,start_date,event_keys,reminders,days_interval,timezone\n"
+        "张三,1989-06-03,lunar_birthday;integer_days,1;7,500,\n"
+        "李四,2006-02-01,solar_birthday,,,America/Los_Angeles\n",
+        encoding="utf-8",
+    )
+
+    assert list(read_roster(roster)) == [
+        (
+            f"{roster}:2",
+            {
+                "name": "张三",
+                "start_date": "1989-06-03",
+                "event_keys": ["lunar_birthday", "integer_days"],
+                "reminders": [1, 7],
+                "days_interval": 500,
+            },
+        ),
+        (
+            f"{roster}:3",
+            {
+                "name": "李四",
+                "start_date": "2006-02-01",
+                "event_keys": ["solar_birthday"],
+                "timezone": "America/Los_Angeles",
+            },
+        ),
+    ]
+
+
+def test_read_roster_yaml(tmp_path: Path):
+    roster = tmp_path / "roster.yaml"
+    roster.write_text(
+        "name: 张三\nstart_date: 1989-06-03\n---\n---\nname: 李四\nstart_date: 2006-02-01\n",
+        encoding="utf-8",
+    )
+
+    records = list(read_roster(roster))
+    assert records[0] == (
+        f"{roster}[0]",
+        {"name": "张三", "start_date": datetime.date(1989, 6, 3)},
+    )
+    assert records[1][0] == f"{roster}[2]"
+
+
+def test_read_roster_invalid(tmp_path: Path):
+    with pytest.raises(ValueError, match="unsupported"):
+        list(read_roster(tmp_path / "roster.txt"))
+
+    roster = tmp_path / "roster.jsonl"
+    roster.write_text("[1, 2]\n")
+    with pytest.raises(ValueError, match="not a mapping"):
+        list(read_roster(roster))
@@ -0,0 +1,52 @@
+import datetime
+import zoneinfo
+
+import pytest
+
+from lunar_birthday_ical.timezones import (
+    UTC,
+    OffsetTable,
+    get_offset_table,
+    get_timezone,
+)
+from lunar_birthday_ical.utils import local_datetime_to_utc_datetime
+
+
+def test_get_timezone():
+    assert get_timezone("Asia/Shanghai") is get_timezone("Asia/Shanghai")
+    assert get_offset_table("Asia/Shanghai") is get_offset_table("Asia/Shanghai")
+    with pytest.raises(zoneinfo.ZoneInfoNotFoundError):
+        get_timezone("Mars/Olympus_Mons")
+
+
+@pytest.mark.parametrize(
+    "name", ["America/Los_Angeles", "Australia/Lord_Howe", "Asia/Shanghai"]
+)
+def test_offset_table_matches_zoneinfo(name: str):
+    timezone = zoneinfo.ZoneInfo(name)
+    table = OffsetTable(timezone)
+    # every hour of 2025 and of 1991, including DST gaps and folds
+    local_datetimes = [
+        datetime.datetime(year, 1, 1) + datetime.timedelta(hours=i)
+        for year in (1991, 2025)
+        for i in range(365 * 24)
+    ]
+
+    expected = [
+        local_datetime_to_utc_datetime(local_datetime.replace(tzinfo=timezone))
+        for local_datetime in local_datetimes
+    ]
+    assert table.to_utc(local_datetimes) == expected
+
+
+def test_offset_table_gap_and_fold():
+    table = get_offset_table("America/Los_Angeles")
+    # 02:30 does not exist on 2025-03-09, and happens twice on 2025-11-02
+    gap, fold = table.to_utc(
+        [datetime.datetime(2025, 3, 9, 2, 30), datetime.datetime(2025, 11, 2, 1, 30)]
+    )
+    assert gap == datetime.datetime(2025, 3, 9, 10, 30, tzinfo=UTC)
+    assert fold == datetime.datetime(2025, 11, 2, 8, 30, tzinfo=UTC)
+    assert table.utcoffset(datetime.datetime(2025, 7, 1)) == datetime.timedelta(
+        hours=-7
+    )
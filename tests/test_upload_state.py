@@ -0,0 +1,52 @@
+"""Tests for upload_state."""
+
+import json
+from pathlib import Path
+
+from lunar_birthday_ical.upload_state import UploadState, content_hash
+
+
+def test_content_hash() -> None:
+    """Test the hash depends on the parts and their boundaries."""
+    assert content_hash("ab", b"c") == content_hash(b"ab", "c")
+    assert content_hash("ab", "c") != content_hash("a", "bc")
+
+
+def test_save_and_load(tmp_path: Path) -> None:
+    """Test a saved state is loaded by the next run."""
+    path = tmp_path / "state" / "uploads.json"
+    state = UploadState(path)
+    assert state.get("github_gist:abc") == {}
+
+    state.set("github_gist:abc", "digest", 'W/"etag"')
+    state.set("pastebin:https://paste.test/name:password", "other")
+    state.set("github_gist:abc/large.ics", "large", files=["b.ics", "a.ics"])
+    state.save()
+
+    loaded = UploadState(path)
+    assert loaded.get("github_gist:abc") == {"hash": "digest", "etag": 'W/"etag"'}
+    assert loaded.get("github_gist:abc/large.ics") == {
+        "hash": "large",
+        "files": ["a.ics", "b.ics"],
+    }
+    assert loaded.get("pastebin:https://paste.test/name:password") == {"hash": "other"}
+
+
+def test_save_unchanged(tmp_path: Path) -> None:
+    """Test an unchanged state is not written."""
+    path = tmp_path / "uploads.json"
+    UploadState(path).save()
+    assert not path.exists()
+
+
+def test_unreadable_state(tmp_path: Path) -> None:
+    """Test an unreadable or outdated state file starts an empty state."""
+    path = tmp_path / "uploads.json"
+    path.write_text("{", encoding="utf-8")
+    assert UploadState(path).get("target") == {}
+
+    path.write_text(
+        json.dumps({"version": 0, "targets": {"target": {"hash": "digest"}}}),
+        encoding="utf-8",
+    )
+    assert UploadState(path).get("target") == {}
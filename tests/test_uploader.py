@@ -1,12 +1,28 @@
 """Tests for uploader."""
 
+import asyncio
+import json
+import threading
+import time
 from pathlib import Path
 from unittest.mock import MagicMock, Mock, mock_open, patch
 
 import httpx
 import pytest
 
-from lunar_birthday_ical.uploader import GitHubGistUploader, PastebinWorkerUploader
+from lunar_birthday_ical.upload_state import UploadState
+from lunar_birthday_ical.uploader import (
+    GIST_FILE_MAX_BYTES,
+    AsyncUploadPipeline,
+    CalendarUploader,
+    GistBatch,
+    GitHubGistUploader,
+    PastebinWorkerUploader,
+    RateLimitError,
+    RetryScheduler,
+    split_calendar,
+    upload_concurrently,
+)
 
 
 @pytest.fixture
@@ -235,3 +251,748 @@ class TestGitHubGistUploader:
         call_kwargs = mock_patch.call_args.kwargs
         assert call_kwargs["json"]["description"] == "Updated Calendar"
         assert "test.ics" in call_kwargs["json"]["files"]
+
+
+def test_upload_with_injected_client(tmp_path: Path) -> None:
+    """Test uploaders send their requests with an injected client."""
+    file = tmp_path / "calendar.ics"
+    file.write_text("BEGIN:VCALENDAR\nEND:VCALENDAR\n", encoding="utf-8")
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"id": "gist_id"})
+
+    with httpx.Client(
+        transport=httpx.MockTransport(handler), timeout=httpx.Timeout(None, connect=2.0)
+    ) as client:
+        pastebin = PastebinWorkerUploader(
+            {"base_url": "http://paste.test", "timeout": 5}, client=client
+        )
+        gist = GitHubGistUploader({"token": "test_token"}, client=client)
+        pastebin.upload(file)
+        assert gist.upload(file)["id"] == "gist_id"
+
+    paste, create_gist = requests
+    assert (paste.method, str(paste.url)) == ("POST", "http://paste.test/")
+    assert paste.extensions["timeout"] == {
+        "connect": 2.0,
+        "read": 5.0,
+        "write": 5.0,
+        "pool": None,
+    }
+    assert create_gist.method == "POST"
+    assert json.loads(create_gist.content)["public"] is False
+
+
+def mock_client(handler) -> httpx.AsyncClient:
+    """Return an async client answering requests with handler."""
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class TestAsyncUploads:
+    """Test cases for the concurrent uploads."""
+
+    @pytest.fixture
+    def ics_file(self, tmp_path: Path) -> Path:
+        file = tmp_path / "calendar.ics"
+        file.write_text("BEGIN:VCALENDAR\nEND:VCALENDAR\n", encoding="utf-8")
+        return file
+
+    def test_upload_async(self, ics_file: Path) -> None:
+        """Test both uploaders send the requests of their sync upload."""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json={"id": "gist_id", "url": "paste_url"})
+
+        pastebin = PastebinWorkerUploader(
+            {"base_url": "http://paste.test", "expiration": "7d"}
+        )
+        gist = GitHubGistUploader({"token": "test_token", "gist_id": "gist_id"})
+
+        async def run() -> list:
+            async with mock_client(handler) as client:
+                return [
+                    await pastebin.upload_async(ics_file, client),
+                    await gist.upload_async(ics_file, client),
+                ]
+
+        assert asyncio.run(run())[1]["id"] == "gist_id"
+        paste, patch_gist = requests
+        assert (paste.method, str(paste.url)) == ("POST", "http://paste.test/")
+        assert b'name="e"\r\n\r\n7d' in paste.content
+        assert b'filename="calendar.ics"' in paste.content
+        assert patch_gist.method == "PATCH"
+        assert str(patch_gist.url).endswith("/gists/gist_id")
+        assert patch_gist.headers["Authorization"] == "Bearer test_token"
+        payload = json.loads(patch_gist.content)
+        assert "public" not in payload
+        assert payload["files"]["calendar.ics"]["content"].startswith("BEGIN")
+
+    def test_upload_concurrently(self, ics_file: Path) -> None:
+        """Test uploads overlap and a failing upload does not stop the others."""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(0.2)
+            if request.url.host == "broken.test":
+                return httpx.Response(500)
+            return httpx.Response(200, json={"url": str(request.url)})
+
+        uploads = [
+            (PastebinWorkerUploader({"base_url": f"http://{host}"}), ics_file)
+            for host in ("one.test", "broken.test", "two.test")
+        ]
+
+        async def run() -> list:
+            async with mock_client(handler) as client:
+                return await upload_concurrently(uploads, client)
+
+        start = time.perf_counter()
+        results = asyncio.run(run())
+        assert time.perf_counter() - start < 0.5
+
+        assert results[0] == {"url": "http://one.test/"}
+        assert isinstance(results[1], httpx.HTTPStatusError)
+        assert results[2] == {"url": "http://two.test/"}
+
+    def test_upload_concurrently_timeout(self, ics_file: Path) -> None:
+        """Test an upload is abandoned after the timeout of its uploader."""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(5)
+            return httpx.Response(200, json={})
+
+        uploader = PastebinWorkerUploader(
+            {"base_url": "http://slow.test", "timeout": 0.1}
+        )
+
+        async def run() -> list:
+            async with mock_client(handler) as client:
+                return await upload_concurrently([(uploader, ics_file)], client)
+
+        (result,) = asyncio.run(run())
+        assert isinstance(result, TimeoutError)
+
+    def test_upload_timeout_with_scheduler(self, ics_file: Path) -> None:
+        """Test the retries of a scheduler extend the timeout of an upload,
+        which still bounds it."""
+        attempts = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            attempts.append(request)
+            if len(attempts) == 1:
+                return httpx.Response(503)
+            await asyncio.sleep(5)
+            return httpx.Response(200, json={})
+
+        uploader = PastebinWorkerUploader(
+            {
+                "manage_url": "http://slow.test/name:password",
+                "timeout": 0.1,
+                "max_retries": 1,
+            },
+            scheduler=RetryScheduler(backoff=0.01, max_backoff=0.02, max_wait=0.1),
+        )
+        assert uploader._get_upload_timeout() == pytest.approx(0.3)
+
+        async def run() -> list:
+            async with mock_client(handler) as client:
+                return await upload_concurrently([(uploader, ics_file)], client)
+
+        (result,) = asyncio.run(run())
+        assert isinstance(result, TimeoutError)
+        assert len(attempts) == 2
+
+    def test_default_upload_async(self, ics_file: Path) -> None:
+        """Test uploaders without native async support run upload in a thread."""
+
+        class ThreadUploader(CalendarUploader):
+            def upload(self, file: Path) -> dict:
+                return {"thread": threading.current_thread().name}
+
+        async def run() -> list:
+            async with mock_client(lambda request: httpx.Response(500)) as client:
+                return await upload_concurrently(
+                    [(ThreadUploader({}), ics_file)], client
+                )
+
+        (result,) = asyncio.run(run())
+        assert result["thread"] != threading.current_thread().name
+
+    def test_pipeline(self, ics_file: Path) -> None:
+        """Test uploads submitted from several threads share the client."""
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host == "broken.test":
+                return httpx.Response(500)
+            return httpx.Response(200, json={"host": request.url.host})
+
+        with AsyncUploadPipeline(
+            concurrency=2, transport=httpx.MockTransport(handler)
+        ) as pipeline:
+            futures = [
+                pipeline.submit(
+                    PastebinWorkerUploader({"base_url": f"http://{host}"}), ics_file
+                )
+                for host in ("one.test", "broken.test", "two.test")
+            ]
+
+        assert all(future.done() for future in futures)
+        assert futures[0].result() == {"host": "one.test"}
+        assert isinstance(futures[1].exception(), httpx.HTTPStatusError)
+        assert futures[2].result() == {"host": "two.test"}
+        with pytest.raises(RuntimeError):
+            pipeline.submit(PastebinWorkerUploader({}), ics_file)
+
+
+class TestUploadState:
+    """Test cases for skipping the upload of unchanged calendars."""
+
+    @pytest.fixture
+    def ics_file(self, tmp_path: Path) -> Path:
+        file = tmp_path / "calendar.ics"
+        file.write_bytes(b"BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n")
+        return file
+
+    @pytest.fixture
+    def state(self, tmp_path: Path) -> UploadState:
+        return UploadState(tmp_path / "uploads.json")
+
+    def test_pastebin_unchanged(self, ics_file: Path, state: UploadState) -> None:
+        """Test an unchanged paste is only uploaded once."""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json={"url": "paste_url"})
+
+        config = {"manage_url": "http://paste.test/name:password"}
+        with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+            uploader = PastebinWorkerUploader(config, client=client, state=state)
+            assert uploader.upload(ics_file) == {"url": "paste_url"}
+            assert uploader.upload(ics_file) == {"unchanged": True}
+            ics_file.write_bytes(b"BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n\r\n")
+            uploader.upload(ics_file)
+
+            # an expiring paste is always uploaded, which extends it
+            config["expiration"] = "7d"
+            uploader = PastebinWorkerUploader(config, client=client, state=state)
+            uploader.upload(ics_file)
+
+        assert [request.method for request in requests] == ["PUT", "PUT", "PUT"]
+
+    def test_pastebin_create_not_skipped(
+        self, ics_file: Path, state: UploadState
+    ) -> None:
+        """Test new pastes are always created."""
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={"manageUrl": "manage_url"})
+
+        with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+            uploader = PastebinWorkerUploader({}, client=client, state=state)
+            uploader.upload(ics_file)
+            assert "manageUrl" in uploader.upload(ics_file)
+
+    def test_gist_etag(self, ics_file: Path, state: UploadState) -> None:
+        """Test an unchanged gist is checked with a conditional request."""
+        requests = []
+        remote = {"etag": 'W/"first"', "content": None}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            if request.method == "PATCH":
+                remote["content"] = json.loads(request.content)["files"][
+                    "calendar.ics"
+                ]["content"]
+                return httpx.Response(
+                    200, json={"id": "gist_id"}, headers={"ETag": remote["etag"]}
+                )
+            if request.headers.get("If-None-Match") == remote["etag"]:
+                return httpx.Response(304)
+            # edited on github, without changing the calendar
+            return httpx.Response(
+                200,
+                json={
+                    "description": "Lunar Birthday iCalendar",
+                    "files": {"calendar.ics": {"content": remote["content"]}},
+                },
+                headers={"ETag": remote["etag"]},
+            )
+
+        config = {"token": "test_token", "gist_id": "gist_id"}
+        with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+            uploader = GitHubGistUploader(config, client=client, state=state)
+            assert uploader.upload(ics_file)["id"] == "gist_id"
+            assert uploader.upload(ics_file) == {"unchanged": True}
+
+            remote["etag"] = 'W/"second"'
+            assert uploader.upload(ics_file) == {"unchanged": True}
+            assert state.get("github_gist:gist_id/calendar.ics")["etag"] == 'W/"second"'
+
+        assert [request.method for request in requests] == [
+            "PATCH",
+            "GET",
+            "GET",
+        ]
+        assert requests[1].headers["If-None-Match"] == 'W/"first"'
+
+    def test_gist_remote_changed(self, ics_file: Path, state: UploadState) -> None:
+        """Test a gist whose content changed remotely is uploaded again."""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            if request.method == "GET":
+                return httpx.Response(
+                    200, json={"files": {"calendar.ics": {"content": "edited"}}}
+                )
+            return httpx.Response(200, json={"id": "gist_id"}, headers={"ETag": "e"})
+
+        config = {"token": "test_token", "gist_id": "gist_id"}
+
+        async def run() -> list:
+            async with mock_client(handler) as client:
+                uploader = GitHubGistUploader(config, state=state)
+                return [
+                    await uploader.upload_async(ics_file, client),
+                    await uploader.upload_async(ics_file, client),
+                ]
+
+        assert asyncio.run(run()) == [{"id": "gist_id"}, {"id": "gist_id"}]
+        assert [request.method for request in requests] == ["PATCH", "GET", "PATCH"]
+
+    def test_gist_split_files(self, ics_file: Path, state: UploadState) -> None:
+        """Test the gist files of a calendar follow its growth and shrinkage."""
+        payloads = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            payloads.append(json.loads(request.content)["files"])
+            return httpx.Response(200, json={"id": "gist_id"}, headers={"ETag": "e"})
+
+        config = {"token": "test_token", "gist_id": "gist_id"}
+        small = ics_file.read_text(encoding="utf-8")
+        large = make_calendar(3, description_bytes=GIST_FILE_MAX_BYTES // 2)
+        with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+            uploader = GitHubGistUploader(config, client=client, state=state)
+            uploader.upload(ics_file)
+            ics_file.write_text(large, encoding="utf-8")
+            uploader.upload(ics_file)
+            ics_file.write_text(small, encoding="utf-8")
+            uploader.upload(ics_file)
+
+        # the first part replaces the calendar, the last parts are deleted
+        assert list(payloads[0]) == ["calendar.ics"]
+        assert payloads[1]["calendar.ics"]["content"].startswith("BEGIN:VCALENDAR")
+        assert sorted(payloads[1]) == [
+            "calendar-part2.ics",
+            "calendar-part3.ics",
+            "calendar.ics",
+        ]
+        assert payloads[2] == {
+            "calendar-part2.ics": None,
+            "calendar-part3.ics": None,
+            "calendar.ics": {"content": small},
+        }
+        assert state.get("github_gist:gist_id/calendar.ics")["files"] == [
+            "calendar.ics"
+        ]
+
+    def test_gist_check_failed(
+        self,
+        caplog: pytest.LogCaptureFixture,
+        ics_file: Path,
+        state: UploadState,
+    ) -> None:
+        """Test a gist is uploaded when checking its remote content fails."""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            if request.method == "GET":
+                return httpx.Response(404)
+            return httpx.Response(200, json={"id": "gist_id"}, headers={"ETag": "e"})
+
+        config = {"token": "test_token", "gist_id": "gist_id"}
+        with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+            uploader = GitHubGistUploader(config, client=client, state=state)
+            uploader.upload(ics_file)
+            assert uploader.upload(ics_file) == {"id": "gist_id"}
+
+        async def run() -> dict:
+            async with mock_client(handler) as client:
+                uploader = GitHubGistUploader(config, state=state)
+                return await uploader.upload_async(ics_file, client)
+
+        assert asyncio.run(run()) == {"id": "gist_id"}
+        assert [request.method for request in requests] == [
+            "PATCH",
+            "GET",
+            "PATCH",
+            "GET",
+            "PATCH",
+        ]
+        assert "failed to check gist gist_id" in caplog.text
+
+
+def make_calendar(events: int, description_bytes: int = 10) -> str:
+    """Return a calendar of events, each with a description of the given size."""
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "BEGIN:VTIMEZONE", "END:VTIMEZONE"]
+    for index in range(events):
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{index}",
+            "DESCRIPTION:" + "x" * description_bytes,
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "".join(line + "\n" for line in lines)
+
+
+class TestSplitCalendar:
+    """Test cases for split_calendar."""
+
+    def test_small_calendar(self) -> None:
+        """Test a small calendar is not split."""
+        content = make_calendar(3)
+        assert split_calendar(content, max_bytes=len(content)) == [content]
+
+    def test_split(self) -> None:
+        """Test every part is a complete calendar within max_bytes."""
+        content = make_calendar(10, description_bytes=100)
+        parts = split_calendar(content, max_bytes=500)
+
+        assert len(parts) > 1
+        uids = []
+        for part in parts:
+            assert len(part.encode("utf-8")) <= 500
+            assert part.startswith("BEGIN:VCALENDAR\nVERSION:2.0\nBEGIN:VTIMEZONE")
+            assert part.endswith("END:VEVENT\nEND:VCALENDAR\n")
+            uids += [line for line in part.splitlines() if line.startswith("UID:")]
+        assert uids == [f"UID:{index}" for index in range(10)]
+
+    def test_large_event(self) -> None:
+        """Test an event larger than max_bytes makes a part of its own."""
+        content = make_calendar(3, description_bytes=1000)
+        parts = split_calendar(content, max_bytes=500)
+        assert len(parts) == 3
+
+
+class TestGistBatch:
+    """Test cases for the batched GitHub Gist uploads."""
+
+    @pytest.fixture
+    def requests(self) -> list[httpx.Request]:
+        return []
+
+    @pytest.fixture
+    def client(self, requests: list[httpx.Request]) -> httpx.Client:
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            if request.method == "GET":
+                return httpx.Response(304)
+            if "fail" in request.content.decode():
+                return httpx.Response(422, json={"message": "Validation Failed"})
+            return httpx.Response(
+                200, json={"id": f"gist{len(requests)}"}, headers={"ETag": "etag"}
+            )
+
+        with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+            yield client
+
+    def make_files(self, tmp_path: Path, count: int) -> list[Path]:
+        files = []
+        for index in range(count):
+            file = tmp_path / f"calendar-{index}.ics"
+            file.write_text(make_calendar(1), encoding="utf-8")
+            files.append(file)
+        return files
+
+    def test_batches(
+        self, tmp_path: Path, client: httpx.Client, requests: list[httpx.Request]
+    ) -> None:
+        """Test the calendars of a gist are pushed size files per request."""
+        uploader = GitHubGistUploader(
+            {"token": "test_token", "gist_id": "gist_id"}, client=client
+        )
+        batch = GistBatch(size=2)
+        futures = [batch.add(uploader, file) for file in self.make_files(tmp_path, 5)]
+        assert not any(future.done() for future in futures)
+
+        batch.flush()
+
+        assert [future.result()["id"] for future in futures] == [
+            "gist1",
+            "gist1",
+            "gist2",
+            "gist2",
+            "gist3",
+        ]
+        assert [request.method for request in requests] == ["PATCH"] * 3
+        assert str(requests[0].url).endswith("/gists/gist_id")
+        payloads = [json.loads(request.content) for request in requests]
+        assert [sorted(payload["files"]) for payload in payloads] == [
+            ["calendar-0.ics", "calendar-1.ics"],
+            ["calendar-2.ics", "calendar-3.ics"],
+            ["calendar-4.ics"],
+        ]
+        assert "public" not in payloads[0]
+
+    def test_new_gists(
+        self, tmp_path: Path, client: httpx.Client, requests: list[httpx.Request]
+    ) -> None:
+        """Test calendars without gist_id create a gist per request, and
+        calendars of different gists are not pushed together."""
+        new_gist = GitHubGistUploader({"token": "test_token"}, client=client)
+        other = GitHubGistUploader(
+            {"token": "test_token", "gist_id": "other"}, client=client
+        )
+        batch = GistBatch(size=2, max_bytes=1)
+        files = self.make_files(tmp_path, 3)
+        futures = [batch.add(new_gist, file) for file in files[:2]]
+        futures.append(batch.add(other, files[2]))
+        batch.flush()
+
+        assert [request.method for request in requests] == ["POST", "POST", "PATCH"]
+        assert json.loads(requests[0].content)["public"] is False
+        assert len({future.result()["id"] for future in futures}) == 3
+
+    def test_failed_request(
+        self, tmp_path: Path, client: httpx.Client, requests: list[httpx.Request]
+    ) -> None:
+        """Test a failed request fails the uploads of its calendars only."""
+        uploader = GitHubGistUploader(
+            {"token": "test_token", "gist_id": "gist_id"}, client=client
+        )
+        files = self.make_files(tmp_path, 3)
+        files[1].write_text("fail", encoding="utf-8")
+        batch = GistBatch(size=1)
+        futures = [batch.add(uploader, file) for file in files]
+        futures.append(batch.add(uploader, tmp_path / "missing.ics"))
+        batch.flush()
+
+        assert futures[0].result()["id"] == "gist1"
+        with pytest.raises(httpx.HTTPStatusError):
+            futures[1].result()
+        assert futures[2].result()["id"] == "gist3"
+        with pytest.raises(FileNotFoundError):
+            futures[3].result()
+
+    def test_duplicate_file_names(
+        self, tmp_path: Path, client: httpx.Client, requests: list[httpx.Request]
+    ) -> None:
+        """Test calendars with the same file name never overwrite each other."""
+        files = []
+        for directory in ("a", "b"):
+            (tmp_path / directory).mkdir()
+            file = tmp_path / directory / "family.ics"
+            file.write_text(make_calendar(1), encoding="utf-8")
+            files.append(file)
+
+        uploader = GitHubGistUploader(
+            {"token": "test_token", "gist_id": "gist_id"}, client=client
+        )
+        batch = GistBatch()
+        futures = [batch.add(uploader, file) for file in files]
+        batch.flush()
+
+        assert futures[0].result()["id"] == "gist1"
+        with pytest.raises(ValueError, match="family.ics .* already uploaded"):
+            futures[1].result()
+        assert len(requests) == 1
+
+        new_gist = GitHubGistUploader({"token": "test_token"}, client=client)
+        futures = [batch.add(new_gist, file) for file in files]
+        batch.flush()
+
+        assert [future.result()["id"] for future in futures] == ["gist2", "gist3"]
+        assert [request.method for request in requests] == ["PATCH", "POST", "POST"]
+
+    def test_split_and_unchanged(
+        self, tmp_path: Path, client: httpx.Client, requests: list[httpx.Request]
+    ) -> None:
+        """Test oversized calendars are split, unchanged calendars are checked
+        with one conditional request, and parts no longer needed are deleted."""
+        state = UploadState(tmp_path / "uploads.json")
+        uploader = GitHubGistUploader(
+            {"token": "test_token", "gist_id": "gist_id"}, client=client, state=state
+        )
+        files = self.make_files(tmp_path, 2)
+        files[0].write_text(
+            make_calendar(3, description_bytes=GIST_FILE_MAX_BYTES // 2),
+            encoding="utf-8",
+        )
+        batch = GistBatch()
+        for file in files:
+            batch.add(uploader, file)
+        batch.flush()
+        assert sorted(json.loads(requests[0].content)["files"]) == [
+            "calendar-0-part2.ics",
+            "calendar-0-part3.ics",
+            "calendar-0.ics",
+            "calendar-1.ics",
+        ]
+
+        futures = [batch.add(uploader, file) for file in files]
+        batch.flush()
+
+        assert [future.result() for future in futures] == [{"unchanged": True}] * 2
+        assert [request.method for request in requests] == ["PATCH", "GET"]
+        assert requests[1].headers["If-None-Match"] == "etag"
+
+        files[0].write_text(make_calendar(1), encoding="utf-8")
+        batch.add(uploader, files[0])
+        batch.flush()
+        payload = json.loads(requests[2].content)["files"]
+        assert payload["calendar-0-part2.ics"] is None
+        assert payload["calendar-0-part3.ics"] is None
+        assert "content" in payload["calendar-0.ics"]
+
+
+class TestRetryScheduler:
+    """Test cases for the rate limit aware retries."""
+
+    @pytest.fixture
+    def scheduler(self) -> RetryScheduler:
+        return RetryScheduler(backoff=0.01, max_backoff=0.02)
+
+    def send(
+        self, scheduler: RetryScheduler, method: str, responses: list, **kwargs
+    ) -> tuple[httpx.Response, int]:
+        """Send a request answered by responses in turn, return the last
+        response and the number of attempts."""
+        attempts = []
+
+        def send() -> httpx.Response:
+            attempts.append(None)
+            response = responses[len(attempts) - 1]
+            if isinstance(response, Exception):
+                raise response
+            response.request = httpx.Request(method, "https://api.test/gists")
+            return response
+
+        response = scheduler.send(method, "https://api.test/gists", send, **kwargs)
+        return response, len(attempts)
+
+    def test_retry_after(self, scheduler: RetryScheduler) -> None:
+        """Test rate limited responses are retried after Retry-After."""
+        responses = [
+            httpx.Response(429, headers={"Retry-After": "0"}),
+            httpx.Response(403, headers={"Retry-After": "0"}),
+            httpx.Response(
+                403,
+                headers={
+                    "X-RateLimit-Remaining": "0",
+                    "X-RateLimit-Reset": str(int(time.time()) - 1),
+                },
+            ),
+            httpx.Response(201),
+        ]
+        response, attempts = self.send(scheduler, "POST", responses)
+        assert (response.status_code, attempts) == (201, 4)
+
+    def test_not_retried(self, scheduler: RetryScheduler) -> None:
+        """Test client errors, and server errors of POST, are not retried."""
+        assert self.send(scheduler, "PATCH", [httpx.Response(403)])[1] == 1
+        assert self.send(scheduler, "PATCH", [httpx.Response(422)])[1] == 1
+        assert self.send(scheduler, "POST", [httpx.Response(502)])[1] == 1
+        long_wait = httpx.Response(429, headers={"Retry-After": "3600"})
+        assert self.send(scheduler, "PATCH", [long_wait])[1] == 1
+
+    def test_max_retries(self, scheduler: RetryScheduler) -> None:
+        """Test server errors are retried up to max_retries times."""
+        responses = [httpx.Response(503) for _ in range(3)]
+        response, attempts = self.send(scheduler, "PATCH", responses, max_retries=2)
+        assert (response.status_code, attempts) == (503, 3)
+
+    def test_transport_errors(self, scheduler: RetryScheduler) -> None:
+        """Test connection failures are retried, and read timeouts only when
+        the request is idempotent."""
+        responses = [httpx.ConnectError("refused"), httpx.Response(201)]
+        assert self.send(scheduler, "POST", responses)[1] == 2
+
+        responses = [httpx.ReadTimeout("timeout"), httpx.Response(200)]
+        assert self.send(scheduler, "PUT", responses)[1] == 2
+        with pytest.raises(httpx.ReadTimeout):
+            self.send(scheduler, "POST", [httpx.ReadTimeout("timeout")])
+
+    def test_pacing(self, scheduler: RetryScheduler) -> None:
+        """Test requests are held once the rate limit is exhausted, spread
+        when it runs low, and write requests are spaced."""
+        reset = time.time() + 100
+        headers = {"X-RateLimit-Reset": str(reset)}
+        scheduler.update(
+            "exhausted",
+            httpx.Response(200, headers={**headers, "X-RateLimit-Remaining": "0"}),
+        )
+        assert 99 < scheduler.reserve("exhausted") <= 100
+
+        scheduler.update(
+            "low",
+            httpx.Response(200, headers={**headers, "X-RateLimit-Remaining": "10"}),
+        )
+        assert scheduler.reserve("low") < 1
+        # 9 requests left for the 100s of the window
+        assert 10 < scheduler.reserve("low") <= 100 / 9
+
+        scheduler.update(
+            "plenty",
+            httpx.Response(200, headers={**headers, "X-RateLimit-Remaining": "4000"}),
+        )
+        assert scheduler.reserve("plenty") < 1
+        assert scheduler.reserve("plenty") < 1
+
+        assert scheduler.reserve("writes", write_interval=1.0) < 0.5
+        assert scheduler.reserve("writes") < 0.5
+        assert 0.5 < scheduler.reserve("writes", write_interval=1.0) <= 1.0
+
+    def test_max_wait(self) -> None:
+        """Test a request held longer than max_wait fails without waiting."""
+        scheduler = RetryScheduler(max_wait=10)
+        scheduler.update(
+            "api.github.com",
+            httpx.Response(
+                200,
+                headers={
+                    "X-RateLimit-Remaining": "0",
+                    "X-RateLimit-Reset": str(time.time() + 3500),
+                },
+            ),
+        )
+        send = Mock()
+        with pytest.raises(RateLimitError, match="api.github.com"):
+            scheduler.send("PATCH", "https://api.github.com/gists/gist_id", send)
+        with pytest.raises(RateLimitError):
+            asyncio.run(
+                scheduler.send_async("GET", "https://api.github.com/gists", send)
+            )
+        send.assert_not_called()
+        # other hosts are not held
+        assert scheduler.reserve("example.com") < 1
+
+    def test_upload_async(self, tmp_path: Path) -> None:
+        """Test the async uploads retry through the scheduler."""
+        file = tmp_path / "calendar.ics"
+        file.write_text("BEGIN:VCALENDAR\nEND:VCALENDAR\n", encoding="utf-8")
+        responses = [
+            httpx.Response(429, headers={"Retry-After": "0"}),
+            httpx.Response(200, json={"id": "gist_id"}),
+        ]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return responses.pop(0)
+
+        uploader = GitHubGistUploader(
+            {"token": "test_token", "gist_id": "gist_id"},
+            scheduler=RetryScheduler(backoff=0.01),
+        )
+        uploader.WRITE_INTERVAL = 0.0
+
+        async def run() -> dict:
+            async with mock_client(handler) as client:
+                return await upload_concurrently([(uploader, file)], client)
+
+        assert asyncio.run(run()) == [{"id": "gist_id"}]
+        assert responses == []
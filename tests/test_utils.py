@@ -1,8 +1,12 @@
 import datetime
 import zoneinfo
 
+import pytest
+
 from lunar_birthday_ical.utils import (
     get_future_solar_datetime,
+    get_future_solar_datetimes,
+    get_integer_days,
     get_local_datetime,
     local_datetime_to_utc_datetime,
 )
@@ -118,3 +122,49 @@ def test_negative_age_increment():
     target_year = 2019
     expected_date = datetime.datetime(2019, 2, 5)
     assert get_future_solar_datetime(solar_date, target_year) == expected_date
+
+
+def test_future_solar_datetimes_matches_single_year():
+    """
+    Test case 10: 批量计算 公历 2020-05-23 (农历 二〇二〇年闰四月初一) 在 2019-2025 年对应的公历日, 与逐年计算一致
+    """
+    solar_date = datetime.datetime(
+        2020, 5, 23, 10, 0, tzinfo=zoneinfo.ZoneInfo("Asia/Shanghai")
+    )
+    expected = [get_future_solar_datetime(solar_date, y) for y in range(2019, 2026)]
+    assert get_future_solar_datetimes(solar_date, 2019, 2025) == expected
+
+
+def test_future_solar_datetimes_empty_range():
+    solar_date = datetime.datetime(2020, 1, 25)
+    assert get_future_solar_datetimes(solar_date, 2021, 2020) == []
+
+
+@pytest.mark.parametrize(
+    "start_date, year_start, year_end, days_interval, days_max",
+    [
+        (datetime.date(2006, 2, 1), 2025, 2030, 1000, 30000),
+        (datetime.date(2006, 2, 1), 2025, 2030, 100, 30000),
+        (datetime.date(1989, 6, 3), 1980, 2100, 1000, 30000),
+        (datetime.date(1989, 6, 3), 2020, 2021, 7, 10000),
+        (datetime.date(2024, 12, 31), 2025, 2025, 1, 365),
+    ],
+)
+def test_get_integer_days(start_date, year_start, year_end, days_interval, days_max):
+    expected = [
+        days
+        for days in range(days_interval, days_max + 1, days_interval)
+        if year_start <= (start_date + datetime.timedelta(days=days)).year <= year_end
+    ]
+    result = get_integer_days(start_date, year_start, year_end, days_interval, days_max)
+    assert result.tolist() == expected
+
+
+def test_get_integer_days_out_of_window():
+    result = get_integer_days(datetime.date(2020, 1, 1), 2000, 2010, 100, 30000)
+    assert result.tolist() == []
+
+
+def test_get_integer_days_invalid_interval():
+    with pytest.raises(ValueError):
+        get_integer_days(datetime.date(2020, 1, 1), 2020, 2030, 0, 30000)
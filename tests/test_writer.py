@@ -0,0 +1,87 @@
+import datetime
+import io
+
+from lunar_birthday_ical.writer import (
+    AlarmTemplate,
+    CalendarWriter,
+    content_line,
+    escape_param,
+    escape_text,
+    fold_line,
+    format_datetime,
+    format_duration,
+    render_alarm,
+    render_attendee,
+)
+
+
+def test_escape_text():
+    assert escape_text("a;b,c\\d\ne") == r"a\;b\,c\\d\ne"
+
+
+def test_escape_param():
+    assert escape_param("abc") == "abc"
+    assert escape_param("b,c") == '"b,c"'
+    assert escape_param('q"^x') == "q^'^^x"
+
+
+def test_fold_line_ascii():
+    line = "x" * 200
+    folded = fold_line(line)
+    parts = folded.split("\r\n ")
+    assert "".join(parts) == line
+    assert all(len(part.encode()) <= 74 for part in parts)
+
+
+def test_fold_line_multibyte():
+    line = "DESCRIPTION:" + "长" * 50
+    parts = fold_line(line).split("\r\n ")
+    assert "".join(parts) == line
+    assert all(len(part.encode()) <= 74 for part in parts)
+
+
+def test_fold_line_keeps_escapes_together():
+    line = "x" * 73 + r"\;" + "y"
+    parts = fold_line(line).split("\r\n ")
+    assert parts[1].startswith(r"\;")
+
+
+def test_format_datetime():
+    value = datetime.datetime(
+        2025, 1, 1, 10, tzinfo=datetime.timezone(datetime.timedelta(hours=8))
+    )
+    assert format_datetime(value) == "20250101T020000Z"
+
+
+def test_format_duration():
+    assert format_duration(datetime.timedelta(days=-1)) == "-P1D"
+    assert format_duration(datetime.timedelta(hours=1, minutes=30)) == "PT1H30M"
+    assert format_duration(datetime.timedelta(days=2, seconds=5)) == "P2DT5S"
+
+
+def test_render_alarm_and_attendee():
+    alarm = render_alarm("uid", datetime.timedelta(days=-3), "Reminder: x")
+    assert alarm.startswith("BEGIN:VALARM\r\nACTION:DISPLAY\r\n")
+    assert "TRIGGER:-P3D\r\n" in alarm
+    attendee = render_attendee("test@example.com")
+    assert (
+        attendee == "ATTENDEE;CN=test;ROLE=REQ-PARTICIPANT:mailto:test@example.com\r\n"
+    )
+
+
+def test_alarm_template():
+    template = AlarmTemplate(datetime.timedelta(days=-1))
+    description_line = content_line("DESCRIPTION", "Reminder: x")
+    assert template.render("uid", description_line) == render_alarm(
+        "uid", datetime.timedelta(days=-1), "Reminder: x"
+    )
+    assert template.trigger_line == "TRIGGER:-P1D\r\n"
+
+
+def test_calendar_writer():
+    stream = io.BytesIO()
+    writer = CalendarWriter(stream)
+    writer.begin([("VERSION", "2.0")])
+    writer.end()
+    assert stream.getvalue() == b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nEND:VCALENDAR\r\n"
+    assert writer.bytes_written == len(stream.getvalue())